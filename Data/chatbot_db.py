@@ -1,8 +1,11 @@
 import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from dotenv import load_dotenv
 import urllib
+from Data.pool_metrics import PoolMetrics, instrumented_pool
 
 load_dotenv()
 
@@ -12,13 +15,61 @@ SQL_USER = os.getenv("SQL_USER")
 SQL_PASS = os.getenv("SQL_PASS")
 
 driver = urllib.parse.quote_plus("ODBC Driver 17 for SQL Server")
-DATABASE_URL = f"mssql+pyodbc://{SQL_USER}:{SQL_PASS}@{SQL_SERVER}/{SQL_DB}?driver={driver}"
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    f"mssql+pyodbc://{SQL_USER}:{SQL_PASS}@{SQL_SERVER}/{SQL_DB}?driver={driver}"
+)
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    f"mssql+aioodbc://{SQL_USER}:{SQL_PASS}@{SQL_SERVER}/{SQL_DB}?driver={driver}"
+)
 
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# DB_PROFILE picks the pool defaults; every value can still be overridden individually
+ENGINE_PROFILES = {
+    "dev": {"pool_size": 5, "max_overflow": 5, "pool_timeout": 10, "pool_recycle": 1800},
+    "prod": {"pool_size": 20, "max_overflow": 10, "pool_timeout": 30, "pool_recycle": 1800},
+}
+DB_PROFILE = os.getenv("DB_PROFILE", "dev").lower()
+if DB_PROFILE not in ENGINE_PROFILES:
+    raise ValueError(f"Unknown DB_PROFILE '{DB_PROFILE}', expected one of {sorted(ENGINE_PROFILES)}")
+
+
+def engine_options(url: str) -> dict:
+    """Pool and dialect settings for DB_PROFILE, with DB_* environment overrides."""
+    profile = ENGINE_PROFILES[DB_PROFILE]
+    options = {
+        "echo": os.getenv("DB_ECHO", "false").lower() == "true",
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+        "pool_size": int(os.getenv("DB_POOL_SIZE", profile["pool_size"])),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", profile["max_overflow"])),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", profile["pool_timeout"])),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", profile["pool_recycle"])),
+    }
+    if url.startswith("mssql+pyodbc"):
+        # send executemany batches as one parameter array instead of row by row; pyodbc only:
+        # the aioodbc dialect would set it on SQLAlchemy's cursor adapter, which rejects it
+        options["fast_executemany"] = True
+    return options
+
+
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
 
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=instrumented_pool(QueuePool, sync_pool_metrics),
+    **engine_options(DATABASE_URL),
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# async engine used by the request path so DB waits don't hold a worker thread
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=instrumented_pool(AsyncAdaptedQueuePool, async_pool_metrics),
+    **engine_options(ASYNC_DATABASE_URL),
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db():
     db = SessionLocal()
@@ -28,3 +79,15 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def pool_stats() -> dict:
+    """Checkout latency, in-use and overflow counters for both connection pools."""
+    return {
+        "profile": DB_PROFILE,
+        "sync": sync_pool_metrics.stats(),
+        "async": async_pool_metrics.stats(),
+    }
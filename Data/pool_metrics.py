@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import deque
+from sqlalchemy import exc
+
+
+class PoolMetrics:
+    """Checkout latency, overflow and timeout counters for one connection pool."""
+
+    def __init__(self, name: str, window: int = 1024):
+        self.name = name
+        self.pool = None
+        self.checkouts = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_checkout(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_seconds_total += seconds
+            self.checkout_seconds_max = max(self.checkout_seconds_max, seconds)
+            self._recent.append(seconds)
+
+    def record_overflow(self):
+        with self._lock:
+            self.overflow_events += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            p95 = recent[int(0.95 * (len(recent) - 1))] if recent else 0.0
+            stats = {
+                "checkouts": self.checkouts,
+                "checkout_ms_avg": 1000 * self.checkout_seconds_total / self.checkouts if self.checkouts else 0.0,
+                "checkout_ms_p95": 1000 * p95,
+                "checkout_ms_max": 1000 * self.checkout_seconds_max,
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+            }
+
+        pool = self.pool
+        if pool is not None and hasattr(pool, "checkedout"):
+            stats.update({
+                "pool_size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        return stats
+
+
+def instrumented_pool(base, metrics: PoolMetrics):
+    """
+    Subclass a QueuePool variant so every checkout feeds `metrics`.
+
+    Checkout time covers waiting for a free connection plus opening a new one
+    (and the pre-ping), i.e. everything the request waits for before its
+    first statement.
+    """
+
+    class InstrumentedPool(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            metrics.pool = self
+
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                return super().connect()
+            except exc.TimeoutError:
+                metrics.record_timeout()
+                raise
+            finally:
+                metrics.record_checkout(time.perf_counter() - start)
+
+        def _create_connection(self):
+            record = super()._create_connection()
+            # _overflow is above zero once pool_size connections are open
+            if getattr(self, "_overflow", 0) > 0:
+                metrics.record_overflow()
+            return record
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
@@ -1,18 +1,102 @@
+import json
+import random
+import re
+import threading
 from langchain_openai import AzureChatOpenAI
-from Services.config import AZURE_API_KEY, AZURE_ENDPOINT, AZURE_DEPLOYMENT_NAME
-
-llm = AzureChatOpenAI(
-    api_key=AZURE_API_KEY,
-    azure_endpoint=AZURE_ENDPOINT,
-    model=AZURE_DEPLOYMENT_NAME,
-    api_version="2024-02-15-preview",
-    temperature=0.2
+from Services.config import (
+    AZURE_API_KEY, AZURE_ENDPOINT, AZURE_DEPLOYMENT_NAME,
+    FOLLOWUP_PHRASES_PATH, FOLLOWUP_GENERATE, FOLLOWUP_POOL_SIZE,
 )
 
-def llm_followup_sentence(filename: str):
-    prompt = (
-        f"Write one sentence asking the user if they need anything else."
-        f"Do not add a link, do not ask questions. Maximum 1 sentence."
+DEFAULT_FOLLOWUPS = [
+    "Let me know if you need anything else for your onboarding.",
+    "I am happy to help if you need any other documents.",
+    "Feel free to reach out if there is anything else you need.",
+    "I am here if you need help with any other requirements.",
+    "Just let me know if there is anything else I can help you with.",
+    "Happy to assist with anything else you need for your onboarding.",
+]
+
+
+def build_llm():
+    return AzureChatOpenAI(
+        api_key=AZURE_API_KEY,
+        azure_endpoint=AZURE_ENDPOINT,
+        model=AZURE_DEPLOYMENT_NAME,
+        api_version="2024-02-15-preview",
+        temperature=0.7
     )
-    result = llm.invoke(prompt)
-    return result.content.strip()
+
+
+def load_phrases(path: str) -> list:
+    """Follow-up sentences from a JSON list file; the defaults if it is missing or invalid."""
+    if not path:
+        return list(DEFAULT_FOLLOWUPS)
+    try:
+        with open(path, encoding="utf-8") as f:
+            phrases = [p.strip() for p in json.load(f) if isinstance(p, str) and p.strip()]
+        return phrases or list(DEFAULT_FOLLOWUPS)
+    except (OSError, ValueError) as e:
+        print(f"FOLLOWUP: could not load {path}, using defaults: {e}")
+        return list(DEFAULT_FOLLOWUPS)
+
+
+class FollowupProvider:
+    """
+    Pool of closing sentences served without an LLM call.
+
+    The pool starts from config (or the defaults). `generate()` can replace it
+    once with LLM-written variations; requests never wait on the LLM.
+    """
+
+    def __init__(self, phrases: list, llm_factory=build_llm):
+        self._phrases = list(phrases) or list(DEFAULT_FOLLOWUPS)
+        self._llm_factory = llm_factory
+        self._lock = threading.Lock()
+
+    def next(self) -> str:
+        with self._lock:
+            return random.choice(self._phrases)
+
+    def generate(self, count: int = FOLLOWUP_POOL_SIZE) -> bool:
+        """Ask the LLM for `count` varied sentences in one call and swap them in."""
+        prompt = (
+            f"Write {count} different sentences telling the user you can help if they need anything else "
+            f"with their HR onboarding. One sentence per line, no numbering, no links, no questions."
+        )
+        try:
+            text = self._llm_factory().invoke(prompt).content
+        except Exception as e:
+            print(f"FOLLOWUP: generation failed, keeping current phrases: {e}")
+            return False
+
+        # drop any bullets or numbering the model added anyway
+        phrases = [re.sub(r"^[\s\-•*]*(\d+[.)]\s*)?", "", line).strip() for line in text.splitlines()]
+        phrases = [p for p in phrases if p and "?" not in p and "http" not in p]
+        if not phrases:
+            return False
+
+        with self._lock:
+            self._phrases = phrases
+        return True
+
+    def generate_in_background(self, count: int = FOLLOWUP_POOL_SIZE):
+        threading.Thread(target=self.generate, args=(count,), name="followup-generate", daemon=True).start()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._phrases)
+
+
+followup_provider = FollowupProvider(load_phrases(FOLLOWUP_PHRASES_PATH))
+
+
+def warm_followups():
+    """Called at startup: replace the configured pool with LLM-written phrases when FOLLOWUP_GENERATE is set."""
+    if FOLLOWUP_GENERATE:
+        followup_provider.generate_in_background()
+
+
+def followup_sentence() -> str:
+    """A closing sentence from the pool; no LLM call on the request path."""
+    return followup_provider.next()
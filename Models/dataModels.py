@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -97,7 +97,11 @@ class ChatMessage(Base):
     Represents a ChatMessage entity in a conversation.
     """
     __tablename__ = "ChatMessages"
-    __table_args__ = {"schema": "dbo"}
+    __table_args__ = (
+        # keyset pagination / latest-N window per conversation
+        Index("IX_ChatMessages_ConvoId_MessageId", "ConvoId", "MessageId"),
+        {"schema": "dbo"},
+    )
 
     MessageId = Column(Integer, primary_key=True, autoincrement=True)
     ConvoId = Column(Integer, ForeignKey("dbo.Conversations.ConvoId"), nullable=False)
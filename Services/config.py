@@ -12,3 +12,53 @@ EMBEDDING_ENDPOINT = os.getenv("AZURE_EMBEDDING_ENDPOINT")
 EMBEDDING_API_VERSION = os.getenv("AZURE_EMBEDDING_API_VERSION")
 EMBEDDING_DEPLOYMENT_NAME = os.getenv("AZURE_EMBEDDING_DEPLOYMENT")
 storage_name = os.getenv("AZURE_STORAGE_ACCOUNT_NAME")
+
+# ASP.NET onboarding backend (task status, blob listing)
+BACKEND_BASE_URL = os.getenv("BACKEND_BASE_URL", "http://localhost:5164").rstrip("/")
+
+FILE_INDEX_PATH = os.getenv("FILE_INDEX_PATH", "FileIndex/file_name_embeddings.json")
+
+# semantic response cache in front of ask_noxy
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "512"))
+
+# onboarding-materials blob listing used by pdf_file_tool
+BLOB_CATALOG_TTL_SECONDS = float(os.getenv("BLOB_CATALOG_TTL_SECONDS", "3600"))
+BLOB_CATALOG_RETRY_SECONDS = float(os.getenv("BLOB_CATALOG_RETRY_SECONDS", "60"))
+
+# conversation history: prompt window and /history page size
+HISTORY_WINDOW_MESSAGES = int(os.getenv("HISTORY_WINDOW_MESSAGES", "10"))
+HISTORY_WINDOW_TOKENS = int(os.getenv("HISTORY_WINDOW_TOKENS", "1000"))
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "200"))
+
+# per-process user -> active conversation cache used by /chat
+CONVO_CACHE_MAX_ENTRIES = int(os.getenv("CONVO_CACHE_MAX_ENTRIES", "10000"))
+CONVO_CACHE_TTL_SECONDS = float(os.getenv("CONVO_CACHE_TTL_SECONDS", "300"))
+
+# per-user onboarding task status shared by /chat and pending_tasks_tool
+TASK_STATUS_CACHE_TTL_SECONDS = float(os.getenv("TASK_STATUS_CACHE_TTL_SECONDS", "30"))
+TASK_STATUS_CACHE_MAX_ENTRIES = int(os.getenv("TASK_STATUS_CACHE_MAX_ENTRIES", "10000"))
+
+# token budget for retrieved knowledge appended to the prompt
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "1200"))
+
+# keyword intent router: answers clear tool intents without the LLM
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.75"))
+
+# default per-tool timeout when the model requests several tools at once
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "20"))
+
+# closing sentences appended to file replies (served from a pool, no LLM call per reply)
+FOLLOWUP_PHRASES_PATH = os.getenv("FOLLOWUP_PHRASES_PATH", "")
+FOLLOWUP_GENERATE = os.getenv("FOLLOWUP_GENERATE", "false").lower() == "true"
+FOLLOWUP_POOL_SIZE = int(os.getenv("FOLLOWUP_POOL_SIZE", "8"))
+FOLLOWUP_PER_FILE = os.getenv("FOLLOWUP_PER_FILE", "false").lower() == "true"
+
+# request tracing: "otlp" (OTEL_EXPORTER_OTLP_ENDPOINT), "json" (local file) or "none"
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_JSON_PATH = os.getenv("TRACING_JSON_PATH", "traces.jsonl")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "noxy-chatbot")
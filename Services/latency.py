@@ -0,0 +1,41 @@
+import threading
+from collections import deque
+
+
+class LatencyTracker:
+    """Per-key call counts, errors and latency (avg/p95/max) over a recent window."""
+
+    def __init__(self, window: int = 512):
+        self.window = window
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float, error: bool = False, timeout: bool = False):
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {
+                    "calls": 0, "errors": 0, "timeouts": 0,
+                    "total": 0.0, "max": 0.0, "recent": deque(maxlen=self.window),
+                }
+            stats["calls"] += 1
+            stats["errors"] += int(error)
+            stats["timeouts"] += int(timeout)
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["recent"].append(seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = {}
+            for key, s in self._stats.items():
+                recent = sorted(s["recent"])
+                result[key] = {
+                    "calls": s["calls"],
+                    "errors": s["errors"],
+                    "timeouts": s["timeouts"],
+                    "ms_avg": 1000 * s["total"] / s["calls"],
+                    "ms_p95": 1000 * recent[int(0.95 * (len(recent) - 1))],
+                    "ms_max": 1000 * s["max"],
+                }
+            return result
@@ -0,0 +1,189 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from opentelemetry.sdk.trace import SpanProcessor
+
+# seconds; wide enough for both a 1 ms cache hit and a slow LLM call
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(labels.get(n, "") for n in self.labels), 0)
+
+    def render(self) -> list:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(v)}" for key, v in self._values.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram; p95/p99 come from histogram_quantile() on the buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # label values -> [count per bucket..., count above the last, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(labels.get(n, "") for n in self.labels))
+        return series[-1] if series else 0
+
+    def render(self) -> list:
+        lines = []
+        with self._lock:
+            for key, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series[:-2]):
+                    cumulative += count
+                    le = 'le="%s"' % _format_value(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Metrics rendered in the Prometheus text exposition format.
+
+    Counters and histograms are updated as requests run; collectors are
+    callables returning (name, type, help, [(labels dict, value), ...])
+    tuples for values read at scrape time (pool sizes, cache counters).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+
+        for collect in self._collectors:
+            try:
+                families = collect()
+            except Exception as e:
+                print(f"METRICS: collector {collect.__name__} failed: {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    names = tuple(labels)
+                    lines.append(f"{name}{_format_labels(names, tuple(labels[n] for n in names))} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    "noxy_stage_duration_seconds", "Duration of each chat pipeline stage (one per trace span).", ("stage",))
+tool_seconds = registry.histogram(
+    "noxy_tool_duration_seconds", "Duration of each tool call.", ("tool",))
+llm_tokens = registry.counter(
+    "noxy_llm_tokens_total", "LLM tokens by call and kind (prompt or completion).", ("call", "kind"))
+vector_search_seconds = registry.histogram(
+    "noxy_vector_search_duration_seconds", "Index lookup time per retriever (dense or lexical).", ("retriever",))
+ingest_stage_seconds = registry.histogram(
+    "noxy_ingest_stage_duration_seconds", "Time per document ingestion stage.", ("stage",))
+ingest_chunks = registry.counter(
+    "noxy_ingest_chunks_total", "Chunks written to the vector store by document uploads.")
+ingest_documents = registry.counter(
+    "noxy_ingest_documents_total", "Document uploads by result.", ("result",))
+
+
+class MetricsSpanProcessor(SpanProcessor):
+    """
+    Turns finished trace spans into stage/tool histograms and token counters,
+    so every traced stage is also measured without timing it twice.
+    """
+
+    def on_end(self, span):
+        seconds = (span.end_time - span.start_time) / 1e9
+        attributes = span.attributes or {}
+
+        if span.name.startswith("tool."):
+            tool_seconds.observe(seconds, tool=span.name[len("tool."):])
+        else:
+            stage_seconds.observe(seconds, stage=span.name)
+
+        if span.name.startswith("llm."):
+            call = span.name[len("llm."):]
+            llm_tokens.inc(attributes.get("llm.input_tokens", 0), call=call, kind="prompt")
+            llm_tokens.inc(attributes.get("llm.output_tokens", 0), call=call, kind="completion")
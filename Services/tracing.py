@@ -0,0 +1,99 @@
+import json
+import threading
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from Services.config import TRACING_EXPORTER, TRACING_JSON_PATH, TRACING_SERVICE_NAME
+from Services.metrics import MetricsSpanProcessor
+
+# spans are no-ops until setup_tracing() installs a provider
+tracer = trace.get_tracer("noxy")
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Writes one JSON object per finished span to a local file, for offline use."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> SpanExportResult:
+        lines = []
+        for s in spans:
+            context = s.get_span_context()
+            lines.append(json.dumps({
+                "name": s.name,
+                "trace_id": format(context.trace_id, "032x"),
+                "span_id": format(context.span_id, "016x"),
+                "parent_id": format(s.parent.span_id, "016x") if s.parent else None,
+                "start": s.start_time / 1e9,
+                "duration_ms": (s.end_time - s.start_time) / 1e6,
+                "status": s.status.status_code.name,
+                "attributes": dict(s.attributes or {}),
+            }))
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"TRACING: could not write {self.path}: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+
+def build_exporter(kind: str):
+    if kind == "otlp":
+        # endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    if kind == "json":
+        return JsonLinesSpanExporter(TRACING_JSON_PATH)
+    raise ValueError(f"Unknown TRACING_EXPORTER '{kind}', expected otlp, json or none")
+
+
+def setup_tracing(kind: str = TRACING_EXPORTER) -> bool:
+    """
+    Install the tracer provider. Called once at startup.
+
+    Finished spans always feed the /metrics histograms; they are exported
+    only when `kind` is "otlp" or "json".
+    """
+    provider = TracerProvider(resource=Resource.create({"service.name": TRACING_SERVICE_NAME}))
+    provider.add_span_processor(MetricsSpanProcessor())
+    if kind != "none":
+        provider.add_span_processor(BatchSpanProcessor(build_exporter(kind)))
+        print(f"TRACING: exporting spans via {kind}")
+    trace.set_tracer_provider(provider)
+    return kind != "none"
+
+
+def shutdown_tracing():
+    """Flush spans still queued for export."""
+    provider = trace.get_tracer_provider()
+    if isinstance(provider, TracerProvider):
+        provider.shutdown()
+
+
+def _clean(attributes: dict) -> dict:
+    # OpenTelemetry rejects None attribute values
+    return {key: value for key, value in attributes.items() if value is not None}
+
+
+def span(name: str, **attributes):
+    """Context manager timing one pipeline stage as a child of the current span."""
+    return tracer.start_as_current_span(name, attributes=_clean(attributes))
+
+
+def start_span(name: str, context=None, **attributes):
+    """
+    Span that is not made current; end it with .end().
+
+    Used around streamed stages, where a `with` block would span a `yield`.
+    `context` (from trace.set_span_in_context) picks the parent.
+    """
+    return tracer.start_span(name, context=context, attributes=_clean(attributes))
+
+
+def set_span_attributes(**attributes):
+    """Add attributes (token counts, cache hits, ...) to the current span."""
+    trace.get_current_span().set_attributes(_clean(attributes))
@@ -0,0 +1,102 @@
+import re
+import threading
+from vector.tokens import count_tokens
+from Services.tracing import set_span_attributes
+
+# shortest shared prefix/suffix treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 20
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _overlap(previous: str, chunk: str) -> int:
+    """Length of the longest suffix of `previous` that `chunk` starts with."""
+    for size in range(min(len(previous), len(chunk)), MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(chunk[:size]):
+            return size
+    return 0
+
+
+def dedupe_chunks(chunks: list) -> list:
+    """
+    Drop repeated chunk text, keeping the original (best-first) order.
+
+    Chunks fully contained in an earlier one are skipped, and a chunk that
+    starts with the tail of an earlier one (the splitter's overlap window)
+    keeps only its new text.
+    """
+    kept = []
+    for chunk in chunks:
+        text = _normalize(chunk)
+        if not text or any(text in earlier for earlier in kept):
+            continue
+        cut = max((_overlap(earlier, text) for earlier in kept), default=0)
+        text = text[cut:].strip()
+        if text:
+            kept.append(text)
+    return kept
+
+
+class ContextUsage:
+    """Running totals of retrieved vs. packed context tokens across requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens_in = 0
+        self.tokens_used = 0
+        self.chunks_dropped = 0
+
+    def record(self, tokens_in: int, tokens_used: int, chunks_dropped: int):
+        with self._lock:
+            self.requests += 1
+            self.tokens_in += tokens_in
+            self.tokens_used += tokens_used
+            self.chunks_dropped += chunks_dropped
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "tokens_in": self.tokens_in,
+                "tokens_used": self.tokens_used,
+                "tokens_saved": self.tokens_in - self.tokens_used,
+                "chunks_dropped": self.chunks_dropped,
+            }
+
+
+context_usage = ContextUsage()
+
+
+def build_context(chunks: list, max_tokens: int) -> str:
+    """
+    Pack retrieved chunks (best first) into at most `max_tokens` tokens.
+
+    Duplicated and overlapping text is removed first; chunks that no longer
+    fit are skipped so a lower-ranked shorter chunk can still use the budget.
+    Tokens retrieved vs. used are printed and added to `context_usage`.
+    """
+    # +1 per chunk for the newline joining chunks, on both sides of the count
+    tokens_in = sum(count_tokens(c) + 1 for c in chunks)
+
+    packed = []
+    used = 0
+    for text in dedupe_chunks(chunks):
+        tokens = count_tokens(text) + 1
+        if used + tokens > max_tokens:
+            continue
+        packed.append(text)
+        used += tokens
+
+    context_usage.record(tokens_in, used, len(chunks) - len(packed))
+    set_span_attributes(**{
+        "context.tokens_in": tokens_in,
+        "context.tokens_used": used,
+        "context.tokens_saved": tokens_in - used,
+        "context.chunks_used": len(packed),
+    })
+    if chunks:
+        print(f"CONTEXT: {used}/{tokens_in} tokens, {len(packed)}/{len(chunks)} chunks (saved {tokens_in - used})")
+    return "\n".join(packed)
@@ -0,0 +1,74 @@
+import re
+from tools.keyword_engine import match_keywords
+
+# intent -> tool that answers it on its own
+INTENT_TOOLS = {
+    "hr_contact": "hr_lookup",
+    "pending_tasks": "pending_tasks_tool",
+    "pdf_file": "pdf_file_tool",
+}
+
+# words that carry no intent; they neither add nor lower confidence
+FILLER_WORDS = {
+    "a", "an", "the", "my", "me", "i", "i'm", "im", "you", "your", "can", "could", "would",
+    "please", "pls", "plz", "kindly", "give", "send", "get", "show", "need", "want", "like",
+    "to", "for", "of", "is", "are", "am", "do", "does", "what", "whats", "what's", "how",
+    "where", "which", "there", "have", "has", "some", "any", "still", "now", "again", "so",
+    "po", "thanks", "thank", "hi", "hello", "hey", "ok", "okay", "and",
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9'\-]*")
+
+
+class IntentMatch:
+    def __init__(self, intent: str, confidence: float):
+        self.intent = intent
+        self.tool = INTENT_TOOLS.get(intent)
+        self.confidence = confidence
+
+    def __repr__(self):
+        return f"IntentMatch({self.intent!r}, {self.confidence:.2f})"
+
+
+def route(message: str):
+    """
+    Classify a message from its keyword scan.
+
+    Confidence is the share of meaningful (non-filler) words covered by the
+    keywords of the detected intent, so "hr contact please" scores 1.0 while
+    "hr contact and the dress code" scores lower. Messages hitting more than
+    one intent get 0.0.
+
+    Returns:
+        IntentMatch, or None when no intent keyword matched
+    """
+    q = message.lower()
+    match = match_keywords(message)
+    spans = {
+        intent: match.spans(intent)
+        for intent in ("hr_contact", "pending_tasks") if match.has(intent)
+    }
+
+    # a file request needs both a request word ("form", "pdf", ...) and a file name or number
+    file_spans = match.spans("file_name") + match.spans("form_number"), match.spans("file_request")
+    if all(file_spans):
+        spans["pdf_file"] = file_spans[0] + file_spans[1]
+
+    if not spans:
+        return None
+    if len(spans) > 1:
+        return IntentMatch("ambiguous", 0.0)
+
+    intent, covered = spans.popitem()
+    words = [
+        (m.start(), m.end()) for m in TOKEN_RE.finditer(q)
+        if m.group() not in FILLER_WORDS
+    ]
+    if not words:
+        return IntentMatch(intent, 1.0)
+
+    inside = sum(
+        1 for start, end in words
+        if any(s <= start and end <= e for s, e in covered)
+    )
+    return IntentMatch(intent, inside / len(words))
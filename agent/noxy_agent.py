@@ -1,12 +1,26 @@
+import asyncio
+import time
 from langchain_openai import AzureChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage, ToolMessage
 from openai import BadRequestError
-from Services.config import AZURE_API_KEY, AZURE_ENDPOINT, AZURE_DEPLOYMENT_NAME
+from opentelemetry import trace
+from Services.config import (
+    AZURE_API_KEY, AZURE_ENDPOINT, AZURE_DEPLOYMENT_NAME,
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL_SECONDS, SEMANTIC_CACHE_MAX_ENTRIES,
+    HISTORY_WINDOW_TOKENS, CONTEXT_MAX_TOKENS, ROUTER_ENABLED, ROUTER_CONFIDENCE_THRESHOLD, TOOL_TIMEOUT_SECONDS,
+)
+from Services.latency import LatencyTracker
+from Services.tracing import span, start_span, set_span_attributes
 from tools.progresstask_tool import pending_tasks_tool
-from tools.status_taskprogress import fetch_task_status_groups
+from tools.keyword_engine import match_keywords
 from tools.pdf_tool import pdf_file_tool
-from vector.search import search_vectors
+from vector.search import asearch_vectors, aembed_query
+from vector.tokens import count_tokens
+from agent.semantic_cache import SemanticCache, cache_entities
+from agent.context_builder import build_context
+from agent.request_context import RequestContext
+from agent.intent_router import route
 from tools.general_tool import general_filter_tool
 from tools.hr_tool import hr_lookup
 
@@ -74,102 +88,423 @@ prompt = ChatPromptTemplate.from_messages([
     ("human", "{question}")
 ])
 
-def retrieve_context(query: str):
-    """Retrieve context from vector search"""
-    hits = search_vectors(query)
-    return "\n".join(hits) if hits else ""
+CONTENT_FILTER_REPLY = "I'm sorry, I cannot provide that type of response. I'm here to help with HR onboarding topics like policies, documents, and requirements. How can I assist you with your onboarding?"
+BAD_REQUEST_REPLY = "I'm sorry, I encountered an error processing your request. Please try rephrasing your question about HR or onboarding topics."
+GENERIC_ERROR_REPLY = "I'm sorry, something went wrong. Please try asking your HR or onboarding question again."
+
+# yielded by astream_noxy to withdraw the text streamed so far
+STREAM_RESET = object()
+
+GREETING_PROMPT = ("The user greeted you. Reply warmly, brief, friendly, "
+                   "and within HR onboarding scope.")
+VAGUE_PROMPT = ("The user asked for help but was unclear. "
+                "Ask naturally which HR or onboarding topic they mean. Keep it short.")
+
+
+# replies for intents answered by the router without the LLM
+ROUTED_REPLY_TEMPLATES = {
+    "hr_contact": "Here is how you can reach HR. {result}",
+    "pending_tasks": "{result}",
+    "pdf_file": "{result}",
+}
+# tool results that mean "not for me"; the message then goes to the LLM
+ROUTER_NON_ANSWERS = {"", "None", "No file request detected."}
+
+
+# tools that never leave the process get a tighter timeout than TOOL_TIMEOUT_SECONDS
+TOOL_TIMEOUTS = {
+    "hr_lookup": 2,
+    "general_filter_tool": 2,
+}
+
+tool_latency = LatencyTracker()
+
+
+# answers to non-personalized questions, reused for near-duplicate questions
+response_cache = SemanticCache(
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    ttl_seconds=SEMANTIC_CACHE_TTL_SECONDS,
+    max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+)
+
+# tools whose output depends on who is asking; answers using them are never cached
+PERSONAL_TOOLS = {"pending_tasks_tool"}
+
+
+def is_personalized(message: str) -> bool:
+    return match_keywords(message).has("pending_tasks")
+
+
+def is_cacheable(message: str, history=None) -> bool:
+    # a follow-up ("and the second one?") only makes sense with its conversation,
+    # so turns that put history in the prompt are neither served from nor stored in the cache
+    return SEMANTIC_CACHE_ENABLED and not is_personalized(message) and not window_history(history)
+
+
+def lookup_cached_answer(message: str, query_vec, history=None):
+    if not is_cacheable(message, history):
+        return None
+
+    hit = response_cache.lookup(query_vec, cache_entities(message))
+    set_span_attributes(**{"semantic_cache.hit": hit is not None})
+    if hit is None:
+        return None
+
+    answer, question, score = hit
+    print(f"SEMANTIC CACHE HIT ({score:.3f}): {question!r}")
+    return answer
+
+
+def remember_answer(message: str, query_vec, tool_calls, answer: str, history=None):
+    if not answer or not is_cacheable(message, history):
+        return
+    if any(tc["name"] in PERSONAL_TOOLS for tc in tool_calls or []):
+        return
+    response_cache.store(message, query_vec, answer, cache_entities(message))
+
+
+def bad_request_reply(e: BadRequestError) -> str:
+    # Handle Azure content filter (jailbreak attempts, policy violations)
+    error_message = str(e)
+    if 'content_filter' in error_message or 'jailbreak' in error_message:
+        return CONTENT_FILTER_REPLY
+    return BAD_REQUEST_REPLY
+
+
+async def retrieve_context(query: str, embedding=None):
+    """Retrieve context from vector search, packed into CONTEXT_MAX_TOKENS"""
+    with span("retrieval"):
+        hits = await asearch_vectors(query, embedding=embedding)
+        set_span_attributes(**{"retrieval.chunks": len(hits)})
+        return build_context(hits, CONTEXT_MAX_TOKENS) if hits else ""
+
+
+def window_history(history: list, max_tokens: int = HISTORY_WINDOW_TOKENS) -> list:
+    """Keep the most recent history messages that fit in `max_tokens`, oldest first."""
+    window = []
+    used = 0
+    for turn in reversed(history or []):
+        tokens = count_tokens(turn["content"])
+        if used + tokens > max_tokens:
+            break
+        window.append(turn)
+        used += tokens
+    return list(reversed(window))
+
+
+def format_history(history: list) -> str:
+    return "\n".join(
+        f"{'User' if turn['role'] == 'user' else 'Noxy'}: {turn['content']}"
+        for turn in history
+    )
+
+
+async def build_prompt(message: str, embedding=None, history=None):
+    """System prompt + question, with recent conversation and retrieved knowledge appended when available."""
+    context = await retrieve_context(message, embedding=embedding)
+
+    full_prompt = prompt.format(question=message)
+    recent = window_history(history)
+    if recent:
+        full_prompt += f"\n\nRecent conversation:\n{format_history(recent)}"
+    if context:
+        full_prompt += f"\n\nRelevant knowledge:\n{context}"
+    return full_prompt
+
+
+def record_llm_usage(llm_span, result, prompt_text: str = None):
+    """Token counts (reported usage when available, else tiktoken estimate) and tool calls of one LLM call."""
+    usage = getattr(result, "usage_metadata", None) or {}
+    llm_span.set_attributes({
+        "llm.input_tokens": usage.get("input_tokens") or count_tokens(prompt_text or ""),
+        "llm.output_tokens": usage.get("output_tokens") or count_tokens(result.content or ""),
+        "llm.tool_calls": len(getattr(result, "tool_calls", None) or []),
+    })
+
+
+async def execute_tool_call(tool_call: dict, message: str, context: RequestContext) -> ToolMessage:
+    """Run one tool call requested by the model and wrap the result as a ToolMessage."""
+    tool_name = tool_call['name']
+
+    try:
+        # Handle each tool
+        if tool_name == "pending_tasks_tool":
+            if context.user_id:
+                task_groups = await context.task_status_groups()
+                tool_result = await pending_tasks_tool.ainvoke({
+                    "data": {
+                        "pending": task_groups.get("pending", []),
+                        "in_progress": task_groups.get("in_progress", []),
+                        "completed": task_groups.get("completed", [])
+                    }
+                })
+            else:
+                tool_result = "I need your user information to check your pending tasks. Please make sure you're logged in."
+
+        elif tool_name == "pdf_file_tool":
+            tool_result = await pdf_file_tool.ainvoke({"data": {"query": message}})
+
+        elif tool_name == "hr_lookup":
+            tool_result = await hr_lookup.ainvoke({"data": {"query": message}})
+
+        elif tool_name == "general_filter_tool":
+            tool_result = await general_filter_tool.ainvoke({"data": {"query": message}})
+
+        return ToolMessage(
+            content=str(tool_result),
+            tool_call_id=tool_call['id']
+        )
+
+    except Exception as e:
+        return ToolMessage(
+            content=f"Error executing {tool_name}: {str(e)}",
+            tool_call_id=tool_call['id']
+        )
+
+
+async def timed_tool_call(tool_call: dict, message: str, context: RequestContext) -> ToolMessage:
+    """
+    execute_tool_call with the tool's timeout; latency is recorded in tool_latency.
+
+    A tool over its timeout becomes an error ToolMessage so the turn goes on
+    without it. Only the await is abandoned: a sync tool (run by LangChain in
+    the default executor) keeps its thread until it returns, and that result
+    is discarded.
+    """
+    tool_name = tool_call['name']
+    timeout = TOOL_TIMEOUTS.get(tool_name, TOOL_TIMEOUT_SECONDS)
+    start = time.perf_counter()
+
+    with span(f"tool.{tool_name}") as tool_span:
+        try:
+            tool_message = await asyncio.wait_for(execute_tool_call(tool_call, message, context), timeout)
+            timed_out = False
+        except asyncio.TimeoutError:
+            tool_message = ToolMessage(
+                content=f"Error executing {tool_name}: timed out after {timeout}s",
+                tool_call_id=tool_call['id']
+            )
+            timed_out = True
+
+        error = tool_message.content.startswith("Error executing")
+        tool_span.set_attributes({"tool.timeout": timed_out, "tool.error": error})
+
+    elapsed = time.perf_counter() - start
+    tool_latency.record(tool_name, elapsed, error=error, timeout=timed_out)
+    print(f"TOOL {tool_name}: {elapsed * 1000:.0f} ms")
+    return tool_message
+
+
+async def answer_from_router(message: str, context: RequestContext):
+    """
+    Answer a high-confidence keyword intent straight from its tool, skipping the LLM.
+
+    Returns the templated reply, or None when the message should go to the LLM.
+    """
+    if not ROUTER_ENABLED:
+        return None
+
+    match = route(message)
+    if match is None:
+        return None
+
+    if match.confidence < ROUTER_CONFIDENCE_THRESHOLD or (match.tool == "pending_tasks_tool" and not context.user_id):
+        print(f"INTENT ROUTER: {match.intent} ({match.confidence:.2f}) -> LLM")
+        return None
+
+    tool_message = await timed_tool_call(
+        {"name": match.tool, "args": {}, "id": "intent-router"}, message, context
+    )
+    result = tool_message.content
+    if result in ROUTER_NON_ANSWERS or result.startswith("Error executing"):
+        print(f"INTENT ROUTER: {match.intent} ({match.confidence:.2f}) -> LLM, no tool answer")
+        return None
+
+    print(f"INTENT ROUTER: {match.intent} ({match.confidence:.2f}) -> {match.tool}")
+    return ROUTED_REPLY_TEMPLATES[match.intent].format(result=result)
+
+
+async def run_tool_calls(result, full_prompt: str, message: str, context: RequestContext) -> list:
+    """
+    Execute the model's tool calls concurrently and return the message list for the follow-up LLM call.
+
+    The ToolMessages keep the order of result.tool_calls, so the turn waits
+    for the slowest tool rather than the sum of all of them.
+    """
+    tool_messages = await asyncio.gather(*(
+        timed_tool_call(tool_call, message, context) for tool_call in result.tool_calls
+    ))
+    return [HumanMessage(content=full_prompt), result, *tool_messages]
+
+
+async def prepare_turn(message: str, context: RequestContext, history=None):
+    """
+    Everything before the main LLM call, shared by ask_noxy and astream_noxy.
 
-def ask_noxy(message: str, user_id: str = None, task_progress=None):
+    Returns (kind, value, query_vec) where kind is "small_talk" (value is the
+    instruction for a short LLM reply), "answer" (a routed or cached reply) or
+    "prompt" (the full prompt for the tool-calling LLM).
+    """
+    with span("general_filter"):
+        filter_result = await general_filter_tool.ainvoke({"data": {"query": message}})
+    if filter_result == "greeting":
+        return "small_talk", GREETING_PROMPT, None
+    if filter_result == "vague":
+        return "small_talk", VAGUE_PROMPT, None
+
+    with span("intent_router"):
+        routed = await answer_from_router(message, context)
+        set_span_attributes(**{"router.answered": routed is not None})
+    if routed is not None:
+        return "answer", routed, None
+
+    # one query embedding serves both the cache lookup and retrieval
+    with span("embedding.query"):
+        query_vec = await aembed_query(message)
+    with span("semantic_cache"):
+        cached = lookup_cached_answer(message, query_vec, history)
+    if cached is not None:
+        return "answer", cached, query_vec
+
+    full_prompt = await build_prompt(message, embedding=query_vec, history=history)
+    return "prompt", full_prompt, query_vec
+
+
+async def ask_noxy(message: str, user_id: str = None, task_progress=None, history=None):
     """
     Enhanced Noxy that handles multiple questions using bound tools.
+
+    Every LLM, embedding and backend call is awaited, so a chat turn never
+    blocks the event loop. `history` holds the latest conversation turns as
+    {"role", "content"} dicts; the newest ones within HISTORY_WINDOW_TOKENS are
+    added to the prompt. `task_progress` (the user's tasks, as loaded by the
+    endpoint) answers pending_tasks_tool without another backend call.
     """
-    q = message.lower()
+    context = RequestContext(user_id=user_id, task_progress=task_progress)
+
+    with span("ask_noxy"):
+        try:
+            kind, full_prompt, query_vec = await prepare_turn(message, context, history)
+            if kind == "answer":
+                return full_prompt
+            if kind == "small_talk":
+                with span("llm.small_talk"):
+                    return (await llm.ainvoke(full_prompt)).content
+
+            with span("llm.tool_selection") as llm_span:
+                result = await llm_with_tools.ainvoke(full_prompt)
+                record_llm_usage(llm_span, result, full_prompt)
+
+        except BadRequestError as e:
+            set_span_attributes(error=type(e).__name__)
+            return bad_request_reply(e)
+
+        except Exception as e:
+            # Catch any other errors
+            set_span_attributes(error=type(e).__name__)
+            return GENERIC_ERROR_REPLY
+
+        # Check if LLM wants to use tools
+        if hasattr(result, 'tool_calls') and result.tool_calls:
+            messages = await run_tool_calls(result, full_prompt, message, context)
+
+            try:
+                with span("llm.final") as llm_span:
+                    final_response = await llm_with_tools.ainvoke(messages)
+                    record_llm_usage(llm_span, final_response, "\n".join(str(m.content) for m in messages))
+            except BadRequestError as e:
+                return bad_request_reply(e)
+
+            remember_answer(message, query_vec, result.tool_calls, final_response.content, history)
+            return final_response.content
+
+        remember_answer(message, query_vec, None, result.content, history)
+        return result.content
+
+
+async def astream_noxy(message: str, user_id: str = None, task_progress=None, history=None, parent_span=None):
+    """
+    Streaming variant of ask_noxy that yields answer text as the model produces it.
+
+    The first LLM call is streamed too: if the model answers directly its tokens
+    are forwarded immediately, and if it requests tools the tool phase runs
+    before the final answer is streamed.
+
+    Text streamed before the model turns out to request tools, or before an
+    error, is withdrawn by yielding STREAM_RESET; the caller drops what it has
+    collected so the reply holds only the final answer (or the error reply).
+
+    Spans are never kept current across a `yield`; stages run under the
+    "astream_noxy" span (a child of `parent_span`) via trace.use_span instead.
+    """
+    context = RequestContext(user_id=user_id, task_progress=task_progress)
+    parent = trace.set_span_in_context(parent_span) if parent_span is not None else None
+    root = start_span("astream_noxy", context=parent)
+    root_context = trace.set_span_in_context(root)
+    streamed = False
 
     try:
-        filter_result = general_filter_tool.invoke({"data": {"query": message}})
-        if filter_result == "greeting":
-            return llm.invoke("The user greeted you. Reply warmly, brief, friendly, "
-                             "and within HR onboarding scope.").content
-        
-        if filter_result == "vague":
-            return llm.invoke("The user asked for help but was unclear. "
-                             "Ask naturally which HR or onboarding topic they mean. Keep it short.").content
-        
-        context = retrieve_context(message)
-        
-        full_prompt = prompt.format(question=message)
-        if context:
-            full_prompt += f"\n\nRelevant knowledge:\n{context}"
-        
-        result = llm_with_tools.invoke(full_prompt)
-    
+        with trace.use_span(root):
+            kind, full_prompt, query_vec = await prepare_turn(message, context, history)
+
+        if kind == "answer":
+            yield full_prompt
+            return
+
+        llm_span = start_span("llm.small_talk" if kind == "small_talk" else "llm.tool_selection", context=root_context)
+        parts = []
+        result = None
+        try:
+            async for chunk in (llm if kind == "small_talk" else llm_with_tools).astream(full_prompt):
+                result = chunk if result is None else result + chunk
+                if chunk.content:
+                    parts.append(chunk.content)
+                    streamed = True
+                    yield chunk.content
+        finally:
+            if result is not None:
+                record_llm_usage(llm_span, result, full_prompt)
+            llm_span.end()
+
+        if result is None or kind == "small_talk":
+            return
+
+        if result.tool_calls:
+            # any text before the tool calls was a preamble, not the answer
+            if streamed:
+                streamed = False
+                yield STREAM_RESET
+            with trace.use_span(root):
+                messages = await run_tool_calls(result, full_prompt, message, context)
+
+            llm_span = start_span("llm.final", context=root_context)
+            parts = []
+            final = None
+            try:
+                async for chunk in llm_with_tools.astream(messages):
+                    final = chunk if final is None else final + chunk
+                    if chunk.content:
+                        parts.append(chunk.content)
+                        streamed = True
+                        yield chunk.content
+            finally:
+                if final is not None:
+                    record_llm_usage(llm_span, final, "\n".join(str(m.content) for m in messages))
+                llm_span.end()
+
+        remember_answer(message, query_vec, result.tool_calls, "".join(parts), history)
+
     except BadRequestError as e:
-        # Handle Azure content filter (jailbreak attempts, policy violations)
-        error_message = str(e)
-        if 'content_filter' in error_message or 'jailbreak' in error_message:
-            return "I'm sorry, I cannot provide that type of response. I'm here to help with HR onboarding topics like policies, documents, and requirements. How can I assist you with your onboarding?"
-        else:
-            return "I'm sorry, I encountered an error processing your request. Please try rephrasing your question about HR or onboarding topics."
-    
+        root.set_attribute("error", type(e).__name__)
+        if streamed:
+            yield STREAM_RESET
+        yield bad_request_reply(e)
+
     except Exception as e:
-        # Catch any other errors
-        return "I'm sorry, something went wrong. Please try asking your HR or onboarding question again."
-    
-    # Check if LLM wants to use tools
-    if hasattr(result, 'tool_calls') and result.tool_calls:
-        messages = [HumanMessage(content=full_prompt), result]
-        
-        # Execute each tool call
-        for tool_call in result.tool_calls:
-            tool_name = tool_call['name']
-            tool_args = tool_call.get('args', {})
-            
-            try:
-                # Handle each tool
-                if tool_name == "pending_tasks_tool":
-                    if user_id:
-                        task_groups = fetch_task_status_groups(user_id)
-                        tool_result = pending_tasks_tool.invoke({
-                            "data": {
-                                "pending": task_groups.get("pending", []),
-                                "in_progress": task_groups.get("in_progress", []),
-                                "completed": task_groups.get("completed", [])
-                            }
-                        })
-                    else:
-                        tool_result = "I need your user information to check your pending tasks. Please make sure you're logged in."
-                
-                elif tool_name == "pdf_file_tool":
-                    tool_result = pdf_file_tool.invoke({"data": {"query": message}})
-                
-                elif tool_name == "hr_lookup":
-                    tool_result = hr_lookup.invoke({"data": {"query": message}})
-                
-                elif tool_name == "general_filter_tool":
-                    tool_result = general_filter_tool.invoke({"data": {"query": message}})
-                
-                messages.append(
-                    ToolMessage(
-                        content=str(tool_result),
-                        tool_call_id=tool_call['id']
-                    )
-                )
-            
-            except Exception as e:
-                messages.append(
-                    ToolMessage(
-                        content=f"Error executing {tool_name}: {str(e)}",
-                        tool_call_id=tool_call['id']
-                    )
-                )
-        
-        try:
-            final_response = llm_with_tools.invoke(messages)
-            return final_response.content
-        except BadRequestError as e:
-            if 'content_filter' in str(e) or 'jailbreak' in str(e):
-                return "I'm sorry, I cannot provide that type of response. I'm here to help with HR onboarding topics like policies, documents, and requirements. How can I assist you with your onboarding?"
-            else:
-                return "I'm sorry, I encountered an error processing your request. Please try rephrasing your question about HR or onboarding topics."
-    
-    return result.content
\ No newline at end of file
+        root.set_attribute("error", type(e).__name__)
+        if streamed:
+            yield STREAM_RESET
+        yield GENERIC_ERROR_REPLY
+
+    finally:
+        root.end()
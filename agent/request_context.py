@@ -0,0 +1,20 @@
+from tools.status_taskprogress import group_task_status, fetch_task_status_groups
+
+
+class RequestContext:
+    """
+    Data already loaded for the current chat turn.
+
+    Built once by ask_noxy / astream_noxy and handed to every tool call, so
+    tools use what the endpoint fetched instead of fetching it again.
+    """
+
+    def __init__(self, user_id: str = None, task_progress: list = None):
+        self.user_id = user_id
+        self.task_progress = task_progress
+
+    async def task_status_groups(self) -> dict:
+        """The user's tasks grouped by status; only calls the backend if the endpoint did not load them."""
+        if self.task_progress is not None:
+            return group_task_status(self.task_progress)
+        return await fetch_task_status_groups(self.user_id)
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+
+from tools.similarity import SimilarityMatrix
+from tools.keyword_engine import QUERY_SYNONYMS, match_keywords
+
+
+def cache_entities(message: str) -> frozenset:
+    """
+    Form numbers and agencies named in a message.
+
+    Questions differing only in these ("BIR form 1904" / "BIR form 1905")
+    embed almost identically, so a cached answer must name the same ones.
+    """
+    match = match_keywords(message)
+    names = match.keywords("synonym") + match.keywords("file_name")
+    return frozenset(match.form_numbers) | frozenset(QUERY_SYNONYMS.get(n, n) for n in names)
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on query embeddings.
+
+    A lookup returns the stored answer of the most similar previous question
+    when its cosine similarity is at least `threshold` and it was stored with
+    the same `entities` (see cache_entities). Entries expire after
+    `ttl_seconds` and the least recently used entry is evicted beyond
+    `max_entries`.
+    """
+
+    def __init__(self, threshold: float = 0.92, ttl_seconds: float = 3600, max_entries: int = 512):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()  # question -> (vector, answer, stored_at, entities)
+        self._matrix = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expire(self, now: float):
+        expired = [q for q, (_, _, at, _) in self._entries.items() if now - at > self.ttl_seconds]
+        for q in expired:
+            del self._entries[q]
+        if expired:
+            self._matrix = None
+
+    def lookup(self, vector, entities: frozenset = frozenset()):
+        """Return (answer, matched_question, score) for a near-duplicate question, or None."""
+        with self._lock:
+            self._expire(time.monotonic())
+
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            if self._matrix is None:
+                questions = list(self._entries)
+                self._matrix = SimilarityMatrix(
+                    [self._entries[q][0] for q in questions], items=questions
+                )
+
+            # best match above the threshold that names the same entities
+            for score, question in self._matrix.top_k(vector, k=len(self._entries)):
+                if score < self.threshold:
+                    break
+                if self._entries[question][3] == entities:
+                    self._entries.move_to_end(question)
+                    self.hits += 1
+                    return self._entries[question][1], question, score
+
+            self.misses += 1
+            return None
+
+    def store(self, question: str, vector, answer: str, entities: frozenset = frozenset()):
+        with self._lock:
+            self._entries[question] = (vector, answer, time.monotonic(), frozenset(entities))
+            self._entries.move_to_end(question)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+            self._matrix = None
+
+    def invalidate(self):
+        """Drop every entry, e.g. after the knowledge base changed."""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
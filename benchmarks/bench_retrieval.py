@@ -0,0 +1,226 @@
+"""
+Retrieval benchmark: recall@k, MRR and latency of search_vectors over the knowledge base.
+
+Every question in KnowledgeBaseFiles/*.json is a query labeled with its entry
+id; a retrieved chunk is relevant when it was cut from that entry. All
+knowledge-base files (Markdown included) are indexed, so the other entries act
+as distractors. The knowledge base is chunked and indexed once per chunk size
+in a temporary ChromaDB, then every query runs through search_vectors for each
+retrieval mode and k.
+
+Queries are the stored question texts (or their keywords with --queries
+keywords), so absolute recall is optimistic; compare runs against each other.
+Query embeddings are computed before timing, so latency is the search layer.
+
+Modes: similarity and mmr are vector-only, hybrid and hybrid_mmr fuse BM25
+(see RETRIEVAL_HYBRID).
+
+Usage:
+    python -m benchmarks.bench_retrieval
+    python -m benchmarks.bench_retrieval --k 1 3 5 10 --chunk-sizes 250 500 1000 --modes similarity hybrid
+    python -m benchmarks.bench_retrieval --embeddings azure   # the configured Azure model instead
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+KB_DIR = REPO_DIR / "KnowledgeBaseFiles"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# mode name -> (RETRIEVAL_MODE, RETRIEVAL_HYBRID)
+MODES = {
+    "similarity": ("similarity", False),
+    "mmr": ("mmr", False),
+    "hybrid": ("similarity", True),
+    "hybrid_mmr": ("mmr", True),
+}
+
+
+def load_labeled_queries(kb_dir: Path = KB_DIR, field: str = "question") -> dict:
+    """
+    Query text -> ids of the entries that answer it, from the JSON knowledge bases.
+
+    `field` is "question" (the stored question) or "keywords" (the entry's
+    keyword list joined into one query; entries without keywords are skipped).
+    """
+    queries = {}
+    for path in sorted(glob.glob(str(kb_dir / "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        dep_root = data.get("departmentKnowledgeBase")
+        if dep_root:
+            entries = [faq for dept in dep_root.get("departments", []) for faq in dept.get("faqs", [])]
+            entries += dep_root.get("crossDepartmentFAQs", [])
+        else:
+            kb_root = data.get("knowledgeBase", data)
+            entries = [entry for cat in kb_root.get("categories", []) for entry in cat.get("entries", [])]
+
+        for entry in entries:
+            if field == "keywords":
+                text = " ".join(entry.get("keywords") or [])
+            else:
+                text = entry.get("question") or ""
+            if text.strip() and entry.get("id"):
+                queries.setdefault(text.strip(), set()).add(entry["id"])
+    return queries
+
+
+def load_corpus(kb_dir: Path = KB_DIR) -> list:
+    """Every knowledge-base document, as the vector store builder loads them."""
+    from vector.loaders import load_json_kb, load_md_kb
+
+    docs = []
+    for path in sorted(glob.glob(str(kb_dir / "*.json"))):
+        docs.extend(load_json_kb(path))
+    for path in sorted(glob.glob(str(kb_dir / "*.md"))):
+        docs.extend(load_md_kb(path))
+    return docs
+
+
+def build_collection(docs: list, chunk_size: int, chunk_overlap: int) -> tuple:
+    """
+    Chunk `docs` into a fresh collection and make it the active one.
+
+    Returns (chunk text -> entry ids, number of chunks, indexing seconds).
+    """
+    from vector.chunker import chunk_documents
+    from vector.store import set_active_collection_name, get_vector_db
+
+    chunks = chunk_documents(docs, chunk_size=chunk_size, chunk_overlap=min(chunk_overlap, chunk_size // 5))
+    labels = {}
+    for c in chunks:
+        if c.metadata.get("id"):
+            labels.setdefault(c.page_content, set()).add(c.metadata["id"])
+
+    set_active_collection_name(f"bench_chunks_{chunk_size}")
+    start = time.perf_counter()
+    get_vector_db().add_documents(chunks)
+    return labels, len(chunks), time.perf_counter() - start
+
+
+def evaluate(queries: dict, labels: dict, mode: str, k: int) -> dict:
+    """recall@k, MRR and per-query latency of search_vectors for one mode and k."""
+    import vector.search as search
+
+    retrieval_mode, search.RETRIEVAL_HYBRID = MODES[mode]
+    search.invalidate_retrieval_cache()
+
+    recalls, reciprocal_ranks, latencies = [], [], []
+    for query, relevant in queries.items():
+        start = time.perf_counter()
+        results = search.search_vectors(query, k=k, mode=retrieval_mode, score_threshold=0)
+        latencies.append(time.perf_counter() - start)
+
+        found = set()
+        first_rank = None
+        for rank, text in enumerate(results, start=1):
+            ids = labels.get(text, set()) & relevant
+            if ids and first_rank is None:
+                first_rank = rank
+            found |= ids
+
+        recalls.append(len(found) / len(relevant))
+        reciprocal_ranks.append(1 / first_rank if first_rank else 0.0)
+
+    ms = np.array(latencies) * 1000
+    return {
+        "mode": mode,
+        "k": k,
+        "queries": len(queries),
+        "recall": float(np.mean(recalls)),
+        "mrr": float(np.mean(reciprocal_ranks)),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+    }
+
+
+def run(args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="noxy-retrieval-"))
+    os.environ["CHROMA_PERSIST_DIR"] = str(workdir / "chroma")
+    os.environ["EMBEDDING_CACHE_PATH"] = str(workdir / "embeddings.sqlite3")
+    os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+    if args.embeddings == "hashing":
+        os.environ["AZURE_EMBEDDING_DEPLOYMENT"] = "offline-hashing"
+
+    from vector.embeddings import embedding_model
+    from benchmarks.fakes import HashingEmbeddings
+    from benchmarks.load_test import git_commit
+
+    if args.embeddings == "hashing":
+        embedding_model._underlying = HashingEmbeddings(dim=args.dim)
+
+    queries = load_labeled_queries(field=args.queries)
+    docs = load_corpus()
+    # query vectors come from the embedding cache during the timed runs
+    embedding_model.embed_documents(list(queries))
+
+    rows = []
+    try:
+        for chunk_size in args.chunk_sizes:
+            labels, chunk_count, index_seconds = build_collection(docs, chunk_size, args.chunk_overlap)
+            print(f"chunk size {chunk_size}: {chunk_count} chunks indexed in {index_seconds:.1f}s")
+            for mode in args.modes:
+                for k in args.k:
+                    row = evaluate(queries, labels, mode, k)
+                    row.update({"chunk_size": chunk_size, "chunks": chunk_count, "index_seconds": index_seconds})
+                    rows.append(row)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "benchmark": "retrieval",
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "embeddings": args.embeddings,
+            "queries": args.queries,
+            "query_count": len(queries),
+            "documents": len(docs),
+            "chunk_overlap": args.chunk_overlap,
+        },
+        "results": rows,
+    }
+
+
+def main():
+    from vector.chunker import CHUNK_SIZE, CHUNK_OVERLAP
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[250, CHUNK_SIZE, 1000])
+    parser.add_argument("--chunk-overlap", type=int, default=CHUNK_OVERLAP, help="capped at a fifth of the chunk size")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=["similarity", "mmr", "hybrid"])
+    parser.add_argument("--queries", choices=["question", "keywords"], default="question")
+    parser.add_argument("--embeddings", choices=["hashing", "azure"], default="hashing")
+    parser.add_argument("--dim", type=int, default=384, help="hashing embedding size")
+    parser.add_argument("--output", help="JSON results path (default benchmarks/results/retrieval_<commit>.json)")
+    args = parser.parse_args()
+
+    results = run(args)
+    config = results["config"]
+    print(f"\n{config['query_count']} queries ({config['queries']}), {config['documents']} documents, "
+          f"{config['embeddings']} embeddings")
+    print(f"{'chunk':>6} {'mode':>11} {'k':>3} {'recall@k':>9} {'MRR':>6} {'mean (ms)':>10} {'p95 (ms)':>9}")
+    for row in results["results"]:
+        print(f"{row['chunk_size']:>6} {row['mode']:>11} {row['k']:>3} {row['recall']:>9.3f} {row['mrr']:>6.3f} "
+              f"{row['mean_ms']:>10.2f} {row['p95_ms']:>9.2f}")
+
+    output = Path(args.output or RESULTS_DIR / f"retrieval_{results['commit'] or 'local'}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"\nresults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Micro-benchmark: pure-Python cosine_similarity vs the NumPy SimilarityMatrix.
+
+Usage:
+    python -m benchmarks.bench_similarity
+    python -m benchmarks.bench_similarity --sizes 10 1000 100000 --dim 1536
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from tools.similarity import SimilarityMatrix
+
+PYTHON_SAMPLE_LIMIT = 10000
+
+
+def cosine_similarity(a, b):
+    # the pure-Python scorer tools.file_matcher used before SimilarityMatrix
+    return sum(x*y for x, y in zip(a, b)) / (
+        math.sqrt(sum(x*x for x in a)) * math.sqrt(sum(y*y for y in b))
+    )
+
+
+def _timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    rows = []
+
+    for n in sizes:
+        candidates = rng.standard_normal((n, dim), dtype=np.float32)
+        query = rng.standard_normal(dim, dtype=np.float32)
+
+        # Python lists of 100k x 1536 floats do not fit in memory, so the
+        # pure-Python scan is timed on a sample and extrapolated linearly
+        sample = min(n, PYTHON_SAMPLE_LIMIT)
+        cand_lists = candidates[:sample].tolist()
+        query_list = query.tolist()
+        py_repeat = 3 if sample <= 1000 else 1
+
+        def python_scan():
+            return max(range(sample), key=lambda i: cosine_similarity(query_list, cand_lists[i]))
+
+        build_start = time.perf_counter()
+        matrix = SimilarityMatrix(candidates)
+        build_time = time.perf_counter() - build_start
+
+        def numpy_scan():
+            return matrix.top_k(query, k=1)
+
+        py_time = _timeit(python_scan, py_repeat) * (n / sample)
+        del cand_lists
+        np_time = _timeit(numpy_scan, 5)
+
+        rows.append({
+            "candidates": n,
+            "python_ms": py_time * 1000,
+            "numpy_ms": np_time * 1000,
+            "numpy_build_ms": build_time * 1000,
+            "speedup": py_time / np_time if np_time else math.inf,
+            "python_extrapolated": sample < n,
+        })
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--seed", type=int, default=0, help="fixed so runs compare like for like")
+    args = parser.parse_args()
+
+    print(f"dim={args.dim} seed={args.seed}")
+    print(f"{'candidates':>10} {'python (ms)':>12} {'numpy (ms)':>11} {'build (ms)':>11} {'speedup':>9}")
+    for row in run(args.sizes, args.dim, args.seed):
+        print(
+            f"{row['candidates']:>10} {row['python_ms']:>12.2f} {row['numpy_ms']:>11.3f} "
+            f"{row['numpy_build_ms']:>11.3f} {row['speedup']:>8.0f}x"
+            + ("  (python extrapolated)" if row["python_extrapolated"] else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
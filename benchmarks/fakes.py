@@ -0,0 +1,121 @@
+"""
+Deterministic offline stand-ins for the Azure models, used by the benchmarks.
+
+HashingEmbeddings replaces AzureOpenAIEmbeddings and FakeChatModel replaces
+AzureChatOpenAI; both can add a fixed per-call latency to mimic the network.
+"""
+import asyncio
+import hashlib
+import time
+import zlib
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from vector.lexical import tokenize
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Hashed word and word-pair counts, L2-normalized.
+
+    The same text always gets the same vector and texts sharing words score
+    higher, so retrieval quality can be compared offline between changes.
+    """
+
+    def __init__(self, dim: int = 384, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+
+    def _vector(self, text: str) -> list:
+        words = tokenize(text)
+        # text without words ("---") hashes as a whole, so no vector is all zeros
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])] or [text]
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vec[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: list) -> list:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> list:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list) -> list:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    async def aembed_query(self, text: str) -> list:
+        return (await self.aembed_documents([text]))[0]
+
+
+# tools the fake model "selects"; picked per prompt from a stable hash
+FAKE_TOOL_CHOICES = ("pending_tasks_tool", "pdf_file_tool", "hr_lookup")
+
+
+class FakeChatModel:
+    """
+    Chat model answering after `latency` seconds, with token usage reported.
+
+    A `tool_rate` share of first calls (chosen by a hash of the prompt, so runs
+    repeat exactly) request one tool; the follow-up call on the tool results
+    and every other call answer with plain text.
+    """
+
+    def __init__(self, latency: float = 0.0, tool_rate: float = 0.3):
+        self.latency = latency
+        self.tool_rate = tool_rate
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _reply(self, prompt) -> AIMessage:
+        text = prompt if isinstance(prompt, str) else "\n".join(str(m.content) for m in prompt)
+        digest = zlib.crc32(text.encode("utf-8"))
+        usage = {"input_tokens": len(text) // 4, "output_tokens": 40, "total_tokens": len(text) // 4 + 40}
+
+        if isinstance(prompt, str) and digest % 100 < self.tool_rate * 100:
+            tool = FAKE_TOOL_CHOICES[digest % len(FAKE_TOOL_CHOICES)]
+            return AIMessage(content="", tool_calls=[{"name": tool, "args": {}, "id": f"call-{digest:x}"}],
+                             usage_metadata=usage)
+
+        content = ("Thanks for asking. Here is what the onboarding guide says about that topic, "
+                   "and let me know if you need anything else.")
+        return AIMessage(content=content, usage_metadata=usage)
+
+    def invoke(self, prompt, **kwargs) -> AIMessage:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._reply(prompt)
+
+    async def ainvoke(self, prompt, **kwargs) -> AIMessage:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._reply(prompt)
+
+    async def astream(self, prompt, **kwargs):
+        reply = self._reply(prompt)
+        if reply.tool_calls:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            call = reply.tool_calls[0]
+            yield AIMessageChunk(content="", usage_metadata=reply.usage_metadata, tool_call_chunks=[
+                {"name": call["name"], "args": "{}", "id": call["id"], "index": 0}
+            ])
+            return
+
+        # the latency is spread over the words, like a streamed completion
+        words = reply.content.split(" ")
+        for i, word in enumerate(words):
+            if self.latency:
+                await asyncio.sleep(self.latency / len(words))
+            yield AIMessageChunk(content=word if i == 0 else f" {word}",
+                                 usage_metadata=reply.usage_metadata if i == 0 else None)
@@ -0,0 +1,369 @@
+"""
+Load test for the Noxy API with local stand-ins for every external service.
+
+main.app is served by uvicorn inside this process with:
+    - FakeChatModel and HashingEmbeddings (benchmarks.fakes) instead of Azure OpenAI
+    - a SQLite file instead of SQL Server (DATABASE_URL / ASYNC_DATABASE_URL)
+    - a stub of the onboarding backend (blob listing, user tasks) that also
+      serves the KnowledgeBaseFiles for /upload-document
+    - a temporary ChromaDB, embedding cache and file index
+
+/chat, /history and /upload-document are each driven at every concurrency
+level; RPS and p50/p95/p99 latency per endpoint are printed and written as
+JSON so runs on different commits can be compared (--baseline).
+
+Usage:
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --concurrency 1 16 64 --requests 500 --llm-latency 0.8
+    python -m benchmarks.load_test --baseline benchmarks/results/load_test_abc1234.json
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+KB_DIR = REPO_DIR / "KnowledgeBaseFiles"
+PDF_DIR = REPO_DIR / "MockData"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+ENDPOINTS = ("chat", "history", "upload")
+
+# a mix of routed, small-talk, retrieval and tool-calling turns
+CHAT_MESSAGES = [
+    "hello",
+    "what are my pending requirements",
+    "how do I register for SSS",
+    "can I get the BIR form 1904",
+    "what is the dress code policy",
+    "how many vacation leave days do new employees get",
+    "how do I contact HR",
+    "what documents do I need for PhilHealth",
+    "when is the first payroll cutoff",
+    "what should I bring on my first day",
+]
+
+STUB_TASKS = [
+    {"taskId": 1, "taskTitle": "Submit SSS E1 form", "status": "pending"},
+    {"taskId": 2, "taskTitle": "Upload NBI clearance", "status": "in_progress"},
+    {"taskId": 3, "taskTitle": "Sign employment contract", "status": "completed"},
+]
+
+
+class _BackendHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        if self.path == "/api/onboarding/materials/blobs":
+            self._send(json.dumps([f"onboarding/{p.name}" for p in sorted(PDF_DIR.glob("*.pdf"))]).encode())
+        elif self.path.startswith("/api/onboarding/user-tasks/"):
+            self._send(json.dumps(STUB_TASKS).encode())
+        elif self.path.startswith("/files/") and (KB_DIR / self.path[len("/files/"):]).is_file():
+            self._send((KB_DIR / self.path[len("/files/"):]).read_bytes(), "application/octet-stream")
+        else:
+            self.send_error(404)
+
+    def _send(self, body: bytes, content_type: str = "application/json"):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_backend(latency: float) -> ThreadingHTTPServer:
+    """Stand-in for the ASP.NET backend on localhost:5164, on a free local port."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _BackendHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, name="stub-backend", daemon=True).start()
+    return server
+
+
+def configure_environment(workdir: Path, backend_url: str):
+    """
+    Point the app at local resources. Must run before main is imported.
+
+    Connection settings are forced so a developer .env can never send load to a
+    real database; tuning settings (caches, router, pools) keep any value set
+    in the environment.
+    """
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{workdir / 'noxy.db'}",
+        "ASYNC_DATABASE_URL": f"sqlite+aiosqlite:///{workdir / 'noxy.db'}",
+        "BACKEND_BASE_URL": backend_url,
+        "CHROMA_PERSIST_DIR": str(workdir / "chroma"),
+        "EMBEDDING_CACHE_PATH": str(workdir / "embeddings.sqlite3"),
+        "FILE_INDEX_PATH": str(workdir / "file_index.json"),
+        "AZURE_EMBEDDING_DEPLOYMENT": "offline-hashing",
+        "FOLLOWUP_GENERATE": "false",
+        "TRACING_EXPORTER": "none",
+    })
+    for key, value in {
+        "AZURE_OPENAI_API_KEY": "offline",
+        "AZURE_OPENAI_ENDPOINT": "https://offline.invalid",
+        "AZURE_OPENAI_DEPLOYMENT_NAME": "offline",
+        "AZURE_EMBEDDING_API_KEY": "offline",
+        "AZURE_EMBEDDING_ENDPOINT": "https://offline.invalid",
+        "AZURE_STORAGE_ACCOUNT_NAME": "offline",
+        "ANONYMIZED_TELEMETRY": "False",
+    }.items():
+        os.environ.setdefault(key, value)
+
+
+def install_fakes(llm_latency: float, embedding_latency: float, tool_rate: float):
+    """Swap the Azure chat and embedding clients for the offline fakes."""
+    import agent.noxy_agent as noxy_agent
+    from vector.embeddings import embedding_model
+    from benchmarks.fakes import FakeChatModel, HashingEmbeddings
+
+    chat = FakeChatModel(latency=llm_latency, tool_rate=tool_rate)
+    noxy_agent.llm = chat
+    noxy_agent.llm_with_tools = chat.bind_tools([])
+    # the cache layer stays in place; only its backing model changes
+    embedding_model._underlying = HashingEmbeddings(latency=embedding_latency)
+
+
+def prepare_database(users: int):
+    """Create the schema in the SQLite file and add the benchmark users."""
+    from Data.chatbot_db import engine, async_engine, SessionLocal
+    from Models.dataModels import Base, ApplicationUser
+
+    # SQLite has no "dbo" schema; the tables live in the main database instead
+    for e in (engine, async_engine.sync_engine):
+        e.update_execution_options(schema_translate_map={"dbo": None})
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    Base.metadata.create_all(engine)
+
+    with SessionLocal() as db:
+        db.add_all(ApplicationUser(Id=f"bench-{i}", UserName=f"bench-user-{i}") for i in range(users))
+        db.commit()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def serve_app():
+    """Run main.app with uvicorn in a background thread; yields the base URL."""
+    import uvicorn
+    import main
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="uvicorn", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("uvicorn failed to start")
+        time.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def kb_files() -> list:
+    return sorted(p.name for p in KB_DIR.iterdir() if p.suffix in (".json", ".md"))
+
+
+def build_request(endpoint: str, i: int, backend_url: str, users: int) -> tuple:
+    """(method, path, JSON body) of the i-th request of an endpoint's run."""
+    username = f"bench-user-{i % users}"
+    if endpoint == "chat":
+        return "POST", "/chat", {"username": username, "message": CHAT_MESSAGES[i % len(CHAT_MESSAGES)]}
+    if endpoint == "history":
+        return "GET", f"/history/{username}?limit=20", None
+    files = kb_files()
+    return "POST", "/upload-document", {"url": f"{backend_url}/files/{files[i % len(files)]}"}
+
+
+def seed_knowledge_base(base_url: str, backend_url: str):
+    """Upload every knowledge-base file once (untimed) so /chat has something to retrieve."""
+    import httpx
+
+    for name in kb_files():
+        response = httpx.post(f"{base_url}/upload-document", json={"url": f"{backend_url}/files/{name}"}, timeout=300)
+        if not is_success(response):
+            raise RuntimeError(f"seeding {name} failed: {response.text}")
+
+
+def is_success(response) -> bool:
+    # the endpoints report most failures in a 200 body rather than the status code
+    if response.status_code >= 400:
+        return False
+    body = response.json()
+    return not (isinstance(body, dict) and ("error" in body or body.get("success") is False))
+
+
+def summarize(endpoint: str, concurrency: int, latencies: list, errors: int, elapsed: float) -> dict:
+    ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed,
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(ms.max()),
+    }
+
+
+async def run_phase(base_url: str, endpoint: str, requests: int, concurrency: int,
+                    backend_url: str, users: int) -> dict:
+    """Send `requests` requests to one endpoint from `concurrency` workers."""
+    import httpx
+
+    latencies = []
+    errors = 0
+    counter = itertools.count()
+
+    async def worker(client):
+        nonlocal errors
+        while (i := next(counter)) < requests:
+            method, path, body = build_request(endpoint, i, backend_url, users)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                ok = is_success(response)
+            except (httpx.HTTPError, ValueError):
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return summarize(endpoint, concurrency, latencies, errors, elapsed)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(rows: list, baseline: dict = None, file=sys.stdout):
+    previous = {(r["endpoint"], r["concurrency"]): r for r in (baseline or {}).get("results", [])}
+    print(f"{'endpoint':>8} {'conc':>5} {'reqs':>5} {'errors':>6} {'rps':>8} "
+          f"{'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}", file=file)
+    for row in rows:
+        line = (f"{row['endpoint']:>8} {row['concurrency']:>5} {row['requests']:>5} {row['errors']:>6} "
+                f"{row['rps']:>8.1f} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+        before = previous.get((row["endpoint"], row["concurrency"]))
+        if before:
+            line += (f"   rps {100 * (row['rps'] / before['rps'] - 1):+.0f}%"
+                     f", p95 {100 * (row['p95_ms'] / before['p95_ms'] - 1):+.0f}%")
+        print(line, file=file)
+
+
+def run(args) -> dict:
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="noxy-load-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    backend = start_stub_backend(args.backend_latency)
+    backend_url = f"http://127.0.0.1:{backend.server_address[1]}"
+    configure_environment(workdir, backend_url)
+
+    out = sys.stdout
+    # the app logs every request with print(); keep the report readable
+    rows = []
+    try:
+        with open(os.devnull, "w") as devnull, \
+                (contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)):
+            install_fakes(args.llm_latency, args.embedding_latency, args.tool_rate)
+            prepare_database(args.users)
+            with serve_app() as base_url:
+                seed_knowledge_base(base_url, backend_url)
+                for endpoint in args.endpoints:
+                    count = args.upload_requests if endpoint == "upload" else args.requests
+                    for concurrency in args.concurrency:
+                        row = asyncio.run(run_phase(base_url, endpoint, count, concurrency, backend_url, args.users))
+                        rows.append(row)
+                        print(f"{endpoint} x{concurrency}: {row['rps']:.1f} rps, p95 {row['p95_ms']:.0f} ms",
+                              file=out)
+    finally:
+        backend.shutdown()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "benchmark": "load_test",
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "upload_requests": args.upload_requests,
+            "users": args.users,
+            "llm_latency": args.llm_latency,
+            "embedding_latency": args.embedding_latency,
+            "backend_latency": args.backend_latency,
+            "tool_rate": args.tool_rate,
+        },
+        "results": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per /chat and /history run")
+    parser.add_argument("--upload-requests", type=int, default=20, help="requests per /upload-document run")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per fake LLM call")
+    parser.add_argument("--embedding-latency", type=float, default=0.02, help="seconds per fake embedding call")
+    parser.add_argument("--backend-latency", type=float, default=0.02, help="seconds per stub backend response")
+    parser.add_argument("--tool-rate", type=float, default=0.3, help="share of LLM turns that call a tool")
+    parser.add_argument("--output", help="JSON results path (default benchmarks/results/load_test_<commit>.json)")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--workdir", help="keep the SQLite DB and Chroma files here instead of a temp dir")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own log output")
+    args = parser.parse_args()
+
+    results = run(args)
+
+    output = Path(args.output or RESULTS_DIR / f"load_test_{results['commit'] or 'local'}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+    print()
+    print_results(results["results"], baseline)
+    print(f"\nresults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Shared test setup: the app runs against local stand-ins for every external service.
+
+The environment is configured before any test module imports the app, so
+settings read at import time (database URLs, Chroma directory, caches)
+point at a temporary directory and Azure is never contacted.
+"""
+
+import tempfile
+import uuid
+from pathlib import Path
+
+import pytest
+
+from benchmarks.load_test import configure_environment
+
+TEST_DIR = Path(tempfile.mkdtemp(prefix="noxy-tests-"))
+# nothing listens on the discard port, so backend calls fail fast
+configure_environment(TEST_DIR, "http://127.0.0.1:9")
+
+
+@pytest.fixture(scope="session")
+def database():
+    """SQLite schema for the app models; returns the sync session factory."""
+    from benchmarks.load_test import prepare_database
+    from Data.chatbot_db import SessionLocal
+
+    prepare_database(users=0)
+    return SessionLocal
+
+
+@pytest.fixture
+def chat_app(database):
+    """main.app with FakeChatModel and HashingEmbeddings in place of Azure OpenAI."""
+    from benchmarks.load_test import install_fakes
+    import main
+
+    install_fakes(llm_latency=0.0, embedding_latency=0.0, tool_rate=0.0)
+    main.convo_cache.clear()
+    return main
+
+
+@pytest.fixture
+def make_user(database):
+    """Add an ApplicationUser with a unique name; returns (user id, user name)."""
+    from Models.dataModels import ApplicationUser
+
+    def make():
+        user_id = f"test-{uuid.uuid4().hex[:8]}"
+        with database() as db:
+            db.add(ApplicationUser(Id=user_id, UserName=f"{user_id}-name"))
+            db.commit()
+        return user_id, f"{user_id}-name"
+
+    return make
@@ -1,20 +1,56 @@
-from fastapi import FastAPI, Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from Data.chatbot_db import SessionLocal, engine
+from sqlalchemy import select, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from Data.chatbot_db import get_async_db, async_engine, pool_stats
+from opentelemetry import trace
+from Services.tracing import setup_tracing, shutdown_tracing, span, start_span, set_span_attributes
+from Services.metrics import registry
 from Models.dataModels import Base, ApplicationUser, Conversation, ChatMessage
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse
 import os
+import json
+import threading
+from datetime import datetime
 from vector.store import get_vector_db, delete_documents_by_url
 from vector.inject import inject_document_from_url
-from agent.noxy_agent import ask_noxy
+from vector.embeddings import embedding_model
+from vector.search import retrieval_cache, invalidate_retrieval_cache, warm_lexical_index
+from agent.noxy_agent import ask_noxy, astream_noxy, response_cache, tool_latency, STREAM_RESET
+from agent.context_builder import context_usage
+from tools.status_taskprogress import http_client, task_status_cache
+from tools.pdf_fetch import blob_catalog
+from LLM.llm_followup import warm_followups
+from Services.config import (
+    HISTORY_WINDOW_MESSAGES, HISTORY_PAGE_SIZE, HISTORY_MAX_PAGE_SIZE,
+    CONVO_CACHE_MAX_ENTRIES, CONVO_CACHE_TTL_SECONDS,
+)
+from Services.ttl_cache import TTLCache
 from Models.dataModels import UserOnboardingTaskProgress, OnboardingTask
 
 
 get_vector_db()
 
-app = FastAPI(title="Chatbot API")
+# ("id", userId) / ("name", username) -> (user_id, convo_id); skips the lookups on repeat turns
+convo_cache = TTLCache(max_entries=CONVO_CACHE_MAX_ENTRIES, ttl_seconds=CONVO_CACHE_TTL_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_tracing()
+    # warm the blob listing so the first file request does not wait on the backend
+    blob_catalog.refresh_in_background()
+    warm_followups()
+    threading.Thread(target=warm_lexical_index, name="lexical-index", daemon=True).start()
+    yield
+    await http_client.aclose()
+    await async_engine.dispose()
+    shutdown_tracing()
+
+
+app = FastAPI(title="Chatbot API", lifespan=lifespan)
 
 # CORS middleware for Vite development and ASP.NET backend
 app.add_middleware(
@@ -80,111 +116,404 @@ class UpdateDocumentRequest(BaseModel):
             }
         }
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @app.get("/")
 def home():
     return {"message": "Noxy API is running"}
 
 
-@app.post("/chat")
-def chat_endpoint(request: ChatRequest, db: Session = Depends(get_db)):
+def user_cache_key(user_id: str = None, username: str = None):
+    return ("id", user_id) if user_id else ("name", username)
+
+
+def user_condition(user_id: str = None, username: str = None):
     # Look up user by userId first, then by username
-    user = None
-    if request.userId:
-        user = db.query(ApplicationUser).filter(ApplicationUser.Id == request.userId).first()
-    elif request.username:
-        user = db.query(ApplicationUser).filter(ApplicationUser.UserName == request.username).first()
-
-    if not user:
-        return {"error": "User not found"}
-
-    convo = (
-        db.query(Conversation)
-        .filter(Conversation.UserId == user.Id)
+    if user_id:
+        return ApplicationUser.Id == user_id
+    return ApplicationUser.UserName == username
+
+
+async def resolve_chat_context(request: ChatRequest, db: AsyncSession, window: int = HISTORY_WINDOW_MESSAGES):
+    """
+    Resolve the chat user, their latest conversation and its last `window` messages.
+
+    A cached (user, conversation) pair needs a single message query. Otherwise
+    user, latest conversation and recent messages come back in one combined
+    query. A missing conversation is committed right away, so its insert does
+    not hold a transaction open while the LLM answers and survives a stream
+    the client abandons.
+
+    Returns:
+        (user_id, convo_id, recent messages oldest first), or (None, None, []) if the user is unknown
+    """
+    key = user_cache_key(request.userId, request.username)
+    cached = convo_cache.get(key)
+    set_span_attributes(**{"conversation_cache.hit": bool(cached)})
+    if cached:
+        user_id, convo_id = cached
+        return user_id, convo_id, await load_messages(db, convo_id, window)
+
+    condition = user_condition(request.userId, request.username)
+
+    latest_convo = (
+        select(Conversation.ConvoId)
+        .join(ApplicationUser, Conversation.UserId == ApplicationUser.Id)
+        .where(condition)
         .order_by(Conversation.StartedAt.desc())
-        .first()
+        .limit(1)
+        .scalar_subquery()
     )
-    if not convo:
-        convo = Conversation(UserId=user.Id)
-        db.add(convo)
-        db.commit()
-        db.refresh(convo)
+    user_q = select(ApplicationUser.Id.label("UserId"), latest_convo.label("ConvoId")).where(condition).subquery()
+    recent_q = (
+        select(
+            ChatMessage,
+            func.row_number().over(order_by=ChatMessage.MessageId.desc()).label("rn"),
+        )
+        .where(ChatMessage.ConvoId == latest_convo)
+        .subquery()
+    )
+
+    rows = (await db.execute(
+        select(user_q.c.UserId, user_q.c.ConvoId, recent_q)
+        .select_from(user_q.outerjoin(recent_q, and_(recent_q.c.ConvoId == user_q.c.ConvoId, recent_q.c.rn <= window)))
+        .order_by(recent_q.c.MessageId)
+    )).all()
 
-    chat_history = db.query(ChatMessage).filter(ChatMessage.ConvoId == convo.ConvoId).all()
+    if not rows:
+        return None, None, []
 
-    conversation_history = []
+    user_id, convo_id = rows[0].UserId, rows[0].ConvoId
+    # the outer join yields one all-null message row when the conversation is empty
+    recent = [r for r in rows if r.MessageId is not None]
+
+    if convo_id is None:
+        convo = Conversation(UserId=user_id)
+        db.add(convo)
+        await db.commit()
+        convo_id = convo.ConvoId
+
+    return user_id, convo_id, recent
 
-    for msg in chat_history:
-        role = "user" if msg.Sender == "User" else "assistant"
-        conversation_history.append({"role": role, "content": msg.Message})
 
-    user_msg = ChatMessage(ConvoId=convo.ConvoId, Sender="User", Message=request.message)
+async def save_chat_turn(db: AsyncSession, request: ChatRequest, user_id: str, user_msg: ChatMessage, reply: str):
+    """Write the user and Noxy messages in one commit."""
+    key = user_cache_key(request.userId, request.username)
     db.add(user_msg)
-    db.commit()
+    db.add(ChatMessage(ConvoId=user_msg.ConvoId, Sender="Noxy", Message=reply))
+    try:
+        await db.commit()
+    except Exception:
+        # the cached conversation may be gone; resolve it from the database next time
+        convo_cache.pop(key)
+        raise
+
+    convo_cache.set(key, (user_id, user_msg.ConvoId))
 
-    task_progress = get_user_task_progress(request.userId, db)
-    reply = ask_noxy(request.message, user_id=request.userId, task_progress=task_progress)
 
-    bot_msg = ChatMessage(ConvoId=convo.ConvoId, Sender="Noxy", Message=reply)
-    db.add(bot_msg)
-    db.commit()
+async def load_messages(db: AsyncSession, convo_id: int, limit: int, before_id: int = None) -> list:
+    """
+    Newest `limit` messages of a conversation, oldest first.
 
-    return {"User": request.message, "Noxy": reply}
+    Keyset pagination on MessageId: pass the oldest MessageId already seen as
+    `before_id` to get the page before it. Served by IX_ChatMessages_ConvoId_MessageId.
+    """
+    query = select(ChatMessage).where(ChatMessage.ConvoId == convo_id)
+    if before_id is not None:
+        query = query.where(ChatMessage.MessageId < before_id)
 
-@app.get("/history/{username}")
-def get_history(username: str, db: Session = Depends(get_db)):
-    user = db.query(ApplicationUser).filter(ApplicationUser.UserName == username).first()
-    if not user:
-        return {"error": "User not found"}
-
-    convo = (
-        db.query(Conversation)
-        .filter(Conversation.UserId == user.Id)
-        .order_by(Conversation.StartedAt.desc())
-        .first()
+    rows = (await db.scalars(
+        query.order_by(ChatMessage.MessageId.desc()).limit(limit)
+    )).all()
+    return list(reversed(rows))
+
+
+def to_conversation_history(messages: list) -> list:
+    return [
+        {"role": "user" if msg.Sender == "User" else "assistant", "content": msg.Message or ""}
+        for msg in messages
+    ]
+
+
+@app.post("/chat")
+async def chat_endpoint(request: ChatRequest, db: AsyncSession = Depends(get_async_db)):
+    with span("chat"):
+        with span("db.resolve_chat_context"):
+            user_id, convo_id, recent = await resolve_chat_context(request, db)
+        if not user_id:
+            return {"error": "User not found"}
+
+        # only the latest turns are needed for prompt context
+        conversation_history = to_conversation_history(recent)
+        user_msg = ChatMessage(ConvoId=convo_id, Sender="User", Message=request.message, SentAt=datetime.utcnow())
+
+        with span("db.task_progress"):
+            task_progress = await get_user_task_progress(user_id, db)
+        reply = await ask_noxy(
+            request.message,
+            user_id=user_id,
+            task_progress=task_progress,
+            history=conversation_history,
+        )
+
+        with span("db.save_chat_turn"):
+            await save_chat_turn(db, request, user_id, user_msg, reply)
+
+        return {"User": request.message, "Noxy": reply}
+
+
+def sse_event(data: dict, event: str = None) -> str:
+    """Format one Server-Sent Events frame."""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Streaming variant of /chat using Server-Sent Events.
+
+    Each token arrives as `data: {"token": "..."}`. An `event: reset` frame
+    means the tokens sent so far were not part of the answer (a preamble before
+    tool calls, or a reply cut off by an error) and should be cleared. When
+    generation finishes the user message and the assembled reply are saved in
+    one commit and a final `event: done` frame carries the full reply.
+    """
+    # ended when the stream finishes; only made current around stages without a yield
+    root = start_span("chat.stream")
+    with trace.use_span(root):
+        with span("db.resolve_chat_context"):
+            user_id, convo_id, recent = await resolve_chat_context(request, db)
+        if not user_id:
+            root.end()
+            return {"error": "User not found"}
+
+        conversation_history = to_conversation_history(recent)
+        user_msg = ChatMessage(ConvoId=convo_id, Sender="User", Message=request.message, SentAt=datetime.utcnow())
+
+        with span("db.task_progress"):
+            task_progress = await get_user_task_progress(user_id, db)
+
+    async def event_stream():
+        try:
+            parts = []
+            async for token in astream_noxy(
+                request.message,
+                user_id=user_id,
+                task_progress=task_progress,
+                history=conversation_history,
+                parent_span=root,
+            ):
+                if token is STREAM_RESET:
+                    parts.clear()
+                    yield sse_event({}, event="reset")
+                    continue
+                parts.append(token)
+                yield sse_event({"token": token})
+
+            reply = "".join(parts)
+            with trace.use_span(root), span("db.save_chat_turn"):
+                await save_chat_turn(db, request, user_id, user_msg, reply)
+
+            yield sse_event({"User": request.message, "Noxy": reply}, event="done")
+        finally:
+            root.end()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    if not convo:
-        return {"history": []}
 
-    history = db.query(ChatMessage).filter(ChatMessage.ConvoId == convo.ConvoId).all()
+
+@app.get("/history/{username}")
+async def get_history(
+    username: str,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    before: int = Query(None, description="Return messages older than this MessageId"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Latest page of the user's conversation, oldest first.
+
+    `nextCursor` is the MessageId to pass as `before` for the previous page,
+    or null once the start of the conversation is reached.
+    """
+    key = user_cache_key(username=username)
+    cached = convo_cache.get(key)
+    if cached:
+        convo_id = cached[1]
+    else:
+        user = await db.scalar(select(ApplicationUser).where(ApplicationUser.UserName == username))
+        if not user:
+            return {"error": "User not found"}
+
+        convo = await db.scalar(
+            select(Conversation)
+            .where(Conversation.UserId == user.Id)
+            .order_by(Conversation.StartedAt.desc())
+            .limit(1)
+        )
+        if not convo:
+            return {"history": [], "nextCursor": None}
+
+        convo_id = convo.ConvoId
+        convo_cache.set(key, (user.Id, convo_id))
+
+    # one extra row tells whether an older page exists
+    page = await load_messages(db, convo_id, limit + 1, before_id=before)
+    has_more = len(page) > limit
+    if has_more:
+        page = page[1:]
 
     return {
         "username": username,
         "history": [
-            {"sender": msg.Sender, "message": msg.Message}
-            for msg in history
-        ]
+            {
+                "messageId": msg.MessageId,
+                "sender": msg.Sender,
+                "message": msg.Message,
+                "sentAt": msg.SentAt,
+            }
+            for msg in page
+        ],
+        "nextCursor": page[0].MessageId if has_more else None,
     }
 
-def get_user_task_progress(user_id: str, db: Session):
-    progress = (
-        db.query(UserOnboardingTaskProgress)
-        .join(OnboardingTask)
-        .filter(UserOnboardingTaskProgress.UserId == user_id)
-        .all()
-    )
+async def get_user_task_progress(user_id: str, db: AsyncSession, use_cache: bool = True):
+    """
+    The user's onboarding tasks with their status.
 
-    return [
+    Results are kept briefly in task_status_cache, which pending_tasks_tool
+    reads as well; use_cache=False always queries (and refreshes the cache).
+    """
+    if use_cache:
+        cached = task_status_cache.get(user_id)
+        set_span_attributes(**{"task_status_cache.hit": cached is not None})
+        if cached is not None:
+            return cached
+
+    # select the task columns directly; lazy relationship loads are not allowed on AsyncSession
+    progress = (await db.execute(
+        select(
+            UserOnboardingTaskProgress.TaskId,
+            OnboardingTask.Title,
+            OnboardingTask.Description,
+            UserOnboardingTaskProgress.Status,
+            UserOnboardingTaskProgress.UpdatedAt,
+        )
+        .join(OnboardingTask, UserOnboardingTaskProgress.TaskId == OnboardingTask.Id)
+        .where(UserOnboardingTaskProgress.UserId == user_id)
+    )).all()
+
+    tasks = [
         {
             "taskId": p.TaskId,
-            "taskTitle": p.Task.Title,
-            "taskDescription": p.Task.Description,
+            "taskTitle": p.Title,
+            "taskDescription": p.Description,
             "status": p.Status,
             "updatedAt": p.UpdatedAt
         }
         for p in progress
     ]
+    task_status_cache.set(user_id, tasks)
+    return tasks
 
 
 @app.get("/user-task-progress/{user_id}")
-def get_user_task_progress_endpoint(user_id: str, db: Session = Depends(get_db)):
-    return get_user_task_progress(user_id, db)
+async def get_user_task_progress_endpoint(user_id: str, db: AsyncSession = Depends(get_async_db)):
+    return await get_user_task_progress(user_id, db, use_cache=False)
+
+@app.get("/cache-stats")
+def cache_stats():
+    """Hit/miss counters for the response, retrieval, embedding, blob listing, conversation and task status caches."""
+    return {
+        "semantic_cache": response_cache.stats(),
+        "retrieval_cache": retrieval_cache.stats(),
+        "embedding_cache": embedding_model.stats(),
+        "blob_catalog": blob_catalog.stats(),
+        "conversation_cache": convo_cache.stats(),
+        "task_status_cache": task_status_cache.stats(),
+    }
+
+
+@app.get("/tool-stats")
+def tool_stats():
+    """Per-tool call counts, errors, timeouts and latency."""
+    return tool_latency.stats()
+
+
+@app.get("/context-stats")
+def context_stats():
+    """Retrieved vs. packed knowledge tokens across requests."""
+    return context_usage.stats()
+
+
+@app.get("/db-pool-stats")
+def db_pool_stats():
+    """Connection pool checkout latency, in-use connections and overflow/timeout counts."""
+    return pool_stats()
+
+
+@registry.collector
+def collect_service_stats():
+    """Pool, embedding, cache and context counters read at scrape time for /metrics."""
+    pools = pool_stats()
+    pool_samples = [(name, pools[name]) for name in ("sync", "async")]
+    embedding = embedding_model.stats()
+    caches = {
+        "semantic": response_cache.stats(),
+        "retrieval": retrieval_cache.stats(),
+        "conversation": convo_cache.stats(),
+        "task_status": task_status_cache.stats(),
+    }
+    context = context_usage.stats()
+
+    return [
+        ("noxy_db_pool_connections", "gauge", "Connections per pool and state.", [
+            ({"pool": name, "state": state}, stats.get(state, 0))
+            for name, stats in pool_samples for state in ("in_use", "idle", "overflow")
+        ]),
+        ("noxy_db_pool_size", "gauge", "Configured pool size.", [
+            ({"pool": name}, stats.get("pool_size", 0)) for name, stats in pool_samples
+        ]),
+        ("noxy_db_pool_checkouts_total", "counter", "Connection checkouts.", [
+            ({"pool": name}, stats["checkouts"]) for name, stats in pool_samples
+        ]),
+        ("noxy_db_pool_timeouts_total", "counter", "Checkouts that timed out waiting for a connection.", [
+            ({"pool": name}, stats["timeouts"]) for name, stats in pool_samples
+        ]),
+        ("noxy_db_pool_overflow_events_total", "counter", "Connections opened beyond pool_size.", [
+            ({"pool": name}, stats["overflow_events"]) for name, stats in pool_samples
+        ]),
+        ("noxy_embedding_api_calls_total", "counter", "Requests sent to the embedding endpoint.", [
+            ({}, embedding["api_calls"]),
+        ]),
+        ("noxy_embedding_cache_lookups_total", "counter", "Embedding cache lookups by result.", [
+            ({"result": "memory_hit"}, embedding["memory_hits"]),
+            ({"result": "disk_hit"}, embedding["disk_hits"]),
+            ({"result": "miss"}, embedding["misses"]),
+        ]),
+        ("noxy_cache_lookups_total", "counter", "Cache lookups by cache and result.", [
+            ({"cache": name, "result": result}, stats[key])
+            for name, stats in caches.items() for result, key in (("hit", "hits"), ("miss", "misses"))
+        ]),
+        ("noxy_context_tokens_total", "counter", "Retrieved knowledge tokens, before and after packing.", [
+            ({"kind": "retrieved"}, context["tokens_in"]),
+            ({"kind": "used"}, context["tokens_used"]),
+        ]),
+    ]
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text format: stage/tool/search/ingest latency histograms, token counters, pool and cache stats."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+def knowledge_base_changed():
+    """Drop answers and retrieval results that may have been built from the previous knowledge base."""
+    response_cache.invalidate()
+    invalidate_retrieval_cache()
+
 
 @app.post("/upload-document")
 def upload_document(request: UploadDocumentRequest):
@@ -234,6 +563,8 @@ def upload_document(request: UploadDocumentRequest):
             }
 
         result = inject_document_from_url(request.url)
+        if result.get("success"):
+            knowledge_base_changed()
         return result
 
     except Exception as e:
@@ -286,6 +617,7 @@ def delete_document(request: DeleteDocumentRequest):
             }
 
         documents_deleted = delete_documents_by_url(request.url)
+        knowledge_base_changed()
         return {
             "success": True,
             "documents_deleted": documents_deleted,
@@ -408,9 +740,12 @@ def update_document(request: UpdateDocumentRequest):
                 "message": f"Error deleting old document: {str(e)}"
             }
 
+        knowledge_base_changed()
+
         # Phase 2: Inject new document
         try:
             injection_result = inject_document_from_url(request.new_url)
+            knowledge_base_changed()
 
             # Check if injection was successful
             if injection_result.get("success"):
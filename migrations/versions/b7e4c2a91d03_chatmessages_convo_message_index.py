@@ -0,0 +1,34 @@
+"""Add ChatMessages (ConvoId, MessageId) index
+
+Revision ID: b7e4c2a91d03
+Revises: 66dc72dacf55
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4c2a91d03'
+down_revision: Union[str, Sequence[str], None] = '66dc72dacf55'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'IX_ChatMessages_ConvoId_MessageId',
+        'ChatMessages',
+        ['ConvoId', 'MessageId'],
+        unique=False,
+        schema='dbo',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('IX_ChatMessages_ConvoId_MessageId', table_name='ChatMessages', schema='dbo')
@@ -0,0 +1,118 @@
+"""
+Tests for the incremental knowledge-base builder.
+Runs against a temporary Chroma directory with fake embeddings, no Azure credentials needed.
+"""
+
+import chromadb
+import pytest
+from langchain_core.embeddings import Embeddings
+
+import vector.builder as builder
+from vector.embeddings import CachedEmbeddings
+from vector.store import get_active_collection_name
+
+
+class ConstantEmbeddings(Embeddings):
+    """Every text gets the same vector, so the test can tell which model embedded a chunk."""
+
+    def __init__(self, value: float):
+        self.value = value
+
+    def embed_documents(self, texts):
+        return [[self.value, 1.0] for _ in texts]
+
+    def embed_query(self, text):
+        return [self.value, 1.0]
+
+
+def write_kb(folder):
+    folder.mkdir()
+    (folder / "guide.md").write_text(
+        "# Office hours\nThe office is open from 8AM to 6PM on weekdays.\n"
+        "# Dress code\nBusiness casual attire is expected from Monday to Thursday.\n",
+        encoding="utf-8",
+    )
+
+
+def stored(persist_dir):
+    client = chromadb.PersistentClient(path=str(persist_dir))
+    collection = client.get_collection(get_active_collection_name(str(persist_dir)))
+    return collection, collection.get(include=["embeddings", "metadatas"])
+
+
+def build(monkeypatch, kb, persist_dir, namespace, value, full=False):
+    monkeypatch.setattr(builder, "embedding_model", CachedEmbeddings(ConstantEmbeddings(value), namespace=namespace))
+    return builder.build_chromadb(kb_path=str(kb), pdf_folder=None, persist_dir=str(persist_dir), workers=0, full=full)
+
+
+def test_unchanged_build_reuses_vectors(tmp_path, monkeypatch):
+    kb, persist_dir = tmp_path / "kb", tmp_path / "chroma"
+    write_kb(kb)
+    first = build(monkeypatch, kb, persist_dir, "model-a", 1.0)
+
+    second = build(monkeypatch, kb, persist_dir, "model-a", 1.0)
+
+    assert second["chunks_embedded"] == 0
+    assert second["chunks_reused"] == first["chunks_embedded"]
+
+
+def test_changed_embedding_model_reembeds_everything(tmp_path, monkeypatch):
+    kb, persist_dir = tmp_path / "kb", tmp_path / "chroma"
+    write_kb(kb)
+    first = build(monkeypatch, kb, persist_dir, "model-a", 1.0)
+    collection, _ = stored(persist_dir)
+    collection.add(ids=["upload-1"], embeddings=[[1.0, 1.0]], documents=["Uploaded FAQ text"],
+                   metadatas=[{"source": "https://example.com/faq.json"}])
+
+    second = build(monkeypatch, kb, persist_dir, "model-b", 2.0)
+
+    assert second["chunks_reused"] == 0
+    assert second["chunks_embedded"] == first["chunks_embedded"] + 1
+    assert second["chunks_uploaded_kept"] == 1
+    _, rows = stored(persist_dir)
+    assert "upload-1" in rows["ids"]
+    assert all(vector[0] == 2.0 for vector in rows["embeddings"])
+
+
+def test_full_build_reembeds_everything(tmp_path, monkeypatch):
+    kb, persist_dir = tmp_path / "kb", tmp_path / "chroma"
+    write_kb(kb)
+    first = build(monkeypatch, kb, persist_dir, "model-a", 1.0)
+
+    second = build(monkeypatch, kb, persist_dir, "model-a", 1.0, full=True)
+
+    assert second["chunks_reused"] == 0
+    assert second["chunks_embedded"] == first["chunks_embedded"]
+
+
+def upload(collection, cid, text):
+    collection.add(ids=[cid], embeddings=[[1.0, 1.0]], documents=[text],
+                   metadatas=[{"source": f"https://example.com/{cid}.json"}])
+
+
+@pytest.mark.parametrize("namespace, value", [("model-a", 1.0), ("model-b", 2.0)])
+def test_uploads_made_during_the_build_survive_the_swap(tmp_path, monkeypatch, namespace, value):
+    kb, persist_dir = tmp_path / "kb", tmp_path / "chroma"
+    write_kb(kb)
+    build(monkeypatch, kb, persist_dir, "model-a", 1.0)
+    live, _ = stored(persist_dir)
+    upload(live, "upload-1", "Uploaded FAQ text")
+    upload(live, "upload-2", "Uploaded holiday calendar")
+
+    real_embed_and_upsert = builder.embed_and_upsert
+
+    def racing_embed_and_upsert(*args, **kwargs):
+        # the server keeps writing to the live collection between the copy and the swap
+        result = real_embed_and_upsert(*args, **kwargs)
+        if "upload-3" not in live.get(ids=["upload-3"])["ids"]:
+            upload(live, "upload-3", "Uploaded during the rebuild")
+            live.delete(ids=["upload-1"])
+        return result
+
+    monkeypatch.setattr(builder, "embed_and_upsert", racing_embed_and_upsert)
+    second = build(monkeypatch, kb, persist_dir, namespace, value)
+
+    _, rows = stored(persist_dir)
+    uploaded = {i for i in rows["ids"] if i.startswith("upload-")}
+    assert uploaded == {"upload-2", "upload-3"}
+    assert second["chunks_uploaded_kept"] == 2
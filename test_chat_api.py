@@ -0,0 +1,203 @@
+"""
+Tests for the chat endpoints against SQLite and the offline fake models.
+See conftest.py for the environment; no Azure credentials or SQL Server needed.
+"""
+
+import asyncio
+import importlib.util
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessageChunk
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, inspect, select
+
+import agent.noxy_agent as noxy_agent
+from benchmarks.fakes import FakeChatModel
+from Models.dataModels import Base, ChatMessage, Conversation
+
+QUESTION = "what is the dress code policy"
+
+
+class PreambleThenToolModel(FakeChatModel):
+    """Streams a preamble before asking for hr_lookup, then answers the tool results in plain text."""
+
+    async def astream(self, prompt, **kwargs):
+        if isinstance(prompt, str):
+            yield AIMessageChunk(content="Let me check")
+            yield AIMessageChunk(content=" that.", tool_call_chunks=[
+                {"name": "hr_lookup", "args": "{}", "id": "call-1", "index": 0}
+            ])
+            return
+        async for chunk in super().astream(prompt, **kwargs):
+            yield chunk
+
+
+@pytest.fixture(autouse=True)
+def no_cached_answers(monkeypatch):
+    monkeypatch.setattr(noxy_agent, "SEMANTIC_CACHE_ENABLED", False)
+
+
+def sse_events(body: str) -> list:
+    """(event name or None, data) per Server-Sent Events frame."""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        event = None
+        for line in frame.split("\n"):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((event, json.loads(line[len("data: "):])))
+    return events
+
+
+def saved_messages(database, user_id: str) -> list:
+    with database() as db:
+        return db.execute(
+            select(ChatMessage.Sender, ChatMessage.Message)
+            .join(Conversation, ChatMessage.ConvoId == Conversation.ConvoId)
+            .where(Conversation.UserId == user_id)
+            .order_by(ChatMessage.MessageId)
+        ).all()
+
+
+def test_stream_sends_tokens_then_done_and_saves_the_turn_once(chat_app, make_user, database):
+    user_id, _ = make_user()
+    client = TestClient(chat_app.app)
+
+    response = client.post("/chat/stream", json={"userId": user_id, "message": QUESTION})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = sse_events(response.text)
+    tokens = [data["token"] for event, data in events if event is None]
+    assert len(tokens) > 1
+    assert events[-1] == ("done", {"User": QUESTION, "Noxy": "".join(tokens)})
+    assert [event for event, _ in events].count("done") == 1
+    assert saved_messages(database, user_id) == [("User", QUESTION), ("Noxy", "".join(tokens))]
+
+
+def test_stream_resets_the_preamble_before_a_tool_call(chat_app, make_user, database, monkeypatch):
+    monkeypatch.setattr(noxy_agent, "llm_with_tools", PreambleThenToolModel())
+    user_id, _ = make_user()
+    client = TestClient(chat_app.app)
+
+    response = client.post("/chat/stream", json={"userId": user_id, "message": QUESTION})
+
+    events = sse_events(response.text)
+    names = [event for event, _ in events]
+    assert names.index("reset") > 0  # the preamble was streamed, then withdrawn
+    preamble = [data["token"] for event, data in events[:names.index("reset")]]
+    answer = [data["token"] for event, data in events[names.index("reset") + 1:] if event is None]
+    assert "".join(preamble) == "Let me check that."
+    assert events[-1] == ("done", {"User": QUESTION, "Noxy": "".join(answer)})
+    assert "Let me check" not in events[-1][1]["Noxy"]
+    assert saved_messages(database, user_id) == [("User", QUESTION), ("Noxy", "".join(answer))]
+
+
+def add_conversation(database, user_id: str, texts: list, started_at: datetime = None) -> tuple:
+    """A conversation holding `texts` as user messages; returns (ConvoId, MessageIds)."""
+    with database() as db:
+        convo = Conversation(UserId=user_id, StartedAt=started_at or datetime.utcnow())
+        db.add(convo)
+        db.flush()
+        messages = [ChatMessage(ConvoId=convo.ConvoId, Sender="User", Message=text) for text in texts]
+        db.add_all(messages)
+        db.commit()
+        return convo.ConvoId, [m.MessageId for m in messages]
+
+
+def test_history_pages_backwards_with_the_cursor(chat_app, make_user, database):
+    user_id, username = make_user()
+    _, ids = add_conversation(database, user_id, [f"new{i}" for i in range(1, 7)])
+    client = TestClient(chat_app.app)
+
+    latest = client.get(f"/history/{username}", params={"limit": 3}).json()
+    assert [m["message"] for m in latest["history"]] == ["new4", "new5", "new6"]
+    assert latest["nextCursor"] == ids[3]
+
+    older = client.get(f"/history/{username}", params={"limit": 3, "before": latest["nextCursor"]}).json()
+    assert [m["message"] for m in older["history"]] == ["new1", "new2", "new3"]
+    assert older["nextCursor"] is None
+
+    assert client.get(f"/history/{username}", params={"limit": 3, "before": ids[0]}).json()["history"] == []
+    assert client.get(f"/history/{username}", params={"before": "latest"}).status_code == 422
+    assert client.get(f"/history/{username}", params={"limit": 0}).status_code == 422
+
+
+def load_migration(filename: str):
+    path = Path(__file__).parent / "migrations" / "versions" / filename
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def chat_message_indexes(conn) -> dict:
+    return {ix["name"]: ix["column_names"] for ix in inspect(conn).get_indexes("ChatMessages", schema="dbo")}
+
+
+def test_history_index_migration_round_trips():
+    migration = load_migration("b7e4c2a91d03_chatmessages_convo_message_index.py")
+    engine = create_engine("sqlite://")
+
+    with engine.begin() as conn:
+        # SQLite stand-in for the dbo schema the migration targets
+        conn.exec_driver_sql("ATTACH DATABASE ':memory:' AS dbo")
+        Base.metadata.create_all(conn)
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.downgrade()
+            assert "IX_ChatMessages_ConvoId_MessageId" not in chat_message_indexes(conn)
+            migration.upgrade()
+
+        assert chat_message_indexes(conn)["IX_ChatMessages_ConvoId_MessageId"] == ["ConvoId", "MessageId"]
+
+
+def resolve(chat_app, **request):
+    """resolve_chat_context in a fresh AsyncSession; also reports whether a transaction was left open."""
+    from Data.chatbot_db import AsyncSessionLocal, async_engine
+
+    async def run():
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await chat_app.resolve_chat_context(chat_app.ChatRequest(message="hi", **request), db, window=3)
+                return result, db.in_transaction()
+        finally:
+            # the pooled aiosqlite connections belong to this event loop
+            await async_engine.dispose()
+
+    return asyncio.run(run())
+
+
+def test_resolve_chat_context_returns_latest_conversation_window(chat_app, make_user, database):
+    user_id, username = make_user()
+    add_conversation(database, user_id, ["old conversation"], started_at=datetime(2020, 1, 1))
+    latest_convo, _ = add_conversation(database, user_id, [f"m{i}" for i in range(1, 6)])
+
+    for request in ({"userId": user_id}, {"username": username}):
+        chat_app.convo_cache.clear()
+        (resolved_user, convo_id, recent), _ = resolve(chat_app, **request)
+
+        assert resolved_user == user_id
+        assert convo_id == latest_convo
+        assert [m.Message for m in recent] == ["m3", "m4", "m5"]
+
+
+def test_resolve_chat_context_commits_a_new_conversation(chat_app, make_user, database):
+    user_id, _ = make_user()
+
+    (resolved_user, convo_id, recent), open_transaction = resolve(chat_app, userId=user_id)
+
+    assert resolved_user == user_id
+    assert recent == []
+    assert not open_transaction  # nothing is held across the LLM call
+    with database() as db:
+        assert db.scalars(select(Conversation.ConvoId).where(Conversation.UserId == user_id)).all() == [convo_id]
+
+
+def test_resolve_chat_context_unknown_user(chat_app):
+    assert resolve(chat_app, userId="no-such-user")[0] == (None, None, [])
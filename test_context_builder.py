@@ -0,0 +1,34 @@
+from agent.context_builder import build_context, dedupe_chunks, context_usage
+
+
+def test_dedupe_drops_repeats_and_trims_overlap():
+    first = "New hires must submit their TIN and SSS numbers within the first week of onboarding."
+    # the splitter repeats the tail of the previous chunk at the start of the next
+    second = "within the first week of onboarding. PhilHealth forms are due by the end of the month."
+
+    kept = dedupe_chunks([first, first + "  ", second, "TIN and SSS numbers"])
+
+    assert kept == [first, "PhilHealth forms are due by the end of the month."]
+
+
+def test_build_context_respects_budget_and_records_savings():
+    before = context_usage.stats()
+    long_chunk = "policy " * 400
+    chunks = ["Dress code is business casual.", long_chunk, "Office hours are 9 to 6."]
+
+    context = build_context(chunks, max_tokens=50)
+
+    assert context == "Dress code is business casual.\nOffice hours are 9 to 6."
+    after = context_usage.stats()
+    assert after["requests"] == before["requests"] + 1
+    assert after["chunks_dropped"] == before["chunks_dropped"] + 1
+    assert after["tokens_saved"] - before["tokens_saved"] >= 300
+
+
+def test_tokens_saved_is_never_negative():
+    before = context_usage.stats()
+
+    build_context(["Dress code is business casual.", "Office hours are 9 to 6."], max_tokens=1200)
+
+    after = context_usage.stats()
+    assert after["tokens_saved"] == before["tokens_saved"]
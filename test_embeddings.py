@@ -0,0 +1,109 @@
+"""
+Tests for the CachedEmbeddings wrapper (memory and SQLite caches).
+Runs without Azure credentials; a counting fake stands in for the model.
+"""
+
+import asyncio
+import os
+
+from langchain_core.embeddings import Embeddings
+
+from vector.embeddings import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+def test_memory_hit_skips_the_model():
+    model = CountingEmbeddings()
+    cache = CachedEmbeddings(model, namespace="test")
+
+    first = cache.embed_query("office hours")
+    second = cache.embed_query("office hours")
+
+    assert first == second
+    assert len(model.batches) == 1
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_disk_hit_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "cache" / "embeddings.sqlite3")
+    CachedEmbeddings(CountingEmbeddings(), namespace="test", cache_path=path).embed_query("office hours")
+
+    model = CountingEmbeddings()
+    cache = CachedEmbeddings(model, namespace="test", cache_path=path)
+
+    assert cache.embed_query("office hours") == [12.0, 1.0]
+    assert model.batches == []
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_database_is_opened_on_first_use(tmp_path):
+    path = str(tmp_path / "cache" / "embeddings.sqlite3")
+    cache = CachedEmbeddings(CountingEmbeddings(), namespace="test", cache_path=path)
+
+    assert not os.path.exists(path)
+    cache.embed_query("office hours")
+    assert os.path.exists(path)
+
+
+def test_namespaces_do_not_share_vectors(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    CachedEmbeddings(CountingEmbeddings(), namespace="model-a", cache_path=path).embed_query("office hours")
+
+    model = CountingEmbeddings()
+    CachedEmbeddings(model, namespace="model-b", cache_path=path).embed_query("office hours")
+
+    assert model.batches == [["office hours"]]
+
+
+def test_misses_are_embedded_in_one_batch():
+    model = CountingEmbeddings()
+    cache = CachedEmbeddings(model, namespace="test")
+    cache.embed_query("a")
+
+    vectors = cache.embed_documents(["a", "bb", "ccc"])
+
+    assert vectors == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+    assert model.batches == [["a"], ["bb", "ccc"]]
+
+
+def test_async_methods_use_the_disk_cache(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    asyncio.run(CachedEmbeddings(CountingEmbeddings(), namespace="test", cache_path=path).aembed_documents(["a", "bb"]))
+
+    model = CountingEmbeddings()
+    cache = CachedEmbeddings(model, namespace="test", cache_path=path)
+
+    assert asyncio.run(cache.aembed_query("bb")) == [2.0, 1.0]
+    assert model.batches == []
+
+
+def test_disk_store_is_bounded_by_size_and_age(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    cache = CachedEmbeddings(CountingEmbeddings(), namespace="test", cache_path=path, max_disk_entries=2)
+    cache.embed_documents(["a", "bb", "ccc"])
+
+    with cache._db_lock:
+        cache._prune()
+        assert cache._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 2
+
+    cache.max_age_seconds = -1
+    with cache._db_lock:
+        cache._prune()
+        assert cache._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 0
@@ -0,0 +1,147 @@
+"""
+Tests for file-name matching: the NumPy similarity scorer, the file-name index
+and the batched multi-part matcher.
+Runs without Azure credentials or a running server.
+"""
+
+import math
+import re
+import time
+
+import numpy as np
+import pytest
+
+from tools import file_matcher
+from tools.file_index import FileNameIndex
+from tools.similarity import SimilarityMatrix
+
+VOCAB = ["sss", "e1", "philhealth", "hdmf", "bir", "form", "1904", "1905", "2316", "nbi", "clearance"]
+
+FILES = [
+    {"name": name, "url": f"https://example.blob.core.windows.net/onboarding-materials/{name}"}
+    for name in [
+        "BIR FORM 1904.pdf", "BIR FORM 1905.pdf", "BIR FORM 2316.pdf",
+        "HDMF.pdf", "PHILHEALTH.pdf", "SSS E1 FORM.pdf",
+    ]
+]
+
+# every request pays this, like a round trip to the embeddings endpoint
+REQUEST_LATENCY = 0.03
+
+
+def python_cosine(a, b):
+    return sum(x*y for x, y in zip(a, b)) / (
+        math.sqrt(sum(x*x for x in a)) * math.sqrt(sum(y*y for y in b))
+    )
+
+
+def test_scores_match_python_cosine():
+    rng = np.random.default_rng(0)
+    candidates = rng.standard_normal((20, 16))
+    query = rng.standard_normal(16)
+
+    matrix = SimilarityMatrix(candidates)
+    expected = [python_cosine(query, c) for c in candidates]
+
+    assert np.allclose(matrix.scores(query), expected, atol=1e-5)
+
+
+def test_top_k_is_sorted_and_returns_items():
+    matrix = SimilarityMatrix(
+        [[1, 0], [0, 1], [1, 1], [-1, 0]],
+        items=["east", "north", "north-east", "west"],
+    )
+
+    top = matrix.top_k([1, 0.1], k=3)
+
+    assert [item for _, item in top] == ["east", "north-east", "north"]
+    assert top[0][0] >= top[1][0] >= top[2][0]
+
+
+def test_top_k_batch_and_oversized_k():
+    matrix = SimilarityMatrix([[1, 0], [0, 1]], items=["a", "b"])
+
+    results = matrix.top_k_batch([[1, 0], [0, 1]], k=5)
+
+    assert [r[0][1] for r in results] == ["a", "b"]
+    assert all(len(r) == 2 for r in results)
+
+
+def test_empty_matrix_and_zero_vectors():
+    assert SimilarityMatrix([]).top_k([1, 0], k=1) == []
+
+    matrix = SimilarityMatrix([[0, 0], [1, 0]])
+    assert np.isfinite(matrix.scores([1, 0])).all()
+
+
+def bag_of_words(text):
+    tokens = re.findall(r"[a-z0-9]+", text.lower())
+    return [float(tokens.count(word)) for word in VOCAB]
+
+
+@pytest.fixture
+def fake_embeddings(tmp_path, monkeypatch):
+    """Offline embeddings that count requests; the file index lives in tmp_path."""
+    requests = []
+
+    def embed_many(texts):
+        requests.append(list(texts))
+        time.sleep(REQUEST_LATENCY)
+        return [bag_of_words(t) for t in texts]
+
+    def embed(text):
+        return embed_many([text])[0]
+
+    monkeypatch.setattr(file_matcher, "file_index", FileNameIndex(str(tmp_path / "index.json"), "test"))
+    monkeypatch.setattr(file_matcher, "embed_many", embed_many)
+    monkeypatch.setattr(file_matcher, "embed", embed)
+
+    file_matcher.index_files(FILES)
+    requests.clear()
+    return requests
+
+
+def names(files):
+    return [f["name"] for f in files]
+
+
+def test_three_part_query_uses_one_embeddings_request(fake_embeddings):
+    found, not_found = file_matcher.find_best_file_matches(
+        ["sss form", "philhealth", "pag-ibig form"], FILES
+    )
+
+    assert names(found) == ["SSS E1 FORM.pdf", "PHILHEALTH.pdf", "HDMF.pdf"]
+    assert not_found == []
+    assert len(fake_embeddings) == 1
+
+
+def test_five_part_query_dedupes_and_reports_missing(fake_embeddings):
+    found, not_found = file_matcher.find_best_file_matches(
+        ["sss", "social security form", "bir form 1904", "philhealth", "nbi clearance"], FILES
+    )
+
+    # "sss" and "social security form" normalize to the same query and file
+    assert names(found) == ["SSS E1 FORM.pdf", "BIR FORM 1904.pdf", "PHILHEALTH.pdf"]
+    assert not_found == ["nbi clearance"]
+    # 1904 is a direct form-number match; the rest share one request
+    assert fake_embeddings == [["sss", "philhealth", "nbi clearance"]]
+
+
+def test_batched_matching_is_faster_than_per_part(fake_embeddings):
+    parts = ["sss", "philhealth", "pag-ibig", "nbi clearance", "health insurance form"]
+
+    start = time.perf_counter()
+    per_part = [file_matcher.find_best_file_match(part, FILES) for part in parts]
+    per_part_seconds = time.perf_counter() - start
+    per_part_requests = len(fake_embeddings)
+
+    fake_embeddings.clear()
+    start = time.perf_counter()
+    found, _ = file_matcher.find_best_file_matches(parts, FILES)
+    batched_seconds = time.perf_counter() - start
+
+    assert names(found) == ["SSS E1 FORM.pdf", "PHILHEALTH.pdf", "HDMF.pdf"]
+    assert names(f for f in per_part if f) == ["SSS E1 FORM.pdf", "PHILHEALTH.pdf", "HDMF.pdf", "PHILHEALTH.pdf"]
+    assert per_part_requests == len(parts)
+    assert len(fake_embeddings) == 1
+    assert batched_seconds < per_part_seconds / 2
@@ -0,0 +1,63 @@
+"""
+Tests for the pooled follow-up sentences appended to file replies.
+The LLM is replaced with a stub, so no Azure credentials are needed.
+"""
+
+import json
+
+from langchain_core.messages import AIMessage
+
+from LLM.llm_followup import DEFAULT_FOLLOWUPS, FollowupProvider, load_phrases
+
+
+class StubLLM:
+    def __init__(self, reply=None, error=None):
+        self.reply = reply
+        self.error = error
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return AIMessage(content=self.reply)
+
+
+def test_generate_refills_the_pool_with_cleaned_llm_lines():
+    llm = StubLLM("1. Reach out any time.\n- Happy to help with more forms.\nNeed anything else?\n\n")
+    provider = FollowupProvider(["Configured phrase."], llm_factory=lambda: llm)
+
+    assert provider.generate(count=3)
+
+    assert len(provider) == 2
+    assert {provider.next() for _ in range(50)} == {"Reach out any time.", "Happy to help with more forms."}
+
+
+def test_failed_or_empty_generation_keeps_the_current_pool():
+    failing = FollowupProvider(["Configured phrase."], llm_factory=lambda: StubLLM(error=RuntimeError("down")))
+    only_questions = FollowupProvider(["Configured phrase."], llm_factory=lambda: StubLLM("Anything else?"))
+
+    assert not failing.generate()
+    assert not only_questions.generate()
+    assert failing.next() == only_questions.next() == "Configured phrase."
+
+
+def test_next_never_calls_the_llm():
+    llm = StubLLM("Generated phrase.")
+    provider = FollowupProvider(["Configured phrase."], llm_factory=lambda: llm)
+
+    provider.next()
+
+    assert llm.calls == 0
+
+
+def test_fallback_sentences_when_the_phrase_file_is_missing_or_invalid(tmp_path):
+    invalid = tmp_path / "followups.json"
+    invalid.write_text("not json", encoding="utf-8")
+    empty = tmp_path / "empty.json"
+    empty.write_text(json.dumps(["", "  "]), encoding="utf-8")
+
+    assert load_phrases(str(tmp_path / "missing.json")) == DEFAULT_FOLLOWUPS
+    assert load_phrases(str(invalid)) == DEFAULT_FOLLOWUPS
+    assert load_phrases(str(empty)) == DEFAULT_FOLLOWUPS
+    assert FollowupProvider([]).next() in DEFAULT_FOLLOWUPS
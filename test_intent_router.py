@@ -0,0 +1,27 @@
+from agent.intent_router import route
+
+
+def test_single_clear_intent_is_fully_confident():
+    assert route("What are my pending requirements?").intent == "pending_tasks"
+    assert route("Can you give me the HR contact please").confidence == 1.0
+
+    match = route("I need the BIR form 1904")
+    assert match.intent == "pdf_file"
+    assert match.tool == "pdf_file_tool"
+    assert match.confidence == 1.0
+
+
+def test_extra_content_lowers_confidence():
+    match = route("hr contact and what is the dress code")
+    assert match.intent == "hr_contact"
+    assert match.confidence < 0.75
+
+
+def test_multiple_intents_are_ambiguous():
+    assert route("pending tasks and hr contact").confidence == 0.0
+
+
+def test_no_intent():
+    assert route("tell me about the leave policy") is None
+    # a file name without a request word ("form", "pdf", ...) is not a file request
+    assert route("what is the tin of the company") is None
@@ -0,0 +1,38 @@
+from tools.keyword_engine import match_keywords
+
+
+def test_one_scan_finds_every_category():
+    match = match_keywords("Can you send the BIR forms 1904 and 2316, and the HR contact?")
+
+    assert {"file_request", "file_name", "generic_bir", "synonym", "hr_contact"} <= match.intents
+    assert match.form_numbers == ["1904", "2316"]
+    assert match.keywords("file_name") == ["bir"]
+    assert match.keywords("file_request") == ["form"]
+
+
+def test_keywords_inside_longer_phrases_are_reported():
+    match = match_keywords("what is your name")
+
+    assert match.keywords("name_question") == ["what is your name", "your name"]
+    assert match.spans("name_question")[0] == (0, 17)
+
+
+def test_keywords_match_whole_words_only():
+    # "tin" inside "getting" and "bir" inside "birthday" are not keywords
+    assert match_keywords("getting my birthday leave").intents == frozenset()
+    assert match_keywords("pag-ibig copy").keywords("synonym") == ["pag-ibig"]
+
+
+def test_inflected_keywords_still_match():
+    # "taxes" and "downloading" matched when keywords were substrings; the suffix is part of the span
+    assert match_keywords("where do I file my taxes").keywords("synonym") == ["tax"]
+    assert match_keywords("where do I file my taxes").spans("synonym") == [(19, 24)]
+    assert match_keywords("downloading the handbook").keywords("file_request") == ["download"]
+    assert match_keywords("two forms").spans("file_request") == [(4, 9)]
+
+
+def test_case_variants_share_one_scan():
+    message = "Send me the BIR_1904 form"
+
+    assert match_keywords(message) is match_keywords(message.lower())
+    assert match_keywords(message).form_numbers == ["1904"]
@@ -0,0 +1,71 @@
+import vector.store as store
+from vector.lexical import BM25Index
+from vector.search import exact_identifier_hits, identifier_terms, reciprocal_rank_fusion
+
+CHUNKS = {
+    "a": "BIR Form 1904 is for new employees without a TIN.",
+    "b": "BIR Form 2316 is the certificate of compensation.",
+    "c": "HDMF Pag-IBIG membership registration is required.",
+    "d": "The dress code is business casual on weekdays.",
+}
+
+
+def make_index():
+    index = BM25Index()
+    index.add(list(CHUNKS), list(CHUNKS.values()))
+    return index
+
+
+def test_exact_identifier_ranks_first():
+    index = make_index()
+
+    assert index.search("bir-1904 form", k=2)[0][0] == "a"
+    assert index.search("pagibig hdmf", k=1)[0][0] == "c"
+
+
+def test_add_and_remove_keep_index_in_sync():
+    index = make_index()
+    index.remove(["a"])
+    index.add(["e"], ["Form 1904 must be filed at the RDO."])
+
+    assert [chunk_id for chunk_id, _ in index.search("1904", k=5)] == ["e"]
+    assert len(index) == 4
+    assert index.document_frequency("bir") == 1
+
+
+def test_identifier_hits_skip_vector_search_only_for_rare_identifiers():
+    index = make_index()
+    hits = [(chunk_id, index.text(chunk_id)) for chunk_id, _ in index.search("BIR 1904", k=3)]
+
+    assert identifier_terms("need BIR 1904 please") == {"bir", "1904"}
+    assert exact_identifier_hits({"bir", "1904"}, hits, k=2)[0][0] == "a"
+    assert exact_identifier_hits(set(), hits, k=2) is None
+    assert exact_identifier_hits({"e1"}, hits, k=2) is None
+
+
+def test_reciprocal_rank_fusion_prefers_chunks_found_by_both():
+    dense = [("d", "dress"), ("b", "2316")]
+    lexical = [("b", "2316"), ("a", "1904")]
+
+    assert reciprocal_rank_fusion([dense, lexical], k=2) == ["2316", "dress"]
+
+
+def test_changes_during_index_build_are_not_lost(monkeypatch):
+    class UploadDuringRead:
+        """Chroma stand-in whose read races with an upload and a delete."""
+
+        def get(self, include):
+            stored = {"ids": list(CHUNKS), "documents": list(CHUNKS.values())}
+            store.mark_collection_changed(added_ids=["e"], added_texts=["Form 1904 must be filed at the RDO."])
+            store.mark_collection_changed(removed_ids=["a"])
+            return stored
+
+    monkeypatch.setattr(store, "get_active_collection_name", lambda persist_dir=None: "kb-test")
+    monkeypatch.setattr(store, "get_vector_db", lambda: UploadDuringRead())
+    monkeypatch.setattr(store, "lexical_index", None)
+
+    index = store.get_lexical_index()
+
+    assert store.get_lexical_index() is index
+    assert [chunk_id for chunk_id, _ in index.search("1904", k=5)] == ["e"]
+    assert len(index) == 4
@@ -0,0 +1,43 @@
+from opentelemetry.sdk.trace import TracerProvider
+from Services.metrics import MetricsRegistry, MetricsSpanProcessor, stage_seconds, tool_seconds, llm_tokens
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("test_seconds", "Test latency.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        latency.observe(value, stage="retrieval")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE test_seconds histogram" in lines
+    assert 'test_seconds_bucket{stage="retrieval",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="retrieval",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{stage="retrieval",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{stage="retrieval"} 4' in lines
+
+
+def test_collectors_are_read_at_render_time():
+    registry = MetricsRegistry()
+    in_use = {"value": 1}
+    registry.collector(lambda: [("test_pool_in_use", "gauge", "In use.", [({"pool": "async"}, in_use["value"])])])
+
+    in_use["value"] = 3
+
+    assert 'test_pool_in_use{pool="async"} 3' in registry.render()
+
+
+def test_finished_spans_feed_stage_tool_and_token_metrics():
+    provider = TracerProvider()
+    provider.add_span_processor(MetricsSpanProcessor())
+    tracer = provider.get_tracer("test")
+    stages, tools = stage_seconds.count(stage="llm.final"), tool_seconds.count(tool="hr_lookup")
+    prompt_tokens = llm_tokens.value(call="final", kind="prompt")
+
+    with tracer.start_as_current_span("llm.final", attributes={"llm.input_tokens": 120, "llm.output_tokens": 30}):
+        with tracer.start_as_current_span("tool.hr_lookup"):
+            pass
+
+    assert stage_seconds.count(stage="llm.final") == stages + 1
+    assert tool_seconds.count(tool="hr_lookup") == tools + 1
+    assert llm_tokens.value(call="final", kind="prompt") == prompt_tokens + 120
@@ -0,0 +1,86 @@
+"""
+Tests for the stale-while-revalidate blob catalog.
+The backend listing is replaced with a stub loader, so no network is needed.
+"""
+
+import threading
+import time
+
+from tools.pdf_fetch import BlobCatalog
+
+
+class StubLoader:
+    """Returns the queued results in order; blocks while `gate` is clear."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.gate.wait(timeout=5)
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def pdfs(*names):
+    return [{"name": n, "url": f"https://example.test/{n}"} for n in names]
+
+
+def test_cold_get_waits_for_the_startup_fetch():
+    loader = StubLoader(pdfs("a.pdf"))
+    loader.gate.clear()
+    catalog = BlobCatalog(loader)
+
+    catalog.refresh_in_background()
+    assert loader.started.wait(timeout=5)
+    threading.Timer(0.05, loader.gate.set).start()
+
+    assert catalog.get() == pdfs("a.pdf")
+    assert loader.calls == 1
+
+
+def test_stale_list_is_served_while_revalidating():
+    loader = StubLoader(pdfs("a.pdf"), pdfs("a.pdf", "b.pdf"))
+    catalog = BlobCatalog(loader, ttl_seconds=0)
+    assert catalog.get() == pdfs("a.pdf")
+
+    loader.gate.clear()
+    loader.started.clear()
+    assert catalog.get() == pdfs("a.pdf")  # stale, refresh starts in the background
+    assert loader.started.wait(timeout=5)
+    assert catalog.get() == pdfs("a.pdf")  # still in flight, no second fetch
+    assert loader.calls == 2
+
+    loader.gate.set()
+    assert catalog.refresh()  # waits for the fetch in flight
+    assert loader.calls == 2
+    assert catalog.stats()["refreshes"] == 2
+
+
+def test_failed_refresh_keeps_the_last_list_and_retries_later():
+    loader = StubLoader(pdfs("a.pdf"), RuntimeError("backend down"), pdfs("b.pdf"))
+    catalog = BlobCatalog(loader, ttl_seconds=3600, retry_seconds=0.05)
+    catalog.get()
+
+    assert not catalog.refresh()
+    assert catalog.get() == pdfs("a.pdf")
+    assert loader.calls == 2  # not stale again until the retry delay passes
+    assert catalog.stats()["failures"] == 1
+    assert catalog.stats()["last_error"] == "backend down"
+
+    time.sleep(0.1)
+    assert catalog.get() == pdfs("a.pdf")  # retry starts in the background
+    deadline = time.monotonic() + 5
+    while catalog.get() != pdfs("b.pdf") and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert catalog.get() == pdfs("b.pdf")
+    assert loader.calls == 3
+    assert catalog.stats()["last_error"] is None
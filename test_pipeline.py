@@ -0,0 +1,119 @@
+"""
+Tests for the ingestion pipeline stages.
+Uses in-memory fakes for the loader, embeddings and collection.
+"""
+
+import threading
+import time
+
+from langchain_core.documents import Document
+
+from vector.pipeline import RateLimiter, embed_and_upsert, iter_parsed_sources
+
+
+class FakeCollection:
+    def __init__(self):
+        self.batches = []
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.batches.append(ids)
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [[float(len(t))] for t in texts]
+
+
+class FakeLoader:
+    def __init__(self, text, wait_for=None):
+        self.text = text
+        self.wait_for = wait_for
+
+    def __call__(self, path):
+        if self.wait_for is not None:
+            assert self.wait_for.wait(timeout=5), "second file was parsed before the first was embedded"
+        return [Document(page_content=self.text, metadata={})]
+
+
+def chunks(count):
+    return {f"id-{i}": Document(page_content=f"chunk {i}", metadata={}) for i in range(count)}
+
+
+def test_rate_limiter_waits_for_the_token_budget():
+    limiter = RateLimiter(tokens_per_minute=6000)  # refills 100 tokens per second
+    limiter.acquire(6000)  # empties the bucket
+
+    start = time.perf_counter()
+    limiter.acquire(20)
+    elapsed = time.perf_counter() - start
+
+    assert 0.15 <= elapsed < 1.0
+
+
+def test_rate_limiter_spaces_requests_once_the_bucket_is_empty():
+    limiter = RateLimiter(requests_per_minute=600)  # one request per 0.1s
+    for _ in range(600):
+        limiter.acquire()
+
+    start = time.perf_counter()
+    for _ in range(3):
+        limiter.acquire()
+    elapsed = time.perf_counter() - start
+
+    assert 0.25 <= elapsed < 1.0
+
+
+def test_rate_limiter_without_budget_does_not_wait():
+    limiter = RateLimiter()
+
+    start = time.perf_counter()
+    for _ in range(100):
+        limiter.acquire(1000)
+
+    assert time.perf_counter() - start < 0.1
+
+
+def test_embed_and_upsert_writes_every_batch():
+    collection = FakeCollection()
+    embeddings = FakeEmbeddings()
+
+    total = embed_and_upsert(collection, chunks(23), embeddings, batch_size=5, concurrency=2)
+
+    assert total == 23
+    assert embeddings.calls == 5
+    assert sorted(cid for batch in collection.batches for cid in batch) == sorted(chunks(23))
+
+
+def test_embed_and_upsert_accepts_a_generator():
+    collection = FakeCollection()
+
+    total = embed_and_upsert(collection, iter(chunks(7).items()), FakeEmbeddings(), batch_size=3)
+
+    assert total == 7
+    assert sorted(len(batch) for batch in collection.batches) == [1, 3, 3]
+
+
+def test_parsed_files_are_embedded_before_the_rest_are_parsed():
+    first_embedded = threading.Event()
+
+    class SignallingEmbeddings(FakeEmbeddings):
+        def embed_documents(self, texts):
+            first_embedded.set()
+            return super().embed_documents(texts)
+
+    sources = {
+        "first.md": FakeLoader("The office is open on weekdays."),
+        "second.md": FakeLoader("Business casual attire is expected.", wait_for=first_embedded),
+    }
+    parsed = ((path, c) for path, file_chunks in iter_parsed_sources(sources, workers=0)
+              for c in file_chunks)
+    collection = FakeCollection()
+
+    total = embed_and_upsert(collection, parsed, SignallingEmbeddings(), batch_size=1, concurrency=1)
+
+    assert total == 2
+    assert len(collection.batches) == 2
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool
+from Data.chatbot_db import engine_options
+from Data.pool_metrics import PoolMetrics, instrumented_pool
+
+
+def make_engine(metrics, tmp_path, pool_size=2, max_overflow=1):
+    return create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented_pool(QueuePool, metrics),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=0.1,
+    )
+
+
+def test_checkouts_and_in_use_are_counted(tmp_path):
+    metrics = PoolMetrics("test")
+    engine = make_engine(metrics, tmp_path)
+
+    conn = engine.connect()
+    stats = metrics.stats()
+    assert stats["checkouts"] == 1
+    assert stats["in_use"] == 1
+
+    conn.close()
+    assert metrics.stats()["in_use"] == 0
+    engine.dispose()
+
+
+def test_overflow_and_timeout_are_counted(tmp_path):
+    metrics = PoolMetrics("test")
+    engine = make_engine(metrics, tmp_path, pool_size=1, max_overflow=1)
+
+    held = [engine.connect(), engine.connect()]
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    stats = metrics.stats()
+    assert stats["overflow_events"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["checkout_ms_max"] >= 100
+
+    for conn in held:
+        conn.close()
+    engine.dispose()
+
+
+def test_fast_executemany_is_only_set_for_pyodbc():
+    assert engine_options("mssql+pyodbc://u:p@server/db")["fast_executemany"] is True
+    assert "fast_executemany" not in engine_options("mssql+aioodbc://u:p@server/db")
+    assert "fast_executemany" not in engine_options("sqlite+aiosqlite:///noxy.db")
@@ -0,0 +1,62 @@
+"""
+Tests for the per-turn RequestContext handed to the tools.
+Runs ask_noxy with the offline fake models; see conftest.py for the environment.
+"""
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, ToolMessage
+
+import agent.noxy_agent as noxy_agent
+import agent.request_context as request_context
+from agent.request_context import RequestContext
+from benchmarks.fakes import FakeChatModel
+
+MESSAGE = "where do I stand with my onboarding"
+
+
+class PendingTasksModel(FakeChatModel):
+    """Asks for pending_tasks_tool, yields to the other turn, then answers with the tool result."""
+
+    async def ainvoke(self, prompt, **kwargs):
+        if isinstance(prompt, str):
+            await asyncio.sleep(0.05)
+            return AIMessage(content="", tool_calls=[{"name": "pending_tasks_tool", "args": {}, "id": "call-1"}])
+        return AIMessage(content=next(m.content for m in prompt if isinstance(m, ToolMessage)))
+
+
+def tasks(*titles) -> list:
+    return [{"taskTitle": title, "status": "pending"} for title in titles]
+
+
+@pytest.fixture
+def no_backend(monkeypatch):
+    async def fail(user_id):
+        raise AssertionError(f"fetched tasks for {user_id} although the endpoint loaded them")
+
+    monkeypatch.setattr(request_context, "fetch_task_status_groups", fail)
+
+
+def test_task_groups_come_from_the_loaded_progress(no_backend):
+    context = RequestContext(user_id="u1", task_progress=tasks("Submit NBI clearance"))
+
+    groups = asyncio.run(context.task_status_groups())
+
+    assert [t["taskTitle"] for t in groups["pending"]] == ["Submit NBI clearance"]
+
+
+def test_concurrent_turns_keep_their_own_context(chat_app, monkeypatch, no_backend):
+    monkeypatch.setattr(noxy_agent, "llm_with_tools", PendingTasksModel())
+    monkeypatch.setattr(noxy_agent, "SEMANTIC_CACHE_ENABLED", False)
+
+    async def both_turns():
+        return await asyncio.gather(
+            noxy_agent.ask_noxy(MESSAGE, user_id="alice", task_progress=tasks("Submit BIR 1902")),
+            noxy_agent.ask_noxy(MESSAGE, user_id="bob", task_progress=tasks("Register for PhilHealth")),
+        )
+
+    alice, bob = asyncio.run(both_turns())
+
+    assert "Submit BIR 1902" in alice and "Register for PhilHealth" not in alice
+    assert "Register for PhilHealth" in bob and "Submit BIR 1902" not in bob
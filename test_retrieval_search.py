@@ -0,0 +1,103 @@
+import asyncio
+
+import numpy as np
+
+import vector.search as search
+from vector.lexical import BM25Index
+from vector.search import filter_fused, normalize_query, select_chunks
+
+CHUNKS = {
+    "office": ("What is the office schedule? The office is open from 8AM to 6PM.", [1.0, 0.0, 0.0]),
+    "office-overlap": ("What is the office schedule? The office is open from 8AM to 6PM!", [1.0, 0.01, 0.0]),
+    "dress": ("What is the dress code? Business casual on weekdays.", [0.0, 1.0, 0.0]),
+}
+
+
+class FakeCollection:
+    """Chroma collection stand-in over CHUNKS."""
+
+    def count(self):
+        return len(CHUNKS)
+
+    def query(self, query_embeddings, n_results, include):
+        ids = list(CHUNKS)
+        return {
+            "ids": [ids],
+            "documents": [[CHUNKS[i][0] for i in ids]],
+            "embeddings": [[CHUNKS[i][1] for i in ids]],
+        }
+
+    def get(self, ids, include):
+        found = [i for i in ids if i in CHUNKS]
+        return {"ids": found, "embeddings": [CHUNKS[i][1] for i in found]}
+
+
+class FakeVectorDB:
+    _collection = FakeCollection()
+
+
+def use_fake_store(monkeypatch):
+    index = BM25Index()
+    index.add(list(CHUNKS), [text for text, _ in CHUNKS.values()])
+    monkeypatch.setattr(search, "get_vector_db", lambda: FakeVectorDB())
+    monkeypatch.setattr(search, "get_lexical_index", lambda: index)
+    monkeypatch.setattr(search, "collection_version", lambda: "test:0")
+    monkeypatch.setattr(search, "RETRIEVAL_HYBRID", True)
+    search.invalidate_retrieval_cache()
+
+
+def test_normalize_query_ignores_case_spacing_and_punctuation():
+    assert normalize_query("  What is the  DRESS code? ") == "what is the dress code"
+
+
+def test_similarity_mode_ranks_by_relevance_and_applies_threshold():
+    query = [1.0, 0.0]
+    vectors = [[0.0, 1.0], [1.0, 0.1], [1.0, 0.5]]
+
+    assert select_chunks(query, vectors, k=3, mode="similarity", score_threshold=0.0) == [1, 2, 0]
+    assert select_chunks(query, vectors, k=3, mode="similarity", score_threshold=0.5) == [1, 2]
+
+
+def test_mmr_mode_skips_near_duplicate_chunks():
+    query = [1.0, 0.0, 0.0]
+    vectors = [
+        [1.0, 0.2, 0.0],
+        [1.0, 0.21, 0.0],   # overlapping chunk, almost identical to the first
+        [0.7, 0.0, 0.7],
+    ]
+
+    picked = select_chunks(query, np.array(vectors), k=2, mode="mmr", score_threshold=0.0)
+
+    assert picked == [0, 2]
+
+
+def test_fused_candidates_keep_order_and_drop_irrelevant_and_duplicates():
+    query = [1.0, 0.0, 0.0]
+    vectors = [[1.0, 0.0, 0.0], None, [0.0, 1.0, 0.0], [1.0, 0.01, 0.0], [0.8, 0.6, 0.0]]
+
+    assert filter_fused(query, vectors, k=5, mode="similarity", score_threshold=0.5) == [0, 3, 4]
+    assert filter_fused(query, vectors, k=5, mode="mmr", score_threshold=0.5) == [0, 4]
+    assert filter_fused(query, vectors, k=1, mode="similarity", score_threshold=0.0) == [0]
+
+
+def test_off_topic_query_returns_nothing_in_hybrid_mode(monkeypatch):
+    use_fake_store(monkeypatch)
+
+    # BM25 matches the stopwords "what is the" in every chunk, but no chunk clears the threshold
+    off_topic = [0.0, 0.0, 1.0]
+    results = asyncio.run(search.asearch_vectors(
+        "what is the weather", k=3, embedding=off_topic, mode="similarity", score_threshold=0.5,
+    ))
+
+    assert results == []
+
+
+def test_hybrid_mmr_does_not_bring_back_near_duplicates(monkeypatch):
+    use_fake_store(monkeypatch)
+
+    results = asyncio.run(search.asearch_vectors(
+        "what is the office schedule", k=3, embedding=[1.0, 0.0, 0.0], mode="mmr", score_threshold=0.0,
+    ))
+
+    assert len(results) == 2
+    assert results[1] == CHUNKS["dress"][0]
@@ -0,0 +1,68 @@
+"""
+Tests for the semantic response cache used by ask_noxy.
+Runs without Azure credentials or a running server.
+"""
+
+import time
+
+from agent.semantic_cache import SemanticCache, cache_entities
+
+
+def test_near_duplicate_hits_and_unrelated_misses():
+    cache = SemanticCache(threshold=0.9)
+    cache.store("what are office hours", [1.0, 0.0, 0.1], "8AM to 6PM")
+
+    hit = cache.lookup([1.0, 0.02, 0.12])
+    assert hit is not None
+    assert hit[0] == "8AM to 6PM"
+    assert hit[1] == "what are office hours"
+
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_expiry():
+    cache = SemanticCache(threshold=0.9, ttl_seconds=0.01)
+    cache.store("q", [1.0, 0.0], "a")
+    time.sleep(0.02)
+
+    assert cache.lookup([1.0, 0.0]) is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = SemanticCache(threshold=0.99, max_entries=2)
+    cache.store("a", [1.0, 0.0, 0.0], "A")
+    cache.store("b", [0.0, 1.0, 0.0], "B")
+
+    assert cache.lookup([1.0, 0.0, 0.0])[0] == "A"
+    cache.store("c", [0.0, 0.0, 1.0], "C")
+
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.lookup([1.0, 0.0, 0.0])[0] == "A"
+    assert cache.lookup([0.0, 0.0, 1.0])[0] == "C"
+
+
+def test_invalidate_clears_everything():
+    cache = SemanticCache(threshold=0.9)
+    cache.store("q", [1.0, 0.0], "a")
+    cache.invalidate()
+
+    assert cache.lookup([1.0, 0.0]) is None
+    assert len(cache) == 0
+
+
+def test_different_form_number_misses():
+    cache = SemanticCache(threshold=0.9)
+    # the two requests embed almost identically; only the form number differs
+    cache.store("send me BIR form 1904", [1.0, 0.0, 0.1], "BIR 1904 link", cache_entities("send me BIR form 1904"))
+
+    assert cache.lookup([1.0, 0.0, 0.1], cache_entities("send me BIR form 1905")) is None
+    assert cache.lookup([1.0, 0.0, 0.1], cache_entities("can I get bir form 1904?"))[0] == "BIR 1904 link"
+
+
+def test_entities_use_canonical_agency_names():
+    assert cache_entities("pag-ibig form") == cache_entities("hdmf form") == frozenset({"hdmf"})
+    assert cache_entities("sss form") != cache_entities("philhealth form")
+    assert cache_entities("what are office hours") == frozenset()
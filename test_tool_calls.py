@@ -0,0 +1,93 @@
+"""
+Tests for running the model's tool calls: concurrency, timeouts and latency stats.
+The real tools are replaced with slow stubs; see conftest.py for the environment.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+
+import agent.noxy_agent as noxy_agent
+from agent.request_context import RequestContext
+from Services.latency import LatencyTracker
+
+
+class SlowTool:
+    """Stand-in for a LangChain tool; a sync tool runs in the default executor, like StructuredTool.ainvoke."""
+
+    def __init__(self, delay: float, result: str, sync: bool = False):
+        self.delay = delay
+        self.result = result
+        self.sync = sync
+        self.finished = threading.Event()
+
+    def _run(self):
+        time.sleep(self.delay)
+        self.finished.set()
+        return self.result
+
+    async def ainvoke(self, tool_input):
+        if self.sync:
+            return await asyncio.get_running_loop().run_in_executor(None, self._run)
+        await asyncio.sleep(self.delay)
+        return self.result
+
+
+def tool_calls(*names) -> AIMessage:
+    return AIMessage(content="", tool_calls=[
+        {"name": name, "args": {}, "id": f"call-{i}"} for i, name in enumerate(names)
+    ])
+
+
+@pytest.fixture
+def tool_latency(monkeypatch):
+    tracker = LatencyTracker()
+    monkeypatch.setattr(noxy_agent, "tool_latency", tracker)
+    return tracker
+
+
+def test_tool_calls_run_concurrently_and_keep_their_order(monkeypatch, tool_latency):
+    monkeypatch.setattr(noxy_agent, "hr_lookup", SlowTool(0.3, "HR info"))
+    monkeypatch.setattr(noxy_agent, "general_filter_tool", SlowTool(0.3, "general"))
+
+    start = time.perf_counter()
+    messages = asyncio.run(noxy_agent.run_tool_calls(
+        tool_calls("hr_lookup", "general_filter_tool"), "prompt", "how do I contact HR", RequestContext(),
+    ))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.55  # one tool's delay, not the sum
+    assert [m.content for m in messages[2:]] == ["HR info", "general"]
+    assert [m.tool_call_id for m in messages[2:]] == ["call-0", "call-1"]
+    assert tool_latency.stats()["hr_lookup"]["calls"] == 1
+
+
+def test_slow_sync_tool_times_out_without_failing_the_turn(monkeypatch, tool_latency):
+    slow = SlowTool(0.5, "too late", sync=True)
+    monkeypatch.setattr(noxy_agent, "hr_lookup", slow)
+    monkeypatch.setattr(noxy_agent, "general_filter_tool", SlowTool(0.0, "general"))
+    monkeypatch.setitem(noxy_agent.TOOL_TIMEOUTS, "hr_lookup", 0.1)
+
+    async def turn():
+        start = time.perf_counter()
+        messages = await noxy_agent.run_tool_calls(
+            tool_calls("hr_lookup", "general_filter_tool"), "prompt", "how do I contact HR", RequestContext(),
+        )
+        return messages, time.perf_counter() - start
+
+    # timed inside the loop: asyncio.run itself waits for the executor thread on shutdown
+    messages, elapsed = asyncio.run(turn())
+
+    assert elapsed < 0.45
+    assert messages[2].content == "Error executing hr_lookup: timed out after 0.1s"
+    assert messages[3].content == "general"
+    stats = tool_latency.stats()
+    assert stats["hr_lookup"]["timeouts"] == 1
+    assert stats["hr_lookup"]["errors"] == 1
+    assert stats["general_filter_tool"]["timeouts"] == 0
+
+    # the executor thread was not cancelled; it finishes on its own and its result is dropped
+    assert slow.finished.wait(timeout=2)
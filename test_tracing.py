@@ -0,0 +1,24 @@
+import json
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from Services.tracing import JsonLinesSpanExporter
+
+
+def test_json_exporter_writes_one_line_per_span(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(JsonLinesSpanExporter(str(path))))
+    tracer = provider.get_tracer("test")
+
+    with tracer.start_as_current_span("chat"):
+        with tracer.start_as_current_span("retrieval", attributes={"retrieval.cache_hit": True}):
+            pass
+    provider.shutdown()
+
+    retrieval, chat = [json.loads(line) for line in path.read_text().splitlines()]
+    assert retrieval["name"] == "retrieval"
+    assert retrieval["parent_id"] == chat["span_id"]
+    assert retrieval["trace_id"] == chat["trace_id"]
+    assert retrieval["attributes"] == {"retrieval.cache_hit": True}
+    assert chat["parent_id"] is None
+    assert chat["duration_ms"] >= retrieval["duration_ms"]
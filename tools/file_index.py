@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+from tools.similarity import SimilarityMatrix
+
+
+class FileNameIndex:
+    """
+    Persistent cache of file-name embeddings.
+
+    Vectors are keyed by embedding deployment + file name, so switching the
+    embedding deployment never reuses vectors from a different model.
+    """
+
+    def __init__(self, path: str, deployment: str):
+        self.path = path
+        self.deployment = deployment or "default"
+        self._vectors = {}
+        self._matrix = None
+        self._matrix_signature = None
+        self._lock = threading.Lock()
+        self.load()
+
+    def _key(self, name: str) -> str:
+        return f"{self.deployment}::{name}"
+
+    def load(self):
+        """Load the index from disk. A missing or unreadable file starts an empty index."""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            with self._lock:
+                self._vectors = data.get("vectors", {})
+                self._matrix = None
+        except Exception as e:
+            print(f"[ERROR] File index load failed ({self.path}): {e}")
+
+    def save(self):
+        """Write the index atomically so a crash never leaves a half-written file."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._lock:
+            data = {"vectors": dict(self._vectors)}
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, name: str):
+        with self._lock:
+            return self._vectors.get(self._key(name))
+
+    def missing(self, names) -> list:
+        with self._lock:
+            return [n for n in dict.fromkeys(names) if self._key(n) not in self._vectors]
+
+    def add_files(self, files: list, embed_many) -> int:
+        """
+        Embed and store any file names not yet in the index.
+
+        Args:
+            files: List of {"name": ..., "url": ...} dicts (as from fetch_pdf_links)
+            embed_many: Callable taking a list of texts and returning their vectors
+
+        Returns:
+            Number of newly indexed file names
+        """
+        new_names = self.missing(f["name"] for f in files)
+        if not new_names:
+            return 0
+
+        vectors = embed_many(new_names)
+
+        with self._lock:
+            for name, vec in zip(new_names, vectors):
+                self._vectors[self._key(name)] = list(vec)
+            self._matrix = None
+
+        self.save()
+        return len(new_names)
+
+    def matrix_for(self, files: list) -> SimilarityMatrix:
+        """
+        Similarity matrix over the given files (all must already be indexed).
+
+        The matrix is rebuilt only when the candidate list or the index changes.
+        """
+        signature = tuple((f["name"], f.get("url")) for f in files)
+
+        with self._lock:
+            if self._matrix is not None and self._matrix_signature == signature:
+                return self._matrix
+
+            vectors = [self._vectors[self._key(f["name"])] for f in files]
+            self._matrix = SimilarityMatrix(vectors, items=list(files))
+            self._matrix_signature = signature
+            return self._matrix
+
+    def __len__(self):
+        with self._lock:
+            return len(self._vectors)
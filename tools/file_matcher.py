@@ -1,106 +1,127 @@
 import re
-from openai import AzureOpenAI
-from Services.config import EMBEDDING_API_KEY, EMBEDDING_ENDPOINT, EMBEDDING_DEPLOYMENT_NAME, EMBEDDING_API_VERSION
-
-client = AzureOpenAI(
-    api_key=EMBEDDING_API_KEY,
-    azure_endpoint=EMBEDDING_ENDPOINT,
-    api_version=EMBEDDING_API_VERSION
-)
-
-QUERY_SYNONYMS = {
-    "pagibig": "hdmf",
-    "pag ibig": "hdmf",
-    "pag-ibig": "hdmf",
-    "hdmf": "hdmf",
-    "mdf": "hdmf",
-
-    "sss": "sss",
-    "social security": "sss",
-    "e1": "sss",
-
-    "tin": "bir",
-    "tax": "bir",
-    "bir": "bir",
-
-    "philhealth": "philhealth",
-    "health insurance": "philhealth",
-    "phil health": "philhealth"
-}
-
-
-generic_bir_cases = [
-    "bir",
-    "bir form",
-    "bir forms",
-    "bir file",
-    "bir document",
-    "bir pdf",
-    "provide bir",
-    "tin",
-    "tax form",
-    "bureau of internal revenue"
-]
+from Services.config import EMBEDDING_DEPLOYMENT_NAME, FILE_INDEX_PATH
+from tools.file_index import FileNameIndex
+from vector.embeddings import embedding_model
+from tools.keyword_engine import QUERY_SYNONYMS, match_keywords
+
+# BIR form numbers that name a file directly
+BIR_FORM_NUMBER_RE = re.compile(r"(06\d{2}|19\d{2}|23\d{2}|25\d{2}q?)")
 
 def embed(text: str):
-    resp = client.embeddings.create(
-        input=text,
-        model=EMBEDDING_DEPLOYMENT_NAME
-    )
-    return resp.data[0].embedding
+    return embedding_model.embed_query(text)
+
+def embed_many(texts: list):
+    """Embed several texts in a single embeddings request (cached texts are skipped)."""
+    return embedding_model.embed_documents(texts)
+
+
+# file-name vectors are embedded once and persisted; only queries are embedded per request
+file_index = FileNameIndex(FILE_INDEX_PATH, EMBEDDING_DEPLOYMENT_NAME)
+
+
+def index_files(files: list) -> int:
+    """Add any unseen file names to the persisted file-name index."""
+    return file_index.add_files(files, embed_many)
 
 def normalize_query(q: str):
+    # scan the text as given, so the cached scan of the same message is reused
+    match = match_keywords(q)
     q = q.lower().replace("-", " ").replace("_", " ").strip()
 
     # enhanced numeric form detection (BIR)
-    form_num_match = re.search(r"\b(06\d{2}|19\d{2}|23\d{2}|25\d{2}q?)\b", q)
-    if form_num_match:
-        return form_num_match.group(0)
+    for number in match.form_numbers:
+        if BIR_FORM_NUMBER_RE.fullmatch(number):
+            return number
 
     # prioritize exact agency forms BEFORE embeddings
+    synonyms = match.keywords("synonym")
     for key, value in QUERY_SYNONYMS.items():
-        if key in q:
+        if key in synonyms:
             return value
 
-    # special case: pagibig without space
-    if "pagibig" in q:
-        return "hdmf"
-    
     return q
 
 
-def cosine_similarity(a, b):
-    import math
-    return sum(x*y for x, y in zip(a, b)) / (
-        math.sqrt(sum(x*x for x in a)) * math.sqrt(sum(y*y for y in b))
-    )
+MATCH_THRESHOLD = 0.48
 
-def find_best_file_match(user_query: str, files: list):
-    normalized_query = normalize_query(user_query)
-    print("NORMALIZED QUERY:", normalized_query)
 
-    # direct match priority
-    form_num_match = re.search(r"\b\d{3,4}\b", normalized_query)
-    if form_num_match:
-        form_num = form_num_match.group(0)
+def direct_form_match(normalized_query: str, files: list):
+    """File whose name contains the form number in the query, if any."""
+    form_numbers = match_keywords(normalized_query).form_numbers
+    if form_numbers:
+        form_num = form_numbers[0].rstrip("q")
         for f in files:
             if form_num in f["name"]:
                 print("DIRECT FORM NUMBER MATCH:", f["name"])
                 return f
+    return None
 
+
+def find_best_file_match(user_query: str, files: list):
+    normalized_query = normalize_query(user_query)
+    print("NORMALIZED QUERY:", normalized_query)
+
+    # direct match priority
+    direct = direct_form_match(normalized_query, files)
+    if direct:
+        return direct
+
+    index_files(files)
     user_vec = embed(normalized_query)
 
-    scored = []
-    for f in files:
-        file_vec = embed(f["name"])
-        score = cosine_similarity(user_vec, file_vec)
-        scored.append((score, f))
+    matches = file_index.matrix_for(files).top_k(user_vec, k=1)
+    if not matches:
+        return None
 
-    scored.sort(reverse=True, key=lambda x: x[0])
-    best_score, best_file = scored[0]
+    best_score, best_file = matches[0]
 
-    if best_score < 0.48:
+    if best_score < MATCH_THRESHOLD:
         print("NO CONFIDENT MATCH, SCORE BELOW THRESHOLD")
         return None
 
     return best_file
+
+
+def find_best_file_matches(parts: list, files: list):
+    """
+    Match several query parts (e.g. "sss form and philhealth") in one pass.
+
+    Parts are normalized and checked for direct form-number matches first;
+    the remaining distinct queries are embedded in a single embeddings
+    request and scored against the file-name matrix together.
+
+    Returns:
+        (matched files without duplicates, in part order; parts with no confident match)
+    """
+    normalized = [normalize_query(part) for part in parts]
+    best = {}
+
+    pending = []
+    for query in dict.fromkeys(normalized):
+        direct = direct_form_match(query, files)
+        if direct:
+            best[query] = direct
+        else:
+            pending.append(query)
+
+    if pending:
+        index_files(files)
+        vectors = embed_many(pending)
+        results = file_index.matrix_for(files).top_k_batch(vectors, k=1)
+
+        for query, matches in zip(pending, results):
+            if matches and matches[0][0] >= MATCH_THRESHOLD:
+                best[query] = matches[0][1]
+            else:
+                print("NO CONFIDENT MATCH, SCORE BELOW THRESHOLD:", query)
+
+    found = {}
+    not_found = []
+    for part, query in zip(parts, normalized):
+        match = best.get(query)
+        if match is None:
+            not_found.append(part)
+        else:
+            found.setdefault(match["url"], match)
+
+    return list(found.values()), not_found
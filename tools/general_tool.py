@@ -1,15 +1,7 @@
 from langchain.tools import tool
-
-NAME_QUESTIONS = [
-    "your name",
-    "what is your name",
-    "who are you",
-    "who am i talking to",
-    "may i know your name",
-]
+from tools.keyword_engine import match_keywords
 
 GREETINGS = ["hi", "hello", "kumusta", "good morning", "good afternoon"]
-VAGUE = ["guide me", "help me", "assist me", "i need help", "what do i do"]
 
 def is_pure_greeting(query: str) -> bool:
     """
@@ -25,12 +17,12 @@ def is_pure_greeting(query: str) -> bool:
 def general_filter_tool(data: dict) -> str:
     """Detect vague messages and allow the LLM to handle identity/greetings normally."""
     
-    query = data.get("query", "").lower()
+    match = match_keywords(data.get("query", ""))
 
-    if any(n in query for n in NAME_QUESTIONS):
+    if match.has("name_question"):
         return None
 
-    if any(v in query for v in VAGUE):
+    if match.has("vague"):
         return "vague"
 
     return None
@@ -1,18 +1,5 @@
 from langchain.tools import tool
-HR_KEYWORDS = [
-    "hr info",
-    "hr information",
-    "hr details",
-    "hr contact",
-    "contact hr",
-    "how to contact hr",
-    "hr email",
-    "hr number",
-    "human resources",
-    "reach hr",
-    "talk to hr",
-    "hr hotline",
-]
+from tools.keyword_engine import match_keywords
 
 HR_INFO = (
     "HR Email: hr.department@n-pax.com "
@@ -24,9 +11,7 @@ HR_INFO = (
 @tool("hr_lookup")
 def hr_lookup(data: dict) -> str:
     """Returns HR contact information when user asks for HR details."""
-    query = data.get("query", "").lower()
-
-    if any(k in query for k in HR_KEYWORDS):
+    if match_keywords(data.get("query", "")).has("hr_contact"):
         return HR_INFO
 
     return None
@@ -0,0 +1,195 @@
+import re
+from functools import lru_cache
+
+# keyword lists used by the tools and the intent router; every list is
+# compiled into KEYWORD_PATTERN below, so a message is scanned only once
+
+HR_KEYWORDS = [
+    "hr info",
+    "hr information",
+    "hr details",
+    "hr contact",
+    "contact hr",
+    "how to contact hr",
+    "hr email",
+    "hr number",
+    "human resources",
+    "reach hr",
+    "talk to hr",
+    "hr hotline",
+]
+
+PENDING_TASK_PHRASES = [
+    "what are the tasks i need to comply",
+    "what do i need",
+    "what are my pending requirements",
+    "what am i missing",
+    "what do i still need to submit",
+    "incomplete tasks",
+    "lacking requirements",
+    "pending requirements",
+    "pending tasks",
+    "onboarding tasks status",
+    "task status",
+]
+
+NAME_QUESTIONS = [
+    "your name",
+    "what is your name",
+    "who are you",
+    "who am i talking to",
+    "may i know your name",
+]
+
+VAGUE = ["guide me", "help me", "assist me", "i need help", "what do i do"]
+
+# words that make a message a file request, and the files that can be requested
+FILE_REQUEST_KEYWORDS = ["form", "pdf", "file", "download", "copy"]
+
+FILE_KEYWORDS = [
+    "pag-ibig", "pagibig", "hdmf",
+    "sss", "social security",
+    "philhealth", "phil health",
+    "tin", "tax identification",
+    "nbi", "clearance",
+    "bir"
+]
+
+generic_bir_cases = [
+    "bir",
+    "bir form",
+    "bir forms",
+    "bir file",
+    "bir document",
+    "bir pdf",
+    "provide bir",
+    "tin",
+    "tax form",
+    "bureau of internal revenue"
+]
+
+QUERY_SYNONYMS = {
+    "pagibig": "hdmf",
+    "pag ibig": "hdmf",
+    "pag-ibig": "hdmf",
+    "hdmf": "hdmf",
+    "mdf": "hdmf",
+
+    "sss": "sss",
+    "social security": "sss",
+    "e1": "sss",
+
+    "tin": "bir",
+    "tax": "bir",
+    "bir": "bir",
+
+    "philhealth": "philhealth",
+    "health insurance": "philhealth",
+    "phil health": "philhealth"
+}
+
+KEYWORD_SETS = {
+    "hr_contact": HR_KEYWORDS,
+    "pending_tasks": PENDING_TASK_PHRASES,
+    "name_question": NAME_QUESTIONS,
+    "vague": VAGUE,
+    "file_request": FILE_REQUEST_KEYWORDS,
+    "file_name": FILE_KEYWORDS,
+    "generic_bir": generic_bir_cases,
+    "synonym": list(QUERY_SYNONYMS),
+}
+
+
+def _phrase_keywords() -> dict:
+    """
+    phrase -> (category, keyword, offset) for every keyword inside the phrase.
+
+    The scan keeps the longest phrase starting at each word, so a phrase also
+    reports the keywords it contains ("bir form" is the file name "bir", the
+    request word "form" and the generic BIR request "bir form").
+    """
+    categories = {}
+    for category, phrases in KEYWORD_SETS.items():
+        for phrase in phrases:
+            categories.setdefault(phrase.lower(), set()).add(category)
+
+    contained = {}
+    for phrase in categories:
+        entries = []
+        for keyword, cats in categories.items():
+            inner = re.search(rf"\b{re.escape(keyword)}\b", phrase)
+            if inner:
+                entries.extend((category, keyword, inner.start()) for category in sorted(cats))
+        contained[phrase] = tuple(entries)
+    return contained
+
+
+PHRASE_KEYWORDS = _phrase_keywords()
+
+# one lookahead per word start: the longest keyword (with an optional inflection,
+# so "taxes" and "downloading" still count) or a form number
+KEYWORD_PATTERN = re.compile(
+    r"\b(?=(?P<phrase>"
+    + "|".join(re.escape(p) for p in sorted(PHRASE_KEYWORDS, key=len, reverse=True))
+    + r")(?P<suffix>es|s|ing)?\b|(?P<form_number>\d{3,4}q?)\b)"
+)
+
+
+class KeywordMatch:
+    """Every keyword and form number found in one message, with categories and spans."""
+
+    def __init__(self, hits: tuple):
+        # (category, matched text, (start, end)) in message order
+        self.hits = hits
+        self.intents = frozenset(category for category, _, _ in hits)
+
+    def has(self, category: str) -> bool:
+        return category in self.intents
+
+    def keywords(self, category: str) -> list:
+        """Distinct matched texts of a category, in message order."""
+        return list(dict.fromkeys(text for cat, text, _ in self.hits if cat == category))
+
+    def spans(self, category: str) -> list:
+        return [span for cat, _, span in self.hits if cat == category]
+
+    @property
+    def form_numbers(self) -> list:
+        return self.keywords("form_number")
+
+    def __repr__(self):
+        return f"KeywordMatch({sorted(self.intents)})"
+
+
+def match_keywords(text: str) -> KeywordMatch:
+    """
+    Scan a message once for every keyword list, synonym and form number.
+
+    Results are cached per normalized text, so the router, the agent and each
+    tool can ask about the same message (raw or lowercased) without scanning
+    it again. Spans index into `text`.
+    """
+    # same-length normalization keeps the spans valid for the caller's text
+    return _scan(text.lower().replace("_", " "))
+
+
+@lru_cache(maxsize=1024)
+def _scan(q: str) -> KeywordMatch:
+    hits = []
+    for m in KEYWORD_PATTERN.finditer(q):
+        if m.group("form_number"):
+            number = m.group("form_number")
+            hits.append(("form_number", number, (m.start(), m.start() + len(number))))
+            continue
+
+        phrase = m.group("phrase")
+        # an inflection ("forms", "downloading") belongs to the keyword that ends the phrase
+        phrase_end = m.end("suffix") if m.group("suffix") else m.end("phrase")
+        for category, keyword, offset in PHRASE_KEYWORDS[phrase]:
+            start = m.start() + offset
+            end = phrase_end if offset + len(keyword) == len(phrase) else start + len(keyword)
+            hits.append((category, keyword, (start, end)))
+
+    # message order; a longer keyword before the ones it contains
+    hits.sort(key=lambda hit: (hit[2][0], -hit[2][1]))
+    return KeywordMatch(tuple(hits))
@@ -1,51 +1,152 @@
+import threading
+import time
 import requests
-from Services.config import storage_name
+from Services.config import storage_name, BACKEND_BASE_URL, BLOB_CATALOG_TTL_SECONDS, BLOB_CATALOG_RETRY_SECONDS
+from tools.file_matcher import index_files
 
-AZURE_PDF_ENDPOINT = "http://localhost:5164/api/onboarding/materials/blobs"
+AZURE_PDF_ENDPOINT = f"{BACKEND_BASE_URL}/api/onboarding/materials/blobs"
 
-def fetch_pdf_links():
-    try:
-        resp = requests.get(AZURE_PDF_ENDPOINT)
 
-        print("STATUS CODE:", resp.status_code)
-        print("RAW TEXT:", resp.text[:300])
+def request_pdf_links() -> list:
+    """Fetch the blob listing from the backend and build the PDF list. Raises on failure."""
+    resp = requests.get(AZURE_PDF_ENDPOINT, timeout=10)
+    resp.raise_for_status()
+    data = resp.json()
+
+    if isinstance(data, list):
+        blobs = data
+    elif isinstance(data, dict):
+        blobs = data.get("blobs", [])
+    else:
+        raise ValueError(f"Unknown blob listing format: {type(data).__name__}")
+
+    # Build full Azure URLs
+    return [
+        {
+            "name": blob.split("/")[-1],  # keep only filename
+            "url": f"https://{storage_name}.blob.core.windows.net/onboarding-materials/{blob}"
+        }
+        for blob in blobs
+        if blob.lower().endswith(".pdf")
+    ]
+
+
+class BlobCatalog:
+    """
+    Cached blob listing served stale-while-revalidate.
+
+    `get()` returns the cached list without touching the backend. Once the
+    list is older than `ttl_seconds`, a background thread refreshes it while
+    callers keep getting the current one. A failed refresh keeps the last
+    good list and is retried after `retry_seconds`. Only one fetch runs at a
+    time; the very first call, before anything was loaded, waits for it.
+    """
 
-        if resp.status_code != 200:
-            print("ERROR: Non-200 status")
-            return []
+    def __init__(self, loader, ttl_seconds: float = 3600, retry_seconds: float = 60, on_refresh=None):
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds
+        self.on_refresh = on_refresh
 
-        # Parse JSON
+        self._files = None
+        self._next_refresh = 0.0
+        self._refreshing = False
+        self._idle = threading.Event()  # cleared while a fetch is in flight
+        self._idle.set()
+        self._lock = threading.Lock()
+
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error = None
+
+    def _claim(self) -> bool:
+        """Mark a fetch as in flight; False if one already is."""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+            self._idle.clear()
+            return True
+
+    def refresh(self) -> bool:
+        """Reload the listing now, or wait for the fetch in flight. Returns False (keeping the old list) on failure."""
+        if not self._claim():
+            self._idle.wait()
+            return self.last_error is None
+        return self._fetch()
+
+    def _fetch(self) -> bool:
         try:
-            data = resp.json()
+            files = self.loader()
         except Exception as e:
-            print("JSON PARSE ERROR:", e)
-            return []
-
-        print("PARSED JSON:", data)
-
-        if isinstance(data, list):
-            blobs = data
-        elif isinstance(data, dict):
-            blobs = data.get("blobs", [])
-        else:
-            print("Unknown response format")
-            return []
-
-        print("FOUND BLOBS:", blobs)
-
-        # Build full Azure URLs
-        results = [
-            {
-                "name": blob.split("/")[-1],  # keep only filename
-                "url": f"https://{storage_name}.blob.core.windows.net/onboarding-materials/{blob}"
+            with self._lock:
+                self.failures += 1
+                self.last_error = str(e)
+                self._next_refresh = time.monotonic() + self.retry_seconds
+                self._refreshing = False
+                self._idle.set()
+            print(f"BLOB CATALOG: refresh failed, serving last good list: {e}")
+            return False
+
+        with self._lock:
+            self._files = files
+            self.refreshes += 1
+            self.last_error = None
+            self._next_refresh = time.monotonic() + self.ttl_seconds
+            self._refreshing = False
+            self._idle.set()
+
+        if self.on_refresh:
+            try:
+                self.on_refresh(files)
+            except Exception as e:
+                print(f"BLOB CATALOG: refresh hook failed: {e}")
+        return True
+
+    def refresh_in_background(self):
+        if self._claim():
+            threading.Thread(target=self._fetch, name="blob-catalog-refresh", daemon=True).start()
+
+    def get(self) -> list:
+        with self._lock:
+            files = self._files
+            stale = time.monotonic() >= self._next_refresh
+
+        if files is None:
+            if stale:
+                # joins the startup fetch if it is still running instead of starting another
+                self.refresh()
+            return self._files or []
+
+        if stale:
+            self.refresh_in_background()
+        return files
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self._files or []),
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "last_error": self.last_error,
+                "stale": time.monotonic() >= self._next_refresh,
             }
-            for blob in blobs
-            if blob.lower().endswith(".pdf")
-        ]
 
-        print("PDF RESULTS:", results)
-        return results
 
-    except Exception as e:
-        print("REQUEST ERROR:", e)
-        return []
+def _index_file_names(files: list):
+    # embed new blob names now so matching only embeds the query
+    added = index_files(files)
+    if added:
+        print(f"FILE INDEX: added {added} new file name(s)")
+
+
+blob_catalog = BlobCatalog(
+    request_pdf_links,
+    ttl_seconds=BLOB_CATALOG_TTL_SECONDS,
+    retry_seconds=BLOB_CATALOG_RETRY_SECONDS,
+    on_refresh=_index_file_names,
+)
+
+
+def fetch_pdf_links():
+    return blob_catalog.get()
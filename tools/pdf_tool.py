@@ -1,36 +1,30 @@
 import re
 from langchain.tools import tool
-from tools.file_matcher import find_best_file_match, generic_bir_cases
-from LLM.llm_followup import llm_followup_sentence
+from tools.file_matcher import find_best_file_match, find_best_file_matches
+from tools.keyword_engine import match_keywords
+from LLM.llm_followup import followup_sentence
+from Services.config import FOLLOWUP_PER_FILE
 from tools.pdf_fetch import fetch_pdf_links
 
+PART_SEPARATOR_RE = re.compile(r"\s+and\s+|,\s*")
+
 
 @tool("pdf_file_tool")
 def pdf_file_tool(data: dict) -> str:
     """Return requested onboarding PDF file(s) or ask for clarification if needed."""
 
     q = data.get("query", "").lower()
+    match = match_keywords(q)
 
-    request_keywords = ["form", "pdf", "file", "download", "copy"]
-
-    if not any(k in q for k in request_keywords):
+    if not match.has("file_request"):
         return "No file request detected."
 
     # Detect multiple file requests using "and", commas, or multiple keywords
-    file_keywords = [
-        "pag-ibig", "pagibig", "hdmf",
-        "sss", "social security",
-        "philhealth", "phil health",
-        "tin", "tax identification",
-        "nbi", "clearance",
-        "bir"
-    ]
-    
     # Count how many different files are mentioned
-    mentioned_files = [kw for kw in file_keywords if kw in q]
+    mentioned_files = match.keywords("file_name")
     
     # Also check for multiple BIR forms
-    bir_form_matches = re.findall(r"\b\d{3,4}\b", q)
+    bir_form_matches = match.form_numbers
     
     # Check for "and" or comma separators suggesting multiple requests
     has_multiple_separators = " and " in q or "," in q
@@ -42,8 +36,8 @@ def pdf_file_tool(data: dict) -> str:
     )
 
     # Generic BIR handling only if no form number
-    bir_form_match = re.search(r"\b\d{3,4}\b", q)
-    if any(term in q for term in generic_bir_cases) and not bir_form_match:
+    bir_form_match = bool(bir_form_matches)
+    if match.has("generic_bir") and not bir_form_match:
         return "It looks like you are requesting a BIR form, but there are multiple types. May I know the specific form number you need?"
 
     files = fetch_pdf_links()
@@ -53,32 +47,23 @@ def pdf_file_tool(data: dict) -> str:
     # If multiple files requested, process each separately
     if is_multiple_request:
         # Split query into parts (by 'and' or comma)
-        parts = re.split(r'\s+and\s+|,\s*', q)
+        parts = PART_SEPARATOR_RE.split(q)
         
+        # Skip very short parts
+        parts = [part.strip() for part in parts if len(part.strip()) >= 3]
+
+        # all parts are embedded in one request and matched together
         results = []
-        found_files = []
-        not_found = []
-        
-        for part in parts:
-            part = part.strip()
-            if not part or len(part) < 3:  # Skip very short parts
-                continue
-                
-            best = find_best_file_match(part, files)
-            
-            if best:
-                # Avoid duplicates
-                if best['url'] not in [f['url'] for f in found_files]:
-                    found_files.append(best)
-            else:
-                # Track what wasn't found
-                not_found.append(part)
+        found_files, not_found = find_best_file_matches(parts, files)
         
         # Build response
         if found_files:
             for file in found_files:
-                followup = llm_followup_sentence(file["name"])
-                results.append(f"• {file['name']}: {file['url']}. {followup}")
+                if FOLLOWUP_PER_FILE:
+                    followup = followup_sentence()
+                    results.append(f"• {file['name']}: {file['url']}. {followup}")
+                else:
+                    results.append(f"• {file['name']}: {file['url']}")
         
         if not_found:
             not_found_text = ", ".join(not_found)
@@ -86,6 +71,10 @@ def pdf_file_tool(data: dict) -> str:
         
         if not results:
             return "I could not find any matching files. Can you specify the exact form names or numbers?"
+
+        # one closing sentence for the whole reply
+        if found_files and not FOLLOWUP_PER_FILE:
+            results.append(followup_sentence())
         
         return "\n".join(results)
 
@@ -99,6 +88,6 @@ def pdf_file_tool(data: dict) -> str:
     if best is None:
         return "I could not find a matching file. Can you specify the exact form name or number?"
 
-    followup = llm_followup_sentence(best["name"])
+    followup = followup_sentence()
 
     return f"Here is the file you need: {best['url']}. {followup}"
\ No newline at end of file
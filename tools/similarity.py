@@ -0,0 +1,67 @@
+import numpy as np
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Return a contiguous float32 copy of `vectors` with every row scaled to unit length."""
+    arr = np.ascontiguousarray(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+class SimilarityMatrix:
+    """
+    Cosine-similarity scorer over a fixed set of candidate vectors.
+
+    Candidates are normalized once into a contiguous float32 matrix, so scoring
+    a query (or a batch of queries) is a single matrix multiplication.
+    """
+
+    def __init__(self, vectors, items=None):
+        vectors = list(vectors) if not isinstance(vectors, np.ndarray) else vectors
+        if len(vectors) == 0:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+        else:
+            self.matrix = normalize_rows(vectors)
+        self.items = list(items) if items is not None else list(range(len(self.matrix)))
+
+        if len(self.items) != len(self.matrix):
+            raise ValueError(
+                f"Item count ({len(self.items)}) must match vector count ({len(self.matrix)})"
+            )
+
+    def __len__(self):
+        return len(self.items)
+
+    def scores(self, query) -> np.ndarray:
+        """Cosine similarity of one query against every candidate."""
+        return self.scores_batch([query])[0]
+
+    def scores_batch(self, queries) -> np.ndarray:
+        """Cosine similarities with shape (len(queries), len(candidates))."""
+        if len(self) == 0:
+            return np.zeros((len(queries), 0), dtype=np.float32)
+        return normalize_rows(queries) @ self.matrix.T
+
+    def top_k(self, query, k: int = 1) -> list:
+        """Best `k` candidates for one query as (score, item) pairs, highest first."""
+        return self.top_k_batch([query], k)[0]
+
+    def top_k_batch(self, queries, k: int = 1) -> list:
+        """Best `k` candidates for each query as lists of (score, item) pairs."""
+        if len(self) == 0 or k <= 0:
+            return [[] for _ in queries]
+
+        scores = self.scores_batch(queries)
+        k = min(k, len(self))
+
+        if k < len(self):
+            idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            idx = np.broadcast_to(np.arange(len(self)), scores.shape)
+
+        results = []
+        for row, cand in zip(scores, idx):
+            order = cand[np.argsort(-row[cand])]
+            results.append([(float(row[i]), self.items[i]) for i in order])
+        return results
@@ -1,24 +1,31 @@
-import requests
-
-PENDING_TASK_PHRASES = [
-    "what are the tasks i need to comply",
-    "what do i need",
-    "what are my pending requirements",
-    "what am i missing",
-    "what do i still need to submit",
-    "incomplete tasks",
-    "lacking requirements",
-    "pending requirements",
-    "pending tasks",
-    "onboarding tasks status",
-    "task status",
-]
-
-def fetch_task_status_groups(user_id: str):
-    url = f"http://localhost:5164/api/onboarding/user-tasks/{user_id}"
+import httpx
+from Services.config import BACKEND_BASE_URL, TASK_STATUS_CACHE_TTL_SECONDS, TASK_STATUS_CACHE_MAX_ENTRIES
+from Services.ttl_cache import TTLCache
+
+# shared client so backend calls reuse pooled connections; closed on app shutdown
+http_client = httpx.AsyncClient(timeout=5)
+
+# user_id -> task list, filled by both the ORM query in main.py and the backend call below
+task_status_cache = TTLCache(max_entries=TASK_STATUS_CACHE_MAX_ENTRIES, ttl_seconds=TASK_STATUS_CACHE_TTL_SECONDS)
+
+
+def group_task_status(tasks: list) -> dict:
+    return {
+        "pending":      [t for t in tasks if (t.get("status") or "").lower() == "pending"],
+        "in_progress":  [t for t in tasks if (t.get("status") or "").lower() == "in_progress"],
+        "completed":    [t for t in tasks if (t.get("status") or "").lower() == "completed"]
+    }
+
+
+async def fetch_task_status_groups(user_id: str):
+    cached = task_status_cache.get(user_id)
+    if cached is not None:
+        return group_task_status(cached)
+
+    url = f"{BACKEND_BASE_URL}/api/onboarding/user-tasks/{user_id}"
 
     try:
-        resp = requests.get(url, timeout=5)
+        resp = await http_client.get(url)
         if resp.status_code != 200:
             print("TASK ERROR:", resp.status_code, resp.text)
             return {
@@ -28,14 +35,9 @@ def fetch_task_status_groups(user_id: str):
             }
 
         tasks = resp.json()
+        task_status_cache.set(user_id, tasks)
 
-        grouped = {
-            "pending":      [t for t in tasks if t.get("status", "").lower() == "pending"],
-            "in_progress":  [t for t in tasks if t.get("status", "").lower() == "in_progress"],
-            "completed":    [t for t in tasks if t.get("status", "").lower() == "completed"]
-        }
-
-        return grouped
+        return group_task_status(tasks)
 
     except Exception as e:
         print("TASK EXCEPTION:", str(e))
@@ -1,3 +1,22 @@
-from vector.builder import build_chromadb
+import argparse
+from vector.builder import build_chromadb, BATCH_SIZE, EMBED_CONCURRENCY
 
-build_chromadb()
\ No newline at end of file
+# the guard is required: parse workers re-import this module when they are spawned
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or incrementally update the ChromaDB knowledge base.")
+    parser.add_argument("--full", action="store_true", help="re-chunk and re-check every source file")
+    parser.add_argument("--workers", type=int, default=None, help="parse processes (default: CPU count, 0 = no pool)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="texts per embeddings request")
+    parser.add_argument("--concurrency", type=int, default=EMBED_CONCURRENCY, help="embedding requests in flight")
+    parser.add_argument("--rpm", type=float, default=None, help="embeddings requests-per-minute limit")
+    parser.add_argument("--tpm", type=float, default=None, help="embeddings tokens-per-minute limit")
+    args = parser.parse_args()
+
+    build_chromadb(
+        full=args.full,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+    )
@@ -1,37 +1,315 @@
-import os, shutil
-from langchain_chroma import Chroma
+import os
+import json
+import hashlib
+import time
+import uuid
+import chromadb
+from langchain_core.documents import Document
 from .embeddings import embedding_model
-from .loaders import load_json_kb, load_md_kb, load_pdf_kb
-from .chunker import chunk_documents
+from .loaders import load_json_kb, load_md_kb, load_pdf_file
+from .chunker import CHUNK_SIZE, CHUNK_OVERLAP
+from .store import CHROMA_DIR, get_active_collection_name, set_active_collection_name
+from .pipeline import PipelineReport, RateLimiter, iter_parsed_sources, embed_and_upsert
 
+MANIFEST_FILE = "build_manifest.json"
+BATCH_SIZE = 256
+EMBED_CONCURRENCY = 4
 
-def build_chromadb(kb_path="KnowledgeBaseFiles"):
-    all_docs = []
 
-    # load JSON + MD KB
-    for file in os.listdir(kb_path):
-        path = os.path.join(kb_path, file)
+def list_sources(kb_path="KnowledgeBaseFiles", pdf_folder="MockData") -> dict:
+    """Map each knowledge-base source file to its loader, keyed by relative path."""
+    sources = {}
 
+    for file in sorted(os.listdir(kb_path)):
+        path = os.path.join(kb_path, file)
         if file.endswith(".json"):
-            all_docs.extend(load_json_kb(path))
+            sources[path] = load_json_kb
         elif file.endswith(".md"):
-            all_docs.extend(load_md_kb(path))
+            sources[path] = load_md_kb
 
-    # load PDFs
-    all_docs.extend(load_pdf_kb())
+    if pdf_folder and os.path.isdir(pdf_folder):
+        for file in sorted(os.listdir(pdf_folder)):
+            if file.lower().endswith(".pdf"):
+                sources[os.path.join(pdf_folder, file)] = load_pdf_file
 
-    # chunking
-    chunks = chunk_documents(all_docs)
+    return sources
 
-    # remove old DB
-    if os.path.exists("ChromaDB"):
-        shutil.rmtree("ChromaDB")
 
-    # build new DB
-    Chroma.from_documents(
-        documents=chunks,
-        embedding=embedding_model,
-        persist_directory="ChromaDB"
-    )
+def fingerprint_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source_key: str, chunk) -> str:
+    """Content-addressed chunk id: identical chunk text + metadata keeps its id across builds."""
+    payload = json.dumps([source_key, chunk.page_content, chunk.metadata], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def clean_metadata(metadata: dict) -> dict:
+    # Chroma rejects None metadata values
+    return {k: v for k, v in metadata.items() if v is not None}
+
+
+def is_uploaded_chunk(metadata: dict) -> bool:
+    """Chunks injected via /upload-document keep their URL as source; builder chunks never do."""
+    source = (metadata or {}).get("source") or ""
+    return source.startswith(("http://", "https://"))
+
+
+def load_manifest(persist_dir: str) -> dict:
+    path = os.path.join(persist_dir, MANIFEST_FILE)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(persist_dir: str, manifest: dict):
+    path = os.path.join(persist_dir, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _get_collection(client, name: str):
+    try:
+        return client.get_collection(name)
+    except Exception:
+        return None
+
+
+def _existing_ids(collection, ids: list) -> set:
+    if collection is None or not ids:
+        return set()
+
+    found = set()
+    for start in range(0, len(ids), BATCH_SIZE):
+        found.update(collection.get(ids=ids[start:start + BATCH_SIZE], include=[])["ids"])
+    return found
+
+
+def _copy_chunks(source, target, ids: list) -> int:
+    """Copy stored chunks (with their embeddings) between collections without re-embedding."""
+    copied = 0
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = source.get(
+            ids=ids[start:start + BATCH_SIZE],
+            include=["embeddings", "documents", "metadatas"],
+        )
+        if batch["ids"]:
+            target.add(
+                ids=batch["ids"],
+                embeddings=batch["embeddings"],
+                documents=batch["documents"],
+                metadatas=batch["metadatas"],
+            )
+            copied += len(batch["ids"])
+    return copied
+
+
+def _uploaded_chunk_ids(collection) -> list:
+    if collection is None:
+        return []
+    stored = collection.get(include=["metadatas"])
+    return [i for i, m in zip(stored["ids"], stored["metadatas"]) if is_uploaded_chunk(m)]
+
+
+def _upload_changes(collection, known_ids: list) -> tuple:
+    """(uploaded ids added since `known_ids` was read, ids of `known_ids` deleted since) in `collection`."""
+    if collection is None:
+        return [], []
+    current = _uploaded_chunk_ids(collection)
+    known = set(known_ids)
+    current_set = set(current)
+    return [i for i in current if i not in known], [i for i in known_ids if i not in current_set]
+
+
+def _stored_chunks(collection, ids: list) -> dict:
+    """{id: Document} for stored chunks that have to be embedded again."""
+    chunks = {}
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = collection.get(ids=ids[start:start + BATCH_SIZE], include=["documents", "metadatas"])
+        for cid, text, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+            chunks[cid] = Document(page_content=text, metadata=metadata or {})
+    return chunks
+
 
-    print("ChromaDB was successfully built.")
+def build_chromadb(kb_path="KnowledgeBaseFiles", pdf_folder="MockData", persist_dir=None, full=False,
+                   workers=None, batch_size=BATCH_SIZE, concurrency=EMBED_CONCURRENCY,
+                   requests_per_minute=None, tokens_per_minute=None):
+    """
+    Incrementally rebuild the knowledge-base collection.
+
+    Source files are fingerprinted; unchanged files reuse their stored chunks
+    and embeddings, changed files are re-chunked and only chunks with new
+    content are embedded, and chunks of deleted files are dropped. A `full`
+    build, or a changed embedding model or chunk setting, embeds every chunk
+    (uploaded ones included) again. The result
+    is written to a fresh staging collection and swapped in atomically, so the
+    live index stays queryable for the whole build. Chunks added through
+    /upload-document are carried over; uploads and deletes made while the
+    build runs are applied to the staging collection just before the swap.
+
+    Changed sources are parsed and chunked in a process pool; each file's new
+    chunks go to the embedder as soon as that file is parsed, are embedded in
+    concurrent batches (optionally rate limited) and upserted as each batch
+    completes.
+
+    Args:
+        kb_path: Folder with JSON and Markdown knowledge-base files
+        pdf_folder: Folder with PDF files
+        persist_dir: Chroma directory (defaults to CHROMA_PERSIST_DIR)
+        full: Ignore the previous manifest and re-chunk every source
+        workers: Parse processes (None = CPU count, 0 = parse in this process)
+        batch_size: Texts per embeddings request
+        concurrency: Embedding requests in flight
+        requests_per_minute: Optional embeddings request budget
+        tokens_per_minute: Optional embeddings token budget
+
+    Returns:
+        dict with build statistics, including per-stage throughput
+    """
+    persist_dir = persist_dir or CHROMA_DIR
+    os.makedirs(persist_dir, exist_ok=True)
+    client = chromadb.PersistentClient(path=persist_dir)
+
+    signature = f"{embedding_model.namespace}|chunk={CHUNK_SIZE}/{CHUNK_OVERLAP}"
+    live_name = get_active_collection_name(persist_dir)
+    live = _get_collection(client, live_name)
+
+    manifest = load_manifest(persist_dir)
+    previous = manifest.get("sources", {})
+    # stored vectors are only reused when the live collection was built with the same model and chunking
+    reuse_vectors = not full and live is not None and manifest.get("signature") == signature \
+        and manifest.get("collection") == live_name
+    if not reuse_vectors:
+        previous = {}
+
+    report = PipelineReport()
+    sources = list_sources(kb_path, pdf_folder)
+    new_sources = {}
+    reused_ids = []
+    fingerprints = {}
+
+    for key in sources:
+        fingerprint = fingerprint_file(key)
+        prev = previous.get(key)
+
+        if prev and prev.get("fingerprint") == fingerprint:
+            new_sources[key] = prev
+            reused_ids.extend(prev["chunk_ids"])
+        else:
+            fingerprints[key] = fingerprint
+
+    changed = len(fingerprints)
+    removed = sorted(set(previous) - set(sources))
+
+    # uploaded chunks are copied as they are, or re-embedded with the new model
+    uploaded_ids = _uploaded_chunk_ids(live)
+    reembedded_uploads = len(uploaded_ids) if not reuse_vectors else 0
+
+    staging_name = f"kb-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    staging = client.create_collection(staging_name)
+
+    limiter = None
+    if requests_per_minute or tokens_per_minute:
+        limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+
+    copy_stage = report.stage("copy", "chunks")
+    seen = set()
+    copied = kept_uploads = 0
+
+    def copy(ids):
+        start = time.perf_counter()
+        count = _copy_chunks(live, staging, ids) if live is not None and ids else 0
+        copy_stage.items += count
+        copy_stage.seconds += time.perf_counter() - start
+        return count
+
+    def chunks_to_embed():
+        """Yield (chunk_id, chunk) per changed file as soon as it is parsed."""
+        nonlocal copied
+        if reembedded_uploads:
+            yield from _stored_chunks(live, uploaded_ids).items()
+
+        parsed = iter_parsed_sources({key: sources[key] for key in fingerprints}, workers=workers, report=report)
+        for key, file_chunks in parsed:
+            fresh = {}
+            for chunk in file_chunks:
+                cid = chunk_id(key, chunk)
+                if cid not in seen:
+                    seen.add(cid)
+                    fresh[cid] = chunk
+            new_sources[key] = {"fingerprint": fingerprints[key], "chunk_ids": list(fresh)}
+
+            # chunks of changed files whose text did not change still have usable embeddings
+            unchanged = _existing_ids(live, list(fresh)) if reuse_vectors else set()
+            copied += copy([cid for cid in fresh if cid in unchanged])
+            yield from ((cid, c) for cid, c in fresh.items() if cid not in unchanged)
+
+    try:
+        copied += copy(reused_ids)
+        if reuse_vectors:
+            kept_uploads = copy(uploaded_ids)
+
+        embedded = embed_and_upsert(
+            staging, chunks_to_embed(), embedding_model,
+            batch_size=batch_size, concurrency=concurrency, limiter=limiter,
+            report=report, clean_metadata=clean_metadata,
+        )
+
+        # uploads and deletes that reached the live collection while this build ran
+        late_ids, gone_ids = _upload_changes(live, uploaded_ids)
+        if gone_ids:
+            staging.delete(ids=gone_ids)
+        if late_ids and reuse_vectors:
+            kept_uploads += copy(late_ids)
+        elif late_ids:
+            late = _stored_chunks(live, late_ids)
+            reembedded_uploads += len(late)
+            embedded += embed_and_upsert(
+                staging, late, embedding_model,
+                batch_size=batch_size, concurrency=concurrency, limiter=limiter,
+                report=report, clean_metadata=clean_metadata,
+            )
+    except Exception:
+        client.delete_collection(staging_name)
+        raise
+
+    # swap: readers follow the pointer, then the manifest records what was built
+    set_active_collection_name(staging_name, persist_dir)
+    save_manifest(persist_dir, {
+        "signature": signature,
+        "collection": staging_name,
+        "sources": new_sources,
+    })
+
+    # keep the previous collection for processes that have not re-read the pointer yet
+    for collection in client.list_collections():
+        if collection.name not in (staging_name, live_name):
+            client.delete_collection(collection.name)
+
+    stats = {
+        "collection": staging_name,
+        "sources": len(sources),
+        "sources_changed": changed,
+        "sources_removed": len(removed),
+        "chunks_reused": copied,
+        "chunks_embedded": embedded,
+        "chunks_uploaded_kept": kept_uploads + reembedded_uploads - len(gone_ids),
+        "stages": report.as_dict(),
+    }
+
+    print(
+        f"ChromaDB was successfully built: {stats['sources']} sources "
+        f"({changed} changed, {len(removed)} removed), {embedded} chunks embedded, "
+        f"{copied} reused."
+    )
+    print(report.format())
+    return stats
@@ -1,5 +1,8 @@
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+
 def expand_bullet_points(text: str):
     lines = text.split("\n")
     expanded = []
@@ -13,9 +16,9 @@ def expand_bullet_points(text: str):
     return "\n".join(expanded)
 
 
-def chunk_documents(documents):
+def chunk_documents(documents, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
     splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=50
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
     )
     return splitter.split_documents(documents)
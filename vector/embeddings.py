@@ -1,5 +1,13 @@
+import asyncio
 import os
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
 from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
 from langchain_openai import AzureOpenAIEmbeddings
 
 load_dotenv()
@@ -9,9 +17,266 @@ AZURE_EMBEDDING_ENDPOINT = os.getenv("AZURE_EMBEDDING_ENDPOINT")
 AZURE_EMBEDDING_API_VERSION = os.getenv("AZURE_EMBEDDING_API_VERSION", "2024-02-01")
 AZURE_EMBEDDING_DEPLOYMENT = os.getenv("AZURE_EMBEDDING_DEPLOYMENT")
 
-embedding_model = AzureOpenAIEmbeddings(
-    model=AZURE_EMBEDDING_DEPLOYMENT,        
-    azure_endpoint=AZURE_EMBEDDING_ENDPOINT, 
-    api_key=AZURE_EMBEDDING_API_KEY,         
-    api_version=AZURE_EMBEDDING_API_VERSION  
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "EmbeddingCache/embeddings.sqlite3")
+EMBEDDING_CACHE_MEMORY_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "10000"))
+# on-disk bounds: least recently used vectors beyond the size, or unused for longer than the age, are deleted
+EMBEDDING_CACHE_DISK_ENTRIES = int(os.getenv("EMBEDDING_CACHE_DISK_ENTRIES", "200000"))
+EMBEDDING_CACHE_MAX_AGE_DAYS = float(os.getenv("EMBEDDING_CACHE_MAX_AGE_DAYS", "30"))
+
+# disk stores between two pruning passes
+PRUNE_EVERY = 100
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with a content-hash keyed two-level cache.
+
+    Lookups go to an in-memory LRU first, then to an on-disk SQLite store, and
+    only the remaining misses are sent to the wrapped model (in one batch).
+    Keys hash the namespace (embedding deployment) together with the text, so
+    vectors from different models never mix.
+
+    The SQLite file is opened on first use and kept to `max_disk_entries`
+    vectors, none unused for longer than `max_age_days`. The async methods do
+    their disk reads and writes in a worker thread.
+
+    `underlying` may be an Embeddings instance or a zero-argument factory; a
+    factory is only called on the first cache miss.
+    """
+
+    def __init__(self, underlying, namespace: str, cache_path: str = None,
+                 max_memory_entries: int = 10000, max_disk_entries: int = 200000,
+                 max_age_days: float = 30):
+        is_model = hasattr(underlying, "embed_documents")
+        self._underlying = underlying if is_model else None
+        self._factory = None if is_model else underlying
+        self.namespace = namespace or "default"
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_age_seconds = max_age_days * 86400
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_path = cache_path
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._stores_since_prune = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.api_calls = 0
+
+    @property
+    def underlying(self) -> Embeddings:
+        if self._underlying is None:
+            self._underlying = self._factory()
+        return self._underlying
+
+    def _connection(self):
+        """The SQLite store, created on first use; None without a cache_path. Call with _db_lock held."""
+        if self._db is None and self.cache_path:
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.cache_path, check_same_thread=False)
+            db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            columns = [row[1] for row in db.execute("PRAGMA table_info(embeddings)")]
+            if "used_at" not in columns:
+                # stores written before the age bound count as used now
+                db.execute("ALTER TABLE embeddings ADD COLUMN used_at REAL NOT NULL DEFAULT 0")
+                db.execute("UPDATE embeddings SET used_at = ?", (time.time(),))
+            db.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_used_at ON embeddings (used_at)")
+            db.commit()
+            self._db = db
+            self._prune()
+        return self._db
+
+    def _prune(self):
+        """Delete vectors past the age bound, then the least recently used beyond the size bound."""
+        self._db.execute("DELETE FROM embeddings WHERE used_at < ?", (time.time() - self.max_age_seconds,))
+        self._db.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+        self._db.commit()
+        self._stores_since_prune = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: list):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup_memory(self, keys: list) -> dict:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.memory_hits += 1
+        return found
+
+    def _lookup_disk(self, keys: list) -> dict:
+        """Vectors stored on disk for the given keys; marks them as used."""
+        found = {}
+        with self._db_lock:
+            db = self._connection()
+            if db is None:
+                return found
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                db.executemany("UPDATE embeddings SET used_at = ? WHERE key = ?",
+                               [(time.time(), k) for k in found])
+                db.commit()
+
+        with self._lock:
+            for key, vector in found.items():
+                self._remember(key, vector)
+            self.disk_hits += len(found)
+        return found
+
+    def _remember_all(self, items: dict):
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+
+    def _store_disk(self, items: dict):
+        with self._db_lock:
+            db = self._connection()
+            if db is None or not items:
+                return
+            now = time.time()
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, used_at) VALUES (?, ?, ?)",
+                [(k, np.asarray(v, dtype=np.float32).tobytes(), now) for k, v in items.items()],
+            )
+            db.commit()
+            self._stores_since_prune += 1
+            if self._stores_since_prune >= PRUNE_EVERY:
+                self._prune()
+
+    def _lookup(self, keys: list) -> dict:
+        """Cached vectors for the given keys (memory first, then disk)."""
+        found = self._lookup_memory(keys)
+        remaining = [k for k in dict.fromkeys(keys) if k not in found]
+        if remaining:
+            found.update(self._lookup_disk(remaining))
+        return found
+
+    async def _alookup(self, keys: list) -> dict:
+        found = self._lookup_memory(keys)
+        remaining = [k for k in dict.fromkeys(keys) if k not in found]
+        if remaining and self.cache_path:
+            found.update(await asyncio.to_thread(self._lookup_disk, remaining))
+        return found
+
+    def _store(self, items: dict):
+        self._remember_all(items)
+        self._store_disk(items)
+
+    async def _astore(self, items: dict):
+        self._remember_all(items)
+        if self.cache_path:
+            await asyncio.to_thread(self._store_disk, items)
+
+    def _count_call(self):
+        with self._lock:
+            self.api_calls += 1
+
+    def _missing(self, keys: list, texts: list, found: dict) -> dict:
+        missing = {k: t for k, t in zip(keys, texts) if k not in found}
+        with self._lock:
+            self.misses += len(missing)
+        return missing
+
+    def _split(self, texts: list):
+        keys = [self._key(t) for t in texts]
+        found = self._lookup(keys)
+        return keys, found, self._missing(keys, texts, found)
+
+    async def _asplit(self, texts: list):
+        keys = [self._key(t) for t in texts]
+        found = await self._alookup(keys)
+        return keys, found, self._missing(keys, texts, found)
+
+    def embed_documents(self, texts: list) -> list:
+        keys, found, missing = self._split(texts)
+        if missing:
+            self._count_call()
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            new = dict(zip(missing.keys(), vectors))
+            self._store(new)
+            found.update(new)
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> list:
+        keys, found, missing = self._split([text])
+        if missing:
+            self._count_call()
+            found[keys[0]] = self.underlying.embed_query(text)
+            self._store({keys[0]: found[keys[0]]})
+        return found[keys[0]]
+
+    async def aembed_documents(self, texts: list) -> list:
+        keys, found, missing = await self._asplit(texts)
+        if missing:
+            self._count_call()
+            vectors = await self.underlying.aembed_documents(list(missing.values()))
+            new = dict(zip(missing.keys(), vectors))
+            await self._astore(new)
+            found.update(new)
+        return [found[k] for k in keys]
+
+    async def aembed_query(self, text: str) -> list:
+        keys, found, missing = await self._asplit([text])
+        if missing:
+            self._count_call()
+            found[keys[0]] = await self.underlying.aembed_query(text)
+            await self._astore({keys[0]: found[keys[0]]})
+        return found[keys[0]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "api_calls": self.api_calls,
+                "hit_rate": hits / total if total else 0.0,
+            }
+
+
+def azure_embeddings():
+    return AzureOpenAIEmbeddings(
+        model=AZURE_EMBEDDING_DEPLOYMENT,
+        azure_endpoint=AZURE_EMBEDDING_ENDPOINT,
+        api_key=AZURE_EMBEDDING_API_KEY,
+        api_version=AZURE_EMBEDDING_API_VERSION
+    )
+
+
+# the one embedding client shared by the vector store, retriever, builder and file matcher
+embedding_model = CachedEmbeddings(
+    azure_embeddings,
+    namespace=AZURE_EMBEDDING_DEPLOYMENT,
+    cache_path=EMBEDDING_CACHE_PATH,
+    max_memory_entries=EMBEDDING_CACHE_MEMORY_ENTRIES,
+    max_disk_entries=EMBEDDING_CACHE_DISK_ENTRIES,
+    max_age_days=EMBEDDING_CACHE_MAX_AGE_DAYS,
 )
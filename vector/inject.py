@@ -5,7 +5,8 @@ from pathlib import Path
 from langchain_core.documents import Document
 from .loaders import load_json_kb, extract_pdf_text, load_md_kb
 from .chunker import chunk_documents
-from .store import get_vector_db
+from .store import get_vector_db, mark_collection_changed
+from Services.metrics import ingest_stage_seconds, ingest_chunks, ingest_documents
 
 
 def download_file_from_url(url: str, timeout: int = 30) -> str:
@@ -106,27 +107,30 @@ def inject_document_from_url(url: str) -> dict:
         file_type = get_file_type(url)
 
         # Download file
-        temp_file = download_file_from_url(url)
+        with ingest_stage_seconds.time(stage="download"):
+            temp_file = download_file_from_url(url)
 
         # Load documents based on file type
-        if file_type == "json":
-            docs = load_json_kb(temp_file)
-        elif file_type == "md":
-            docs = load_md_kb(temp_file)
-        else:  # pdf
-            text = extract_pdf_text(temp_file)
-            if text:
-                # Create document with PDF filename in content
-                filename = Path(url).name
-                docs = [Document(page_content=f"PDF FILE: {filename}\n{text}")]
-            else:
-                docs = []
+        with ingest_stage_seconds.time(stage="parse"):
+            if file_type == "json":
+                docs = load_json_kb(temp_file)
+            elif file_type == "md":
+                docs = load_md_kb(temp_file)
+            else:  # pdf
+                text = extract_pdf_text(temp_file)
+                if text:
+                    # Create document with PDF filename in content
+                    filename = Path(url).name
+                    docs = [Document(page_content=f"PDF FILE: {filename}\n{text}")]
+                else:
+                    docs = []
 
         if not docs:
             raise ValueError("No content extracted from file")
 
         # Chunk documents
-        chunks = chunk_documents(docs)
+        with ingest_stage_seconds.time(stage="chunk"):
+            chunks = chunk_documents(docs)
 
         if not chunks:
             raise ValueError("No chunks created from document")
@@ -139,10 +143,14 @@ def inject_document_from_url(url: str) -> dict:
                 "original_filename": Path(url).name
             }
 
-        # Add to ChromaDB
-        vector_db = get_vector_db()
-        vector_db.add_documents(chunks)
+        # Add to ChromaDB (embedding happens here)
+        with ingest_stage_seconds.time(stage="embed_and_add"):
+            vector_db = get_vector_db()
+            ids = vector_db.add_documents(chunks)
+            mark_collection_changed(added_ids=ids, added_texts=[c.page_content for c in chunks])
 
+        ingest_chunks.inc(len(chunks))
+        ingest_documents.inc(result="success")
         return {
             "success": True,
             "documents_added": len(chunks),
@@ -151,6 +159,7 @@ def inject_document_from_url(url: str) -> dict:
         }
 
     except Exception as e:
+        ingest_documents.inc(result="error")
         return {
             "success": False,
             "documents_added": 0,
@@ -0,0 +1,88 @@
+import math
+import re
+import threading
+from collections import Counter
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    # "BIR-1904" and "bir 1904" both become ["bir", "1904"]
+    return TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over knowledge-base chunks.
+
+    Exact identifiers such as "1904", "hdmf" or "e1" are rare terms with a
+    high IDF, so chunks containing them rank first where embeddings tend to
+    blur them together. Lookups only touch the postings of the query terms.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}   # term -> {chunk id: term frequency}
+        self._lengths = {}    # chunk id -> token count
+        self._texts = {}      # chunk id -> chunk text
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def add(self, ids, texts):
+        with self._lock:
+            for chunk_id, text in zip(ids, texts):
+                self._remove(chunk_id)
+                terms = Counter(tokenize(text or ""))
+                for term, tf in terms.items():
+                    self._postings.setdefault(term, {})[chunk_id] = tf
+                length = sum(terms.values())
+                self._lengths[chunk_id] = length
+                self._texts[chunk_id] = text
+                self._total_length += length
+
+    def remove(self, ids):
+        with self._lock:
+            for chunk_id in ids:
+                self._remove(chunk_id)
+
+    def _remove(self, chunk_id):
+        if chunk_id not in self._lengths:
+            return
+        for term in set(tokenize(self._texts[chunk_id] or "")):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(chunk_id)
+        del self._texts[chunk_id]
+
+    def document_frequency(self, term: str) -> int:
+        return len(self._postings.get(term, ()))
+
+    def text(self, chunk_id) -> str:
+        return self._texts.get(chunk_id)
+
+    def search(self, query: str, k: int) -> list:
+        """Top `k` chunks for `query` as (chunk id, score), best first."""
+        with self._lock:
+            n = len(self._lengths)
+            if n == 0:
+                return []
+            avg_length = self._total_length / n
+
+            scores = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
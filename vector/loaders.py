@@ -129,19 +129,23 @@ def extract_pdf_text(path: str):
         return ""
 
 
+def load_pdf_file(path: str):
+    text = extract_pdf_text(path)
+    if not text:
+        return []
+
+    return [Document(
+        page_content=text,
+        metadata={
+            "source": os.path.basename(path),
+            "type": "pdf"
+        }
+    )]
+
+
 def load_pdf_kb(pdf_folder="MockData"):
     docs = []
     for f in os.listdir(pdf_folder):
         if f.lower().endswith(".pdf"):
-            path = os.path.join(pdf_folder, f)
-            text = extract_pdf_text(path)
-
-            if text:
-                docs.append(Document(
-                    page_content=text,
-                    metadata={
-                        "source": f,
-                        "type": "pdf"
-                    }
-                ))
+            docs.extend(load_pdf_file(os.path.join(pdf_folder, f)))
     return docs
@@ -0,0 +1,235 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from .chunker import chunk_documents
+from .tokens import count_tokens
+
+
+class StageStats:
+    """Item/token counts and elapsed seconds for one ingestion stage."""
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.tokens = 0
+        self.seconds = 0.0
+
+    def rate(self, value) -> float:
+        return value / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "items": self.items,
+            "unit": self.unit,
+            "tokens": self.tokens,
+            "seconds": round(self.seconds, 4),
+            f"{self.unit}_per_s": round(self.rate(self.items), 2),
+            "tokens_per_s": round(self.rate(self.tokens), 2),
+        }
+
+
+class PipelineReport:
+    def __init__(self):
+        self.stages = {}
+
+    def stage(self, name: str, unit: str) -> StageStats:
+        if name not in self.stages:
+            self.stages[name] = StageStats(name, unit)
+        return self.stages[name]
+
+    def as_dict(self) -> dict:
+        return {name: s.as_dict() for name, s in self.stages.items()}
+
+    def format(self) -> str:
+        lines = [f"{'stage':<8} {'items':>14} {'tokens':>10} {'seconds':>9} {'items/s':>10} {'tokens/s':>11}"]
+        for s in self.stages.values():
+            lines.append(
+                f"{s.name:<8} {s.items:>8} {s.unit:<5} {s.tokens:>10} {s.seconds:>9.2f} "
+                f"{s.rate(s.items):>10.1f} {s.rate(s.tokens):>11.1f}"
+            )
+        return "\n".join(lines)
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for embedding requests.
+
+    Enforces requests-per-minute and/or tokens-per-minute budgets across
+    threads. A budget of None means unlimited.
+    """
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = requests_per_minute or 0
+        self._tokens = tokens_per_minute or 0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._last
+        self._last = now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens: int = 0):
+        """Block until one request carrying `tokens` tokens fits in the budget."""
+        if self.tokens_per_minute:
+            # a single oversized batch may spend at most one full bucket
+            tokens = min(tokens, self.tokens_per_minute)
+
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+
+                wait_for = 0.0
+                if self.requests_per_minute and self._requests < 1:
+                    wait_for = max(wait_for, (1 - self._requests) * 60 / self.requests_per_minute)
+                if self.tokens_per_minute and self._tokens < tokens:
+                    wait_for = max(wait_for, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+
+                if wait_for == 0.0:
+                    if self.requests_per_minute:
+                        self._requests -= 1
+                    if self.tokens_per_minute:
+                        self._tokens -= tokens
+                    return
+
+            time.sleep(wait_for)
+
+
+def load_and_chunk(path: str, loader):
+    """Parse one source file and split it into chunks (runs inside a worker process)."""
+    docs = loader(path)
+    return len(docs), chunk_documents(docs)
+
+
+def iter_parsed_sources(sources: dict, workers: int = None, report: PipelineReport = None):
+    """
+    Load and chunk source files in a process pool, yielding (path, chunks) as each file completes.
+
+    The caller can start embedding a file's chunks while the remaining files
+    are still being parsed.
+
+    Args:
+        sources: {path: loader} for the files to parse
+        workers: Process count (None = CPU count, 0 = parse in this process)
+        report: Optional PipelineReport receiving "parse" and "chunk" stats
+    """
+    report = report or PipelineReport()
+    parse_stage = report.stage("parse", "docs")
+    chunk_stage = report.stage("chunk", "chunks")
+    start = time.perf_counter()
+
+    def record(path, result):
+        doc_count, file_chunks = result
+        parse_stage.items += doc_count
+        chunk_stage.items += len(file_chunks)
+        chunk_stage.tokens += sum(count_tokens(c.page_content) for c in file_chunks)
+        # parsing and chunking happen together in the workers, so they share the wall time
+        # (from the start until this file was done; time spent by the caller in between overlaps)
+        parse_stage.seconds = chunk_stage.seconds = time.perf_counter() - start
+        return path, file_chunks
+
+    if workers == 0 or len(sources) <= 1:
+        for path, loader in sources.items():
+            yield record(path, load_and_chunk(path, loader))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(load_and_chunk, path, loader): path for path, loader in sources.items()}
+        for future in as_completed(futures):
+            yield record(futures[future], future.result())
+
+
+def parse_sources(sources: dict, workers: int = None, report: PipelineReport = None) -> dict:
+    """Load and chunk every source file; {path: [chunks]}. See iter_parsed_sources."""
+    return dict(iter_parsed_sources(sources, workers=workers, report=report))
+
+
+def embed_and_upsert(collection, chunks, embedding_model, batch_size: int = 256,
+                     concurrency: int = 4, limiter: RateLimiter = None,
+                     report: PipelineReport = None, clean_metadata=None) -> int:
+    """
+    Embed chunks in bounded concurrent batches and upsert each batch into Chroma.
+
+    `chunks` may be a generator, e.g. fed by iter_parsed_sources: a batch is
+    sent as soon as it is full, so embedding overlaps with producing the rest.
+    At most 2 x `concurrency` batches are in flight, so memory stays bounded
+    for large corpora. Embedding runs in worker threads; upserts happen on the
+    calling thread as batches complete.
+
+    Args:
+        collection: Chroma collection to upsert into
+        chunks: {chunk_id: Document} or an iterable of (chunk_id, Document)
+        embedding_model: LangChain Embeddings used for the batches
+        batch_size: Texts per embeddings request
+        concurrency: Embedding requests in flight
+        limiter: Optional RateLimiter applied per request
+        report: Optional PipelineReport receiving "embed" and "upsert" stats
+        clean_metadata: Optional callable applied to each chunk's metadata
+
+    Returns:
+        Number of chunks upserted
+    """
+    report = report or PipelineReport()
+    embed_stage = report.stage("embed", "chunks")
+    upsert_stage = report.stage("upsert", "chunks")
+    clean_metadata = clean_metadata or (lambda m: m)
+    items = chunks.items() if isinstance(chunks, dict) else chunks
+
+    def embed_batch(batch):
+        texts = [c.page_content for _, c in batch]
+        tokens = sum(count_tokens(t) for t in texts)
+        if limiter is not None:
+            limiter.acquire(tokens)
+        return batch, embedding_model.embed_documents(texts), tokens
+
+    def upsert(result):
+        batch, vectors, tokens = result
+        embed_stage.items += len(batch)
+        embed_stage.tokens += tokens
+
+        start = time.perf_counter()
+        collection.upsert(
+            ids=[cid for cid, _ in batch],
+            embeddings=vectors,
+            documents=[c.page_content for _, c in batch],
+            metadatas=[clean_metadata(c.metadata) for _, c in batch],
+        )
+        upsert_stage.items += len(batch)
+        upsert_stage.seconds += time.perf_counter() - start
+
+    start = time.perf_counter()
+    total = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        pending = set()
+
+        def submit(batch):
+            nonlocal pending
+            pending.add(pool.submit(embed_batch, batch))
+            if len(pending) >= 2 * max(1, concurrency):
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    upsert(future.result())
+
+        batch = []
+        for item in items:
+            batch.append(item)
+            total += 1
+            if len(batch) >= batch_size:
+                submit(batch)
+                batch = []
+        if batch:
+            submit(batch)
+
+        for future in pending:
+            upsert(future.result())
+
+    # upserts overlap with in-flight embedding requests; embed time is the phase wall time
+    embed_stage.seconds += time.perf_counter() - start
+    return total
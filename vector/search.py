@@ -1,6 +1,295 @@
-from .store import get_vector_db
+import asyncio
+import os
+import re
+import numpy as np
+from Services.ttl_cache import TTLCache
+from Services.tracing import set_span_attributes
+from Services.metrics import vector_search_seconds
+from tools.similarity import normalize_rows
+from .lexical import tokenize
+from .store import get_vector_db, get_lexical_index, collection_version
 
-def search_vectors(query: str, k=5):
-    db = get_vector_db()
-    results = db.similarity_search(query, k=k)
-    return [r.page_content for r in results]
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "5"))
+# "similarity" or "mmr" (maximal marginal relevance: skips chunks that repeat already chosen ones)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "similarity").lower()
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "20"))
+RETRIEVAL_MMR_LAMBDA = float(os.getenv("RETRIEVAL_MMR_LAMBDA", "0.7"))
+# minimum cosine similarity between query and chunk; 0 keeps everything
+RETRIEVAL_SCORE_THRESHOLD = float(os.getenv("RETRIEVAL_SCORE_THRESHOLD", "0"))
+# chunks at least this similar to an already selected chunk are dropped as duplicates
+RETRIEVAL_DUPLICATE_THRESHOLD = float(os.getenv("RETRIEVAL_DUPLICATE_THRESHOLD", "0.95"))
+
+# fuse BM25 and vector results with reciprocal rank fusion
+RETRIEVAL_HYBRID = os.getenv("RETRIEVAL_HYBRID", "true").lower() == "true"
+RETRIEVAL_RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+# answer from BM25 alone (no embedding, no HNSW) when the query names an exact identifier
+RETRIEVAL_LEXICAL_SHORTCUT = os.getenv("RETRIEVAL_LEXICAL_SHORTCUT", "true").lower() == "true"
+
+# identifiers found in more than this share of chunks are too common to settle a query
+RETRIEVAL_IDENTIFIER_MAX_DF = float(os.getenv("RETRIEVAL_IDENTIFIER_MAX_DF", "0.05"))
+
+# acronyms and form codes: "HDMF", "SSS", "E1", "1904", "2316"
+IDENTIFIER_RE = re.compile(r"\b(?:[A-Z]{2,6}|[A-Za-z]*\d+[A-Za-z0-9]*)\b")
+
+retrieval_cache = TTLCache(
+    max_entries=int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "3600")),
+)
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query.lower()).strip(" ?!.,")
+
+
+def warm_lexical_index():
+    """Build the BM25 index ahead of the first question; search builds it lazily if this fails."""
+    try:
+        get_lexical_index()
+    except Exception as e:
+        print(f"[WARN] Could not build lexical index: {e}")
+
+
+def invalidate_retrieval_cache():
+    """Drop every cached result; entries for an old collection version would never be hit again anyway."""
+    retrieval_cache.clear()
+
+
+def select_chunks(query_vec, vectors, k: int, mode: str, score_threshold: float) -> list:
+    """
+    Pick up to `k` candidate indexes, best first.
+
+    Candidates below `score_threshold` are dropped. In "mmr" mode each pick
+    maximizes lambda * relevance - (1 - lambda) * similarity to the chunks
+    already picked, and near duplicates of a picked chunk are skipped, so the
+    overlapping chunk windows do not fill the prompt twice.
+    """
+    if len(vectors) == 0:
+        return []
+
+    candidates = normalize_rows(vectors)
+    relevance = candidates @ normalize_rows([query_vec])[0]
+    remaining = [i for i in np.argsort(-relevance) if relevance[i] >= score_threshold]
+    if mode != "mmr":
+        return remaining[:k]
+
+    selected = []
+    while remaining and len(selected) < k:
+        if selected:
+            redundancy = (candidates[remaining] @ candidates[selected].T).max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining), dtype=np.float32)
+
+        scores = RETRIEVAL_MMR_LAMBDA * relevance[remaining] - (1 - RETRIEVAL_MMR_LAMBDA) * redundancy
+        keep = redundancy < RETRIEVAL_DUPLICATE_THRESHOLD
+        if not keep.any():
+            break
+        pick = int(np.argmax(np.where(keep, scores, -np.inf)))
+        selected.append(remaining.pop(pick))
+        remaining = [i for i, ok in zip(remaining, np.delete(keep, pick)) if ok]
+
+    return selected
+
+
+def _dense_search(embedding, k: int, mode: str, score_threshold: float) -> list:
+    """Vector hits as (chunk id, text), best first."""
+    collection = get_vector_db()._collection
+    count = collection.count()
+    if count == 0:
+        return []
+    fetch_k = min(max(k, RETRIEVAL_FETCH_K) if mode == "mmr" else k, count)
+    with vector_search_seconds.time(retriever="dense"):
+        result = collection.query(
+            query_embeddings=[list(embedding)],
+            n_results=fetch_k,
+            include=["documents", "embeddings"],
+        )
+
+    ids = result["ids"][0]
+    documents = result["documents"][0]
+    vectors = result["embeddings"][0]
+    return [(ids[i], documents[i]) for i in select_chunks(embedding, vectors, k, mode, score_threshold)]
+
+
+def _lexical_search(query: str, k: int) -> list:
+    """BM25 hits as (chunk id, text), best first."""
+    index = get_lexical_index()
+    with vector_search_seconds.time(retriever="lexical"):
+        hits = index.search(query, k)
+    return [(chunk_id, index.text(chunk_id)) for chunk_id, _ in hits]
+
+
+def identifier_terms(query: str, index=None) -> set:
+    """
+    Index terms of the exact identifiers (acronyms, form numbers) named in the query.
+
+    With an `index`, terms that appear in too many chunks ("HR") are left out.
+    """
+    terms = {term for match in IDENTIFIER_RE.findall(query) for term in tokenize(match)}
+    if index is not None:
+        max_df = max(1, RETRIEVAL_IDENTIFIER_MAX_DF * len(index))
+        terms = {term for term in terms if index.document_frequency(term) <= max_df}
+    return terms
+
+
+def exact_identifier_hits(terms: set, hits: list, k: int):
+    """
+    The lexical hits when they settle the query on their own, else None.
+
+    That is the case when the query names a rare identifier and some BM25 hit
+    contains all of the identifier terms; those hits come first, then the
+    remaining BM25 hits fill up to `k`.
+    """
+    if not terms or not hits:
+        return None
+    exact = [hit for hit in hits if terms <= set(tokenize(hit[1]))]
+    if not exact:
+        return None
+    return (exact + [hit for hit in hits if hit not in exact])[:k]
+
+
+def _fuse(result_lists: list, rrf_k: int = RETRIEVAL_RRF_K) -> list:
+    """Every (chunk id, text) in the ranked lists, ordered by reciprocal rank fusion score."""
+    scores = {}
+    texts = {}
+    for results in result_lists:
+        for rank, (chunk_id, text) in enumerate(results, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank)
+            texts[chunk_id] = text
+    return [(chunk_id, texts[chunk_id]) for chunk_id in sorted(scores, key=scores.get, reverse=True)]
+
+
+def reciprocal_rank_fusion(result_lists: list, k: int, rrf_k: int = RETRIEVAL_RRF_K) -> list:
+    """Merge ranked (chunk id, text) lists; each list adds 1 / (rrf_k + rank) per chunk."""
+    return [text for _, text in _fuse(result_lists, rrf_k)[:k]]
+
+
+def filter_fused(query_vec, vectors, k: int, mode: str, score_threshold: float) -> list:
+    """
+    Indexes of the fused candidates to keep, in their fused order.
+
+    BM25 ranks chunks without the query vector, so its hits are held to the
+    same `score_threshold` as the vector hits; in "mmr" mode a chunk nearly
+    identical to one already kept is dropped, as select_chunks does. A
+    candidate without a stored vector (None) is dropped.
+    """
+    known = [i for i, vector in enumerate(vectors) if vector is not None]
+    if not known:
+        return []
+
+    candidates = normalize_rows([vectors[i] for i in known])
+    relevance = candidates @ normalize_rows([query_vec])[0]
+
+    kept_rows = []
+    for row in range(len(known)):
+        if len(kept_rows) == k:
+            break
+        if relevance[row] < score_threshold:
+            continue
+        if mode == "mmr" and kept_rows:
+            if (candidates[kept_rows] @ candidates[row]).max() >= RETRIEVAL_DUPLICATE_THRESHOLD:
+                continue
+        kept_rows.append(row)
+    return [known[row] for row in kept_rows]
+
+
+def _stored_vectors(ids: list) -> list:
+    """Stored embedding per chunk id (None for chunks no longer in the collection)."""
+    stored = get_vector_db()._collection.get(ids=ids, include=["embeddings"])
+    by_id = dict(zip(stored["ids"], stored["embeddings"]))
+    return [by_id.get(chunk_id) for chunk_id in ids]
+
+
+def _hybrid_search(embedding, lexical: list, k: int, mode: str, score_threshold: float) -> list:
+    """Vector hits fused with the BM25 hits, filtered by relevance (and duplicates in "mmr" mode)."""
+    dense = _dense_search(embedding, k, mode, score_threshold)
+    if not lexical:
+        return [text for _, text in dense]
+
+    fused = _fuse([dense, lexical])
+    if score_threshold > 0 or mode == "mmr":
+        keep = filter_fused(embedding, _stored_vectors([chunk_id for chunk_id, _ in fused]), k, mode, score_threshold)
+        fused = [fused[i] for i in keep]
+    return [text for _, text in fused[:k]]
+
+
+def _fetch_k(k: int) -> int:
+    return max(k, RETRIEVAL_FETCH_K)
+
+
+def _lexical_shortcut(query: str, lexical: list, k: int):
+    """
+    BM25 hits for a query naming an exact identifier, or None to run the vector search.
+
+    No query vector is involved, so `score_threshold` and the "mmr" mode do not
+    apply to these results; they are the top-k BM25 hits as ranked.
+    """
+    if not RETRIEVAL_LEXICAL_SHORTCUT:
+        return None
+    exact = exact_identifier_hits(identifier_terms(query, get_lexical_index()), lexical, k)
+    if exact is None:
+        return None
+    print(f"RETRIEVAL: exact identifier match, skipped vector search ({len(exact)} chunks)")
+    set_span_attributes(**{"retrieval.lexical_only": True})
+    return [text for _, text in exact]
+
+
+def _cache_key(query: str, k: int, mode: str, score_threshold: float):
+    return (collection_version(), normalize_query(query), k, mode, score_threshold)
+
+
+def search_vectors(query: str, k=None, mode=None, score_threshold=None):
+    k = k or RETRIEVAL_K
+    mode = mode or RETRIEVAL_MODE
+    score_threshold = RETRIEVAL_SCORE_THRESHOLD if score_threshold is None else score_threshold
+
+    key = _cache_key(query, k, mode, score_threshold)
+    cached = retrieval_cache.get(key)
+    set_span_attributes(**{"retrieval.cache_hit": cached is not None})
+    if cached is not None:
+        return cached
+
+    lexical = _lexical_search(query, _fetch_k(k)) if RETRIEVAL_HYBRID else []
+    results = _lexical_shortcut(query, lexical, k)
+    if results is None:
+        embedding = get_vector_db().embeddings.embed_query(query)
+        results = _hybrid_search(embedding, lexical, k, mode, score_threshold)
+    retrieval_cache.set(key, results)
+    return results
+
+
+async def aembed_query(query: str):
+    """Embed a query with the same embedding model the vector store uses."""
+    return await get_vector_db().embeddings.aembed_query(query)
+
+
+async def asearch_vectors(query: str, k=None, embedding=None, mode=None, score_threshold=None):
+    """
+    Async variant of search_vectors for the request path.
+
+    Results are cached per normalized query and collection version, so a
+    repeated question skips both the embedding and the HNSW lookup. BM25 hits
+    naming the query's exact identifiers are returned without any vector
+    search; otherwise BM25 and vector hits are fused with RRF, and the fused
+    list is held to `score_threshold` (and, in "mmr" mode, cleared of near
+    duplicates) using the stored chunk embeddings. The query
+    embedding uses the async Azure client (or a precomputed `embedding`);
+    only the local index lookups run in a worker thread.
+    """
+    k = k or RETRIEVAL_K
+    mode = mode or RETRIEVAL_MODE
+    score_threshold = RETRIEVAL_SCORE_THRESHOLD if score_threshold is None else score_threshold
+
+    key = _cache_key(query, k, mode, score_threshold)
+    cached = retrieval_cache.get(key)
+    set_span_attributes(**{"retrieval.cache_hit": cached is not None})
+    if cached is not None:
+        return cached
+
+    lexical = await asyncio.to_thread(_lexical_search, query, _fetch_k(k)) if RETRIEVAL_HYBRID else []
+    results = _lexical_shortcut(query, lexical, k)
+    if results is None:
+        if embedding is None:
+            embedding = await aembed_query(query)
+        results = await asyncio.to_thread(_hybrid_search, embedding, lexical, k, mode, score_threshold)
+    retrieval_cache.set(key, results)
+    return results
@@ -1,42 +1,134 @@
 import os
+import threading
 from dotenv import load_dotenv
 
 from langchain_community.vectorstores import Chroma
-from langchain_openai import AzureOpenAIEmbeddings
+from .embeddings import embedding_model
+from .lexical import BM25Index
 
 load_dotenv()
 
 CHROMA_DIR = os.getenv("CHROMA_PERSIST_DIR", "ChromaDB")
 
-AZURE_EMBEDDING_API_KEY = os.getenv("AZURE_EMBEDDING_API_KEY")
-AZURE_EMBEDDING_ENDPOINT = os.getenv("AZURE_EMBEDDING_ENDPOINT")
-AZURE_EMBEDDING_API_VERSION = os.getenv("AZURE_EMBEDDING_API_VERSION", "2024-02-01")
-AZURE_EMBEDDING_DEPLOYMENT = os.getenv("AZURE_EMBEDDING_DEPLOYMENT")
+# the knowledge-base builder writes into a staging collection and then swaps
+# this pointer file, so readers always see a complete collection
+ACTIVE_COLLECTION_FILE = "active_collection"
+DEFAULT_COLLECTION = "langchain"
 
 vector_db = None
+vector_db_collection = None
+
+# bumped on every in-process add/delete; with the collection name it versions retrieval caches
+_local_version = 0
+
+# BM25 index over the active collection's chunks, reloaded when the collection is swapped
+lexical_index = None
+lexical_index_collection = None
+_lexical_lock = threading.Lock()
+_lexical_build_lock = threading.Lock()
+# changes made while the index is being built from Chroma, replayed before it is published
+_pending_changes = None
+
+
+def get_active_collection_name(persist_dir: str = None) -> str:
+    path = os.path.join(persist_dir or CHROMA_DIR, ACTIVE_COLLECTION_FILE)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip() or DEFAULT_COLLECTION
+    except FileNotFoundError:
+        return DEFAULT_COLLECTION
+
+
+def set_active_collection_name(name: str, persist_dir: str = None):
+    """Atomically point readers at a new collection."""
+    persist_dir = persist_dir or CHROMA_DIR
+    os.makedirs(persist_dir, exist_ok=True)
+
+    path = os.path.join(persist_dir, ACTIVE_COLLECTION_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(tmp_path, path)
 
 
 def get_vector_db():
-    global vector_db
+    global vector_db, vector_db_collection
 
-    if vector_db is not None:
-        return vector_db
+    # follow the active-collection pointer so a finished rebuild is picked up
+    # without restarting the server
+    collection = get_active_collection_name()
 
-    embeddings = AzureOpenAIEmbeddings(
-        model=AZURE_EMBEDDING_DEPLOYMENT,
-        api_key=AZURE_EMBEDDING_API_KEY,
-        azure_endpoint=AZURE_EMBEDDING_ENDPOINT,
-        api_version=AZURE_EMBEDDING_API_VERSION
-    )
+    if vector_db is not None and vector_db_collection == collection:
+        return vector_db
 
     vector_db = Chroma(
+        collection_name=collection,
         persist_directory=CHROMA_DIR,
-        embedding_function=embeddings
+        embedding_function=embedding_model
     )
+    vector_db_collection = collection
 
     return vector_db
 
 
+def get_lexical_index() -> BM25Index:
+    """BM25 index of the active collection; built from Chroma on first use and after a rebuild swap."""
+    global lexical_index, lexical_index_collection, _pending_changes
+
+    collection = get_active_collection_name()
+    if lexical_index is not None and lexical_index_collection == collection:
+        return lexical_index
+
+    with _lexical_build_lock:
+        with _lexical_lock:
+            if lexical_index is not None and lexical_index_collection == collection:
+                return lexical_index
+            _pending_changes = []
+
+        try:
+            stored = get_vector_db().get(include=["documents"])
+            index = BM25Index()
+            index.add(stored["ids"], stored["documents"])
+
+            with _lexical_lock:
+                # the read may already include some of these; adds and removes are idempotent
+                for added_ids, added_texts, removed_ids in _pending_changes:
+                    _apply_change(index, added_ids, added_texts, removed_ids)
+                lexical_index, lexical_index_collection = index, collection
+        finally:
+            with _lexical_lock:
+                _pending_changes = None
+
+    print(f"LEXICAL INDEX: {len(index)} chunks from '{collection}'")
+    return index
+
+
+def _apply_change(index: BM25Index, added_ids, added_texts, removed_ids):
+    if removed_ids:
+        index.remove(removed_ids)
+    if added_ids:
+        index.add(added_ids, added_texts)
+
+
+def mark_collection_changed(added_ids=None, added_texts=None, removed_ids=None):
+    """Record that the live collection was modified and apply the change to the lexical index."""
+    global _local_version
+
+    with _lexical_lock:
+        _local_version += 1
+        if _pending_changes is not None:
+            # an index build is reading Chroma and may miss this change
+            _pending_changes.append((added_ids, added_texts, removed_ids))
+        elif lexical_index is not None and lexical_index_collection == get_active_collection_name():
+            _apply_change(lexical_index, added_ids, added_texts, removed_ids)
+        # otherwise the index is not loaded yet and will read the change from Chroma when it is built
+
+
+def collection_version() -> str:
+    """Changes whenever the active collection is swapped or modified in this process."""
+    return f"{get_active_collection_name()}:{_local_version}"
+
+
 def persist_db():
     try:
         get_vector_db().persist()
@@ -70,7 +162,8 @@ def add_documents_to_db(documents, metadatas=None):
         )
 
     try:
-        vector_db.add_documents(documents=documents, metadatas=metadatas)
+        ids = vector_db.add_documents(documents=documents, metadatas=metadatas)
+        mark_collection_changed(added_ids=ids, added_texts=[d.page_content for d in documents])
         return len(documents)
     except Exception as e:
         raise ValueError(f"Failed to add documents to ChromaDB: {str(e)}")
@@ -106,6 +199,7 @@ def delete_documents_by_url(url: str) -> int:
 
         # Delete documents matching the source URL
         vector_db.delete(where={"source": url})
+        mark_collection_changed(removed_ids=results["ids"])
         return documents_to_delete
 
     except Exception as e:
@@ -0,0 +1,32 @@
+import os
+
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+
+_encoding = None
+_encoding_failed = False
+
+
+def get_encoding():
+    """tiktoken encoding used by the Azure OpenAI models, or None if it cannot be loaded."""
+    global _encoding, _encoding_failed
+
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+        except Exception as e:
+            # tiktoken downloads the BPE file on first use; offline we estimate instead
+            print(f"[WARN] tiktoken encoding unavailable, estimating token counts: {e}")
+            _encoding_failed = True
+
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+
+    encoding = get_encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))